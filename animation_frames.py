@@ -0,0 +1,96 @@
+# --- Frame-budgeted data for the animated "Fire Detections Over Time" map ---
+# Instead of one marker per detection, each animation frame holds grid-binned
+# counts and FRP sums. Rows are aggregated in fixed-size chunks (partial sums
+# are merged), each frame keeps at most `max_points_per_frame` of its busiest
+# cells, and the frame length is coarsened (day -> week -> month) when the
+# number of frames would push the figure past `max_total_points`.
+import math
+
+import numpy as np
+import pandas as pd
+
+FRAME_FREQS = {"Day": "D", "Week": "W", "Month": "M"}
+DEFAULT_CELL_DEG = 0.25
+DEFAULT_FRAME_POINTS = 1_500
+DEFAULT_TOTAL_POINTS = 100_000
+MIN_FRAME_POINTS = 200
+CHUNK_ROWS = 1_000_000
+_FRAME_FORMATS = {"D": "%Y-%m-%d", "W": "%Y-%m-%d", "M": "%Y-%m"}
+
+
+def _periods(dates, freq):
+    return dates.dt.to_period(freq).dt.start_time
+
+
+def count_frames(dates, freq):
+    dates = dates.dropna()
+    if dates.empty:
+        return 0
+    return len(pd.period_range(dates.min(), dates.max(), freq=freq))
+
+
+def choose_freq(dates, freq="D", max_total_points=DEFAULT_TOTAL_POINTS, min_frame_points=MIN_FRAME_POINTS):
+    # Coarsens the frame length until every frame can hold min_frame_points.
+    order = list(FRAME_FREQS.values())
+    for candidate in order[order.index(freq):]:
+        if count_frames(dates, candidate) * min_frame_points <= max_total_points:
+            return candidate
+    return order[-1]
+
+
+def _chunks(frame, columns, rows, chunk_rows):
+    n = len(frame) if rows is None else len(rows)
+    for start in range(0, n, chunk_rows):
+        if rows is None:
+            yield frame[columns].iloc[start:start + chunk_rows]
+        else:
+            part = rows[start:start + chunk_rows]
+            yield pd.DataFrame({c: frame[c].take(part) for c in columns})
+
+
+def iter_partial_frames(frame, freq="D", cell_deg=DEFAULT_CELL_DEG, rows=None, chunk_rows=CHUNK_ROWS):
+    # Lazily yields per-chunk partial aggregates keyed by frame/cell(/type).
+    columns = [c for c in ["acq_date", "latitude", "longitude", "type", "frp"] if c in frame.columns]
+    for chunk in _chunks(frame, columns, rows, chunk_rows):
+        chunk = chunk.dropna(subset=["acq_date", "latitude", "longitude"])
+        if chunk.empty:
+            continue
+        parts = {
+            "frame": _periods(chunk["acq_date"], freq),
+            "latitude": (np.floor(chunk["latitude"].to_numpy(dtype="float64") / cell_deg) + 0.5) * cell_deg,
+            "longitude": (np.floor(chunk["longitude"].to_numpy(dtype="float64") / cell_deg) + 0.5) * cell_deg,
+        }
+        if "type" in chunk.columns:
+            parts["type"] = chunk["type"]
+        keys = list(parts)
+        parts["frp"] = chunk["frp"] if "frp" in chunk.columns else 0.0
+        # dropna=False: detections without a fire type still appear on the map.
+        yield (pd.DataFrame(parts).groupby(keys, observed=True, dropna=False, sort=False)
+               .agg(count=("frp", "size"), frp_sum=("frp", "sum")))
+
+
+def build_frames(frame, freq="D", cell_deg=DEFAULT_CELL_DEG, rows=None,
+                 max_points_per_frame=DEFAULT_FRAME_POINTS, max_total_points=DEFAULT_TOTAL_POINTS,
+                 chunk_rows=CHUNK_ROWS):
+    # Returns (frames, freq): one row per kept frame/cell(/type) with count and
+    # frp_sum, plus the frame frequency actually used.
+    dates = frame["acq_date"] if rows is None else frame["acq_date"].take(rows)
+    freq = choose_freq(dates, freq, max_total_points)
+    n_frames = max(count_frames(dates, freq), 1)
+    per_frame = max(1, min(max_points_per_frame, math.floor(max_total_points / n_frames)))
+
+    # Partials are folded in as they are produced, so at most one chunk's
+    # partial is held next to the running total.
+    merged = None
+    for partial in iter_partial_frames(frame, freq, cell_deg, rows, chunk_rows):
+        if merged is None:
+            merged = partial
+        else:
+            levels = list(range(partial.index.nlevels))
+            merged = pd.concat([merged, partial]).groupby(level=levels, observed=True, dropna=False).sum()
+    if merged is None:
+        return pd.DataFrame(columns=["frame", "latitude", "longitude", "count", "frp_sum"]), freq
+    merged = merged.reset_index().sort_values(["frame", "count"], ascending=[True, False])
+    merged = merged[merged.groupby("frame").cumcount() < per_frame]
+    merged["frame"] = merged["frame"].dt.strftime(_FRAME_FORMATS[freq])
+    return merged.reset_index(drop=True), freq
@@ -1,48 +1,48 @@
-# --- Auto-download model/data for Streamlit Cloud ---
-# Downloads .pkl and .csv files from Google Drive if missing, using gdown.
-# This enables deployment on Streamlit Cloud without storing large files in the repo.
+# --- Model/data artifacts for Streamlit Cloud ---
+# The .pkl and .csv files are listed in artifacts.json and fetched on demand by
+# artifacts.py (concurrent, resumable, checksummed), so large files need not be
+# stored in the repo. The model and scaler are fetched together on first use;
+# the datasets only when the Data Visualization page needs them.
 import os
 import streamlit as st
 import numpy as np
-import joblib
-try:
-    import gdown
-except ImportError:
-    import subprocess
-    subprocess.run(['pip', 'install', 'gdown'])
-    import gdown
-
-def download_if_missing(url, filename):
-    if not os.path.exists(filename):
-        gdown.download(url, filename, quiet=False)
-
-# Replace these with your actual file IDs/links
-# === ACTUAL GOOGLE DRIVE LINKS BELOW ===
-MODEL_URL = 'https://drive.google.com/uc?id=1k3NI_5b-hb-XmIgFnGwa7bLygq8F1wt8'
-SCALER_URL = 'https://drive.google.com/uc?id=1K787fvWuCc-ojxMmiWtYT9vPb9AckYXs'
-NOTEBOOK_URL = 'https://drive.google.com/uc?id=1jiFCYZJ-7RVk5BHad7uX-ut7gfNP53l0'
-CSV_2021_URL = 'https://drive.google.com/uc?id=17UZzdC-UiKiDhgDYTz-S211nJ708s_U0'
-CSV_2022_URL = 'https://drive.google.com/uc?id=1ZFMx-GieGBHP9Sabe4Nr1kz1UQzCKzY-'
-CSV_2023_URL = 'https://drive.google.com/uc?id=1xwFXLlsiDJo7ID0FUvN94tmq7hgaViDQ'
-
-download_if_missing(MODEL_URL, 'best_fire_detection_model.pkl')
-download_if_missing(SCALER_URL, 'scaler.pkl')
-download_if_missing(CSV_2021_URL, 'modis_2021_India.csv')
-download_if_missing(CSV_2022_URL, 'modis_2022_India.csv')
-download_if_missing(CSV_2023_URL, 'modis_2023_India.csv')
-
 import pandas as pd
-import plotly.express as px
 from pathlib import Path
+import artifacts
+import ingest
+import fire_model
+import batch_predict
+import fire_cube
+import daily_rollup
+import charts
+import filter_engine
+import spatial_lod
+import spatial_index
+import streaming
+import animation_frames
+import profiling
+import figure_cache
+import evaluation
+import events
+import sweeps
 
-# --- Load model and scaler with caching ---
-@st.cache_resource
-def load_model():
-    return joblib.load("best_fire_detection_model.pkl")
+# --- Fetch missing artifacts once per process ---
+@st.cache_resource(show_spinner="Downloading model and data files...")
+def ensure_artifacts(kind):
+    return artifacts.fetch_all(kinds=[kind])
 
+# --- Load model with caching ---
+# (None, CompiledModel) when the model compiles to NumPy arrays (see
+# compiled_model.py), else the sklearn scaler and model.
 @st.cache_resource
-def load_scaler():
-    return joblib.load("scaler.pkl")
+def load_predictor():
+    ensure_artifacts("model")
+    return fire_model.load_predictor()
+
+# --- What-if sweeps (see sweeps.py), memoised per model version and fixed inputs ---
+@st.cache_data(max_entries=64, show_spinner="Scoring the sweep grid...")
+def load_sweep(model_version, fixed, axes):
+    return sweeps.sweep(*load_predictor(), dict(fixed), list(axes))
 
 # --- Page config ---
 st.set_page_config(page_title="🔥 Fire Type Classifier", layout="wide", page_icon="🔥")
@@ -157,24 +157,185 @@ header, .st-emotion-cache-18ni7ap, .st-emotion-cache-6qob1r {
 
 # --- Sidebar ---
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to", ["Prediction", "Data Visualization"])
+page = st.sidebar.radio("Go to", ["Prediction", "Data Visualization", "Model Evaluation"])
 st.sidebar.markdown("---")
 st.sidebar.info("Made with ❤️ using MODIS satellite data.")
 
-# --- Helper: Load and combine data ---
-def load_modis_data():
-    dfs = []
-    for year in [2021, 2022, 2023]:
-        csv_path = Path(f"modis_{year}_India.csv")
-        if csv_path.exists():
-            df = pd.read_csv(csv_path)
-            df['year'] = year
-            dfs.append(df)
-    if dfs:
-        return pd.concat(dfs, ignore_index=True)
-    return pd.DataFrame()
-
-modis_df = load_modis_data()
+# --- Debug: per-rerun profiling (off by default; FIRE_PROFILE=1 turns it on) ---
+# Stages are timed into a sidebar panel and appended to profile_log.jsonl.
+with st.sidebar.expander("🛠️ Debug"):
+    profile_on = st.checkbox("Profile reruns", value=os.environ.get("FIRE_PROFILE") == "1")
+    trace_on = st.checkbox("Trace allocations (slower)", value=False, disabled=not profile_on)
+# A rerun cut short by st.rerun()/st.stop() never reaches finish(), so the
+# session's previous profiler is closed before the next one starts.
+if "profiler" in st.session_state:
+    st.session_state["profiler"].close()
+profiler = profiling.RerunProfiler(profile_on, trace_on, page=page, session=st.session_state.setdefault("profile_session", os.urandom(4).hex()))
+st.session_state["profiler"] = profiler
+
+# --- Helper: Figures shared by all sessions (bounded LRU, see figure_cache.py) ---
+@st.cache_resource
+def figure_store():
+    return figure_cache.FigureCache()
+
+# --- Helper: Build (or fetch) and send one chart as a profiled stage ---
+# With a data version, the figure is cached under the chart name, the version
+# and `state` (the filters and any chart-specific inputs), so reruns that do
+# not change a chart's inputs, from any session, reuse the built figure.
+# Cached figures are shared, so `build` must return a new figure that nothing
+# modifies afterwards.
+def show_chart(name, build, version=None, state=(), **kwargs):
+    with profiler.stage(f"chart.{name}") as stage:
+        if version is None:
+            fig = build()
+        else:
+            cache = figure_store()
+            fig, hit = cache.get_or_build(cache.key(name, version, *state), build)
+            stage.note("figure_cache", "hit" if hit else "miss")
+        stage.split("build")
+        event = st.plotly_chart(fig, use_container_width=True, **kwargs)
+        stage.payload(fig)
+    return event
+
+# --- Helper: Ingest new files and load the partitioned store ---
+# New or changed detection files under FIRE_DATA_DIR (yearly exports and daily
+# near-real-time files, see ingest.py) are appended to the year/month store;
+# the cache keys are stat-only signatures, so a rerun costs a few os.stat calls.
+@st.cache_resource(max_entries=1, show_spinner="Ingesting new MODIS files...")
+def ingest_new_files(files_signature):
+    return ingest.ingest(ingest.discover(), predictor=load_predictor)
+
+@st.cache_resource(max_entries=1, show_spinner="Loading MODIS data...")
+def _load_modis_cached(signature):
+    return ingest.load_frame()
+
+# --- Helper: Fetch the data files and ingest new ones (both data pages) ---
+def prepare_store():
+    try:
+        with profiler.stage("artifacts.dataset"):
+            ensure_artifacts("dataset")
+    except artifacts.ArtifactError as e:
+        st.error(f"Could not download the MODIS data files: {e}")
+    try:
+        with profiler.stage("ingest"):
+            ingested = ingest_new_files(ingest.files_signature(ingest.discover()))
+    except artifacts.ArtifactError as e:
+        # Files without a fire type need the model; retried on the next rerun.
+        st.error(f"Could not download the model to classify new data files: {e}")
+        ingested = {}
+    rejected = [Path(p).name for p, entry in ingested.items() if "error" in entry]
+    if rejected:
+        st.warning(f"Skipped invalid data files: {', '.join(rejected)}")
+
+# --- Helper: Pre-aggregated cube, daily rollup and row sample, updated on ingest ---
+@st.cache_resource(max_entries=1, show_spinner="Aggregating MODIS data...")
+def load_aggregates(signature):
+    return ingest.load_aggregates()
+
+def load_fire_cube(signature):
+    return load_aggregates(signature).cube
+
+# --- Helper: In-memory or streaming mode ---
+# A store too large for the memory limit (or FIRE_STREAMING=1) is never loaded
+# whole: aggregate charts read the cube and rollup saved at ingest, heatmaps the
+# cube's 1° cells, and point charts a uniform sample of the detections.
+@st.cache_resource(max_entries=1)
+def store_row_bytes(signature):
+    return streaming.row_bytes(streaming.fragment_sizes(ingest.STORE_DIR, ingest.fragments(ingest.read_ledger())))
+
+@st.cache_resource(max_entries=1)
+def use_streaming(signature):
+    return os.environ.get("FIRE_STREAMING") == "1" or not streaming.fits_in_memory(ingest.stored_rows(), row_bytes=store_row_bytes(signature))
+
+def load_points(signature):
+    # Rows behind the point charts: every detection, or the sample when streaming.
+    if not use_streaming(signature):
+        return _load_modis_cached(signature)
+    sample = load_aggregates(signature).sample
+    return pd.DataFrame() if sample is None else sample
+
+# --- Helper: Row index behind the sidebar filters ---
+@st.cache_resource(max_entries=1, show_spinner="Indexing MODIS data...")
+def load_filter_index(signature):
+    return filter_engine.FilterIndex(load_points(signature))
+
+# --- Helper: Frame-budgeted animation data (small; cached per filter state) ---
+@st.cache_data(max_entries=16, show_spinner="Building animation frames...")
+def load_animation_frames(signature, area, filter_year, filter_type, filter_conf, freq):
+    drill = load_drill_down(signature, area)[0] if area else None
+    index = load_filter_index(signature) if drill is None else drill["filter_index"]
+    selection = index.select(year=filter_year, type=filter_type, confidence=filter_conf)
+    rows = None if selection.mask is None else selection.rows
+    points = load_points(signature) if drill is None else drill["frame"]
+    frames, freq = animation_frames.build_frames(points, freq, rows=rows)
+    if drill is None and use_streaming(signature) and len(points):
+        # Sample counts scaled up to estimated detections
+        scale = load_aggregates(signature).rows / len(points)
+        frames["count"] = (frames["count"] * scale).round().astype("int64")
+        frames["frp_sum"] = frames["frp_sum"] * scale
+    return frames, freq
+
+# --- Helper: Daily count rollup behind the time-series charts ---
+def load_daily_rollup(signature):
+    return load_aggregates(signature).rollup
+
+# --- Helper: Multi-resolution spatial pyramid for maps and heatmaps ---
+@st.cache_resource(max_entries=1, show_spinner="Building map tiles...")
+def load_spatial_pyramid(signature):
+    return spatial_lod.SpatialPyramid(load_points(signature))
+
+# --- Helper: Area/date drill-down through the spatial index (see spatial_index.py) ---
+@st.cache_resource(max_entries=1, show_spinner="Opening the spatial index...")
+def load_spatial_index(signature):
+    return ingest.load_spatial_index()
+
+@st.cache_resource(max_entries=8, show_spinner="Querying the selected area...")
+def load_drill_down(signature, area):
+    # The detections in `area` (spatial_index.query arguments) with the cube,
+    # rollup, filter index and pyramid built from them, which stand in for the
+    # whole-archive ones. (None, rows) when nothing matches or, in streaming
+    # mode, the matches would not fit in memory.
+    index = load_spatial_index(signature)
+    rows = index.query(**dict(area))
+    if not len(rows) or (use_streaming(signature) and not streaming.fits_in_memory(len(rows), row_bytes=store_row_bytes(signature))):
+        return None, len(rows)
+    frame = index.frame(rows)
+    return {
+        "frame": frame,
+        "cube": fire_cube.build_cube(frame),
+        "rollup": daily_rollup.DailyRollup.build(frame),
+        "filter_index": filter_engine.FilterIndex(frame),
+        "pyramid": spatial_lod.SpatialPyramid(frame),
+    }, len(rows)
+
+def selected_area(event):
+    # The last box or lasso drawn on the area picker, as query arguments.
+    selection = (event or {}).get("selection") or {}
+    if selection.get("lasso"):
+        lasso = selection["lasso"][-1]
+        return {"polygon": tuple(zip(lasso["y"], lasso["x"]))}
+    if selection.get("box"):
+        box = selection["box"][-1]
+        return {"box": (min(box["y"]), max(box["y"]), min(box["x"]), max(box["x"]))}
+    return {}
+
+# --- Helper: Fire events (see events.py), extended with each ingested day ---
+EVENT_CHART_POINTS = 2_000
+
+@st.cache_resource(max_entries=1, show_spinner="Grouping detections into fire events...")
+def load_events(signature):
+    return ingest.load_events()
+
+@st.cache_resource(max_entries=8, show_spinner="Grouping the selected detections into fire events...")
+def load_drill_events(signature, area):
+    return events.build_events(load_drill_down(signature, area)[0]["frame"]).table()
+
+# --- Helper: Model evaluation over the labelled archive (see evaluation.py) ---
+# Keyed by the store and the model pickles; only partitions not yet scored for
+# this model are scored, in a process pool sized by FIRE_MEMORY_LIMIT_MB.
+@st.cache_resource(max_entries=1, show_spinner="Scoring new archive partitions...")
+def load_evaluation(data_signature, model_signature):
+    return evaluation.evaluate()
 
 # --- Main: Prediction Page ---
 if page == "Prediction":
@@ -186,121 +347,191 @@ if page == "Prediction":
     """, unsafe_allow_html=True)
     st.markdown("---")
     
-    col1, col2 = st.columns([1,1])
-    with col1:
-        st.markdown("""
-        <div style='background:#f7fafc;border-radius:12px;padding:20px 18px 18px 18px;box-shadow:0 2px 12px rgba(30,60,114,0.08);margin-bottom:10px;'>
-        <h4 style='color:#2a5298;margin-bottom:18px;'>Input Features</h4>
-        """, unsafe_allow_html=True)
-        brightness = st.slider("Brightness", min_value=200.0, max_value=500.0, value=300.0, step=0.1)
-        bright_t31 = st.slider("Brightness T31", min_value=200.0, max_value=350.0, value=290.0, step=0.1)
-        frp = st.slider("Fire Radiative Power (FRP)", min_value=0.0, max_value=100.0, value=15.0, step=0.1)
-        scan = st.slider("Scan", min_value=0.1, max_value=10.0, value=1.0, step=0.1)
-        track = st.slider("Track", min_value=0.1, max_value=10.0, value=1.0, step=0.1)
-        confidence = st.selectbox("Confidence Level", ["low", "nominal", "high"])
-        confidence_map = {"low": 0, "nominal": 1, "high": 2}
-        confidence_val = confidence_map[confidence]
-        input_data = np.array([[brightness, bright_t31, frp, scan, track, confidence_val]])
-        # Lazy-load model and scaler only when needed
-        scaler = load_scaler()
-        model = load_model()
-        # Ensure input has feature names for scaler (avoid warning)
-        input_df = pd.DataFrame(input_data, columns=scaler.feature_names_in_)
-        scaled_input = scaler.transform(input_df)
-        predict_btn = st.button("🔎 Predict Fire Type", use_container_width=True)
-        st.markdown("</div>", unsafe_allow_html=True)
-        if predict_btn:
+    single_tab, batch_tab = st.tabs(["🔎 Single Prediction", "📦 Batch Prediction"])
+    with single_tab:
+        col1, col2 = st.columns([1,1])
+        with col1:
+            st.markdown("""
+            <div style='background:#f7fafc;border-radius:12px;padding:20px 18px 18px 18px;box-shadow:0 2px 12px rgba(30,60,114,0.08);margin-bottom:10px;'>
+            <h4 style='color:#2a5298;margin-bottom:18px;'>Input Features</h4>
+            """, unsafe_allow_html=True)
+            inputs = {}
+            for feature, (label, low, high, default, step) in fire_model.SLIDER_RANGES.items():
+                inputs[feature] = st.slider(label, min_value=low, max_value=high, value=default, step=step)
+            inputs["confidence"] = st.selectbox("Confidence Level", ["low", "nominal", "high"])
+            input_data = np.array([[fire_model.confidence_value(inputs[c]) if c == "confidence" else inputs[c] for c in fire_model.FEATURE_COLUMNS]])
+            # Lazy-load model and scaler only when needed
+            model_error = None
             try:
-                # Pass DataFrame with feature names to model.predict to avoid warning
-                prediction = model.predict(pd.DataFrame(scaled_input, columns=scaler.feature_names_in_))[0]
-                fire_types = {
-                    0: "Vegetation Fire",
-                    2: "Other Static Land Source",
-                    3: "Offshore Fire"
-                }
-                result = fire_types.get(prediction, "Unknown")
-                st.success(f"**Predicted Fire Type:** {result}")
+                with profiler.stage("predict.load_model"):
+                    scaler, model = load_predictor()
+            except (artifacts.ArtifactError, FileNotFoundError) as e:
+                model_error = e
+                st.error(f"Could not load the model: {e}")
+            predict_btn = st.button("🔎 Predict Fire Type", use_container_width=True, disabled=model_error is not None)
+            st.markdown("</div>", unsafe_allow_html=True)
+            if predict_btn:
+                try:
+                    with profiler.stage("predict.single"):
+                        prediction = fire_model.predict_array(input_data, scaler, model)[0]
+                    result = fire_model.FIRE_TYPES.get(prediction, "Unknown")
+                    st.success(f"**Predicted Fire Type:** {result}")
+                except Exception as e:
+                    st.error(f"Prediction failed: {e}")
+                    import traceback
+                    st.code(traceback.format_exc(), language='python')
+                    # Optionally, log the error to a file or external system here
+
+        with col2:
+            st.markdown("""
+            <div class='fire-legend-anim fire-legend-border' style='background:rgba(20,20,20,0.92);border-radius:20px;padding:24px 22px 22px 22px;box-shadow:0 2px 18px #000a;margin-bottom:12px;position:relative;animation:pulseLegend 2.2s infinite alternate;'>
+            <svg class='fire-wave-bg' style='position:absolute;bottom:0;left:0;width:100%;height:44px;z-index:1;pointer-events:none;opacity:.22;' viewBox='0 0 360 44'><defs><linearGradient id='fireGrad2' x1='0' y1='0' x2='0' y2='1'><stop offset='0%' stop-color='#ffd700'/><stop offset='70%' stop-color='#ff6a00'/><stop offset='100%' stop-color='#b71c1c'/></linearGradient></defs><path d='M0 40 Q 90 10 180 40 T 360 40 V 44 H 0 Z' fill='url(#fireGrad2)'><animate attributeName='d' values='M0 40 Q 90 10 180 40 T 360 40 V 44 H 0 Z;M0 40 Q 90 30 180 10 T 360 40 V 44 H 0 Z;M0 40 Q 90 10 180 40 T 360 40 V 44 H 0 Z' dur='4s' repeatCount='indefinite'/></path></svg>
+            <div class='fire-emoji-spin' style='position:absolute;top:12px;right:24px;font-size:32px;animation:fireGlow 1.6s infinite alternate,spinFire 7s linear infinite;'>🔥</div>
+            <h4 class='fire-shimmer fire-rainbow' style='color:#ffd700;text-shadow:0 2px 12px #ff6a00,0 0 8px #000;margin-bottom:18px;letter-spacing:1px;position:relative;overflow:hidden;'>Fire Type Legend</h4>
+            <ul style='list-style:none;padding-left:0;'>
+                <li style='margin-bottom:14px;transition:background 0.2s;'>
+                    <span class='fire-icon-bounce' style='display:inline-block;width:22px;height:22px;background:linear-gradient(135deg,#ffea00,#ff6a00);border-radius:4px;margin-right:12px;vertical-align:middle;box-shadow:0 2px 8px #ffea00bb;'><span style='font-size:18px;position:relative;top:-2px;left:2px;'>🌲</span></span>
+                    <b style='color:#ffea00;text-shadow:0 2px 8px #ff6a00,0 0 4px #000;'>Vegetation Fire</b>: <span style='color:#fff;text-shadow:0 1px 4px #000;'>Wildfires, forest and grassland fires</span>
+                </li>
+                <li style='margin-bottom:14px;transition:background 0.2s;'>
+                    <span class='fire-icon-bounce' style='display:inline-block;width:22px;height:22px;background:linear-gradient(135deg,#b0bec5,#263238);border-radius:4px;margin-right:12px;vertical-align:middle;box-shadow:0 2px 8px #b0bec599;'><span style='font-size:18px;position:relative;top:-2px;left:2px;'>🏭</span></span>
+                    <b style='color:#b0bec5;text-shadow:0 2px 8px #263238,0 0 4px #000;'>Other Static Land Source</b>: <span style='color:#fff;text-shadow:0 1px 4px #000;'>Industrial, urban, or landfill fires</span>
+                </li>
+                <li style='margin-bottom:14px;transition:background 0.2s;'>
+                    <span class='fire-icon-bounce' style='display:inline-block;width:22px;height:22px;background:linear-gradient(135deg,#ff9800,#ff512f);border-radius:4px;margin-right:12px;vertical-align:middle;box-shadow:0 2px 8px #ff9800bb;'><span style='font-size:18px;position:relative;top:-2px;left:2px;'>🚢</span></span>
+                    <b style='color:#ff9800;text-shadow:0 2px 8px #ff512f,0 0 4px #000;'>Offshore Fire</b>: <span style='color:#fff;text-shadow:0 1px 4px #000;'>Oil/gas platform or ship fires</span>
+                </li>
+            </ul>
+            <div class='fire-particles'><div class='f3'></div><div class='f4'></div><div class='f5'></div><div class='f6'></div><div class='f7'></div><div class='f8'></div></div>
+            <style>
+            @keyframes fireGlow{0%{filter:drop-shadow(0 0 6px #ffd700);}100%{filter:drop-shadow(0 0 16px #ff6a00);}}
+            @keyframes pulseLegend{0%{box-shadow:0 2px 18px #000a,0 0 24px #ff980055;}100%{box-shadow:0 2px 28px #ffd70099,0 0 44px #ff6a00bb;}}
+            @keyframes bounceFireIcon{0%{transform:translateY(0);}50%{transform:translateY(-8px) scale(1.15);}100%{transform:translateY(0);}}
+            .fire-icon-bounce{animation:bounceFireIcon 1.8s infinite cubic-bezier(.6,.05,.4,.95);}
+            .fire-legend-border{box-shadow:0 0 0 4px #ff980055,0 0 24px #ffd70099,0 0 44px #ff6a00bb,0 2px 18px #000a;animation:glowBorder 2.8s infinite alternate;}
+            @keyframes glowBorder{0%{box-shadow:0 0 0 4px #ff980055,0 0 24px #ffd70099,0 0 44px #ff6a00bb,0 2px 18px #000a;}100%{box-shadow:0 0 0 8px #ffd70077,0 0 44px #ff6a00cc,0 0 64px #ffd700bb,0 2px 28px #000a;}}
+            .fire-emoji-spin{animation:fireGlow 1.6s infinite alternate,spinFire 7s linear infinite;display:inline-block;}
+            @keyframes spinFire{0%{transform:rotate(0deg);}100%{transform:rotate(360deg);}}
+            .fire-shimmer:after{content:'';position:absolute;top:0;left:-60px;width:60px;height:100%;background:linear-gradient(120deg,rgba(255,255,255,0.18) 0%,rgba(255,255,255,0.48) 60%,rgba(255,255,255,0.12) 100%);transform:skewX(-22deg);animation:shimmerFire 2.8s infinite;z-index:2;}
+            .fire-rainbow:before{content:'';position:absolute;top:0;left:0;width:100%;height:100%;background:linear-gradient(90deg,#ffd700,#ff6a00,#ff512f,#ffd700,#ff6a00,#ffd700);background-size:400% 100%;opacity:.18;z-index:1;animation:rainbowFire 3.2s linear infinite;pointer-events:none;}
+            @keyframes shimmerFire{0%{left:-60px;}100%{left:120%;}}
+            @keyframes rainbowFire{0%{background-position:0% 50%;}100%{background-position:100% 50%;}}
+            .fire-particles{position:absolute;left:0;top:0;width:100%;height:100%;pointer-events:none;z-index:2;}
+            .fire-particles:before,.fire-particles:after,.fire-particles .f3,.fire-particles .f4,.fire-particles .f5,.fire-particles .f6,.fire-particles .f7,.fire-particles .f8{
+              content:'';position:absolute;border-radius:50%;background:radial-gradient(circle,#ffd700 0%,#ff6a00 70%,#0000 100%);opacity:.7;
+            }
+            .fire-particles:before{left:50%;top:85%;width:8px;height:8px;animation:floatFire 2.2s infinite linear;}
+            .fire-particles:after{left:60%;top:80%;width:6px;height:6px;opacity:.5;animation:floatFire2 2.6s infinite linear;}
+            .fire-particles .f3{left:40%;top:90%;width:10px;height:10px;opacity:.4;animation:floatFire3 3.2s infinite linear;}
+            .fire-particles .f4{left:70%;top:88%;width:7px;height:7px;opacity:.6;animation:floatFire4 2.3s infinite linear;}
+            .fire-particles .f5{left:30%;top:92%;width:9px;height:9px;opacity:.5;animation:floatFire5 2.7s infinite linear;}
+            .fire-particles .f6{left:80%;top:93%;width:8px;height:8px;opacity:.4;animation:floatFire6 2.1s infinite linear;}
+            .fire-particles .f7{left:20%;top:95%;width:11px;height:11px;opacity:.3;animation:floatFire7 3.5s infinite linear;}
+            .fire-particles .f8{left:85%;top:91%;width:7px;height:7px;opacity:.5;animation:floatFire8 2.9s infinite linear;}
+            @keyframes floatFire{0%{top:85%;opacity:.7;}50%{top:40%;opacity:.3;}100%{top:10%;opacity:0;}}
+            @keyframes floatFire2{0%{top:80%;opacity:.5;}50%{top:50%;opacity:.2;}100%{top:18%;opacity:0;}}
+            @keyframes floatFire3{0%{top:90%;opacity:.4;}50%{top:60%;opacity:.2;}100%{top:8%;opacity:0;}}
+            @keyframes floatFire4{0%{top:88%;opacity:.6;}50%{top:60%;opacity:.3;}100%{top:15%;opacity:0;}}
+            @keyframes floatFire5{0%{top:92%;opacity:.5;}50%{top:65%;opacity:.2;}100%{top:12%;opacity:0;}}
+            @keyframes floatFire6{0%{top:93%;opacity:.4;}50%{top:62%;opacity:.1;}100%{top:18%;opacity:0;}}
+            @keyframes floatFire7{0%{top:95%;opacity:.3;}50%{top:70%;opacity:.1;}100%{top:10%;opacity:0;}}
+            @keyframes floatFire8{0%{top:91%;opacity:.5;}50%{top:58%;opacity:.2;}100%{top:19%;opacity:0;}}
+            .stButton > button{animation:btnPulse 2.2s infinite alternate;box-shadow:0 2px 8px #ff980044,0 0 18px #ffd70055 inset;}
+            .stButton > button:hover{animation:btnPulseHover .8s infinite alternate !important;box-shadow:0 2px 16px #ffd70099,0 0 32px #ff9800cc !important;}
+            @keyframes btnPulse{0%{box-shadow:0 2px 8px #ff980044,0 0 18px #ffd70055 inset;}100%{box-shadow:0 2px 18px #ffd70099,0 0 28px #ffd70055 inset;}}
+            @keyframes btnPulseHover{0%{box-shadow:0 2px 16px #ffd70099,0 0 32px #ff9800cc;}100%{box-shadow:0 2px 24px #ff9800cc,0 0 48px #ffd700cc;}}
+            </style>
+            </div>
+            """, unsafe_allow_html=True)
+            st.image("https://images.unsplash.com/photo-1464983953574-0892a716854b?auto=format&fit=crop&w=600&q=80", caption="MODIS Satellite Fire Detection", use_container_width=True)
+
+        # --- What-if sweep: one batched call over a grid of slider values ---
+        st.markdown("---")
+        st.markdown("#### 🧭 What-if Sweep")
+        st.caption("Varies one or two inputs across a range while the others stay at the values above. The whole grid is scored in one batched model call, and each grid is kept for this model and these fixed inputs.")
+        slider_features = list(fire_model.SLIDER_RANGES)
+        feature_label = lambda f: fire_model.SLIDER_RANGES[f][0] if f else "Nothing (1-D sweep)"
+        sweep_x_col, sweep_y_col = st.columns([1, 1])
+        with sweep_x_col:
+            x_feature = st.selectbox("Sweep", slider_features, index=slider_features.index("frp"), format_func=feature_label)
+            x_range = st.slider(f"{feature_label(x_feature)} range", *fire_model.SLIDER_RANGES[x_feature][1:3], value=fire_model.SLIDER_RANGES[x_feature][1:3])
+        with sweep_y_col:
+            y_feature = st.selectbox("Against", [None] + [f for f in slider_features if f != x_feature], format_func=feature_label)
+            if y_feature:
+                y_range = st.slider(f"{feature_label(y_feature)} range", *fire_model.SLIDER_RANGES[y_feature][1:3], value=fire_model.SLIDER_RANGES[y_feature][1:3])
+        if y_feature:
+            axes = ((x_feature, *x_range, sweeps.GRID_POINTS), (y_feature, *y_range, sweeps.GRID_POINTS))
+        else:
+            axes = ((x_feature, *x_range, sweeps.LINE_POINTS),)
+        swept = [axis[0] for axis in axes]
+        fixed = tuple((f, v) for f, v in inputs.items() if f not in swept)
+        try:
+            model_version = evaluation.model_signature()
+            with profiler.stage("predict.sweep"):
+                result = load_sweep(model_version, fixed, axes)
+        except FileNotFoundError as e:
+            st.warning(f"The what-if sweep is keyed on the model pickles, which are missing: {e.filename}")
+        except Exception as e:
+            st.error(f"Sweep failed: {e}")
+        else:
+            x_label = feature_label(x_feature)
+            sweep_state = (fixed, axes)
+            if not y_feature:
+                st.caption(" · ".join(f"**{name}** for {start:g} to {end:g}" for name, start, end in result.segments()))
+                if result.proba is not None:
+                    show_chart("sweep_probability", lambda: charts.sweep_probability(result.probabilities(), x_label), model_version, sweep_state)
+            else:
+                y_label = feature_label(y_feature)
+                class_names = list(fire_model.label_names(result.classes))
+                if result.proba is not None:
+                    shown_class = st.selectbox("Probability of", class_names)
+                    k = class_names.index(shown_class)
+                    show_chart("sweep_surface", lambda: charts.sweep_surface(result.proba[..., k], *result.values, x_label, y_label, f"Probability of {shown_class}"), model_version, sweep_state + (shown_class,))
+                show_chart("sweep_decision", lambda: charts.sweep_decision(result.decision(), *result.values, x_label, y_label, class_names), model_version, sweep_state)
+            st.caption(f"{result.size:,} grid points scored in one call.")
+
+    with batch_tab:
+        st.markdown("#### 📦 Batch Prediction")
+        st.caption("Upload a MODIS/FIRMS detection file (CSV or Parquet). It is scored in chunks and the results are written incrementally, so large daily dumps stay within bounded memory. For files on disk use `python batch_predict.py <input> -o <output>`.")
+        uploaded = st.file_uploader("Detections file", type=["csv", "parquet"])
+        col_fmt, col_chunk = st.columns([1, 1])
+        with col_fmt:
+            out_format = st.radio("Output format", ["csv", "parquet"], horizontal=True)
+        with col_chunk:
+            chunksize = st.number_input("Rows per chunk", min_value=1_000, max_value=1_000_000, value=batch_predict.DEFAULT_CHUNKSIZE, step=10_000)
+        group_events = st.checkbox("Group into fire events", help="Write one row per fire event (detections on touching pixels on consecutive days), typed by the majority of its predictions.")
+        if uploaded is not None and st.button("📦 Score File", use_container_width=True):
+            import tempfile
+            out_path = Path(tempfile.gettempdir()) / f"{Path(uploaded.name).stem}_{'events' if group_events else 'predictions'}.{out_format}"
+            status = st.empty()
+            def show_progress(stats):
+                status.info(f"**{stats['rows']:,}** rows scored  |  **{stats['rows_per_sec']:,.0f}** rows/sec")
+            try:
+                with profiler.stage("predict.batch"):
+                    score = batch_predict.score_events if group_events else batch_predict.score_file
+                    stats = score(uploaded, out_path, *load_predictor(), chunksize=int(chunksize), output_format=out_format, progress=show_progress)
+                grouped = f" into {stats['events']:,} fire events" if group_events else ""
+                st.success(f"Scored {stats['rows']:,} rows ({stats['valid_rows']:,} with valid features){grouped} in {stats['seconds']:.1f}s")
+                with open(out_path, "rb") as f:
+                    st.download_button("⬇️ Download predictions", f, file_name=out_path.name, use_container_width=True)
             except Exception as e:
-                st.error(f"Prediction failed: {e}")
-                import traceback
-                st.code(traceback.format_exc(), language='python')
-                # Optionally, log the error to a file or external system here
-        del model
-        del scaler
-        import gc
-        gc.collect() # Free memory after prediction
-
-    with col2:
-        st.markdown("""
-        <div class='fire-legend-anim fire-legend-border' style='background:rgba(20,20,20,0.92);border-radius:20px;padding:24px 22px 22px 22px;box-shadow:0 2px 18px #000a;margin-bottom:12px;position:relative;animation:pulseLegend 2.2s infinite alternate;'>
-        <svg class='fire-wave-bg' style='position:absolute;bottom:0;left:0;width:100%;height:44px;z-index:1;pointer-events:none;opacity:.22;' viewBox='0 0 360 44'><defs><linearGradient id='fireGrad2' x1='0' y1='0' x2='0' y2='1'><stop offset='0%' stop-color='#ffd700'/><stop offset='70%' stop-color='#ff6a00'/><stop offset='100%' stop-color='#b71c1c'/></linearGradient></defs><path d='M0 40 Q 90 10 180 40 T 360 40 V 44 H 0 Z' fill='url(#fireGrad2)'><animate attributeName='d' values='M0 40 Q 90 10 180 40 T 360 40 V 44 H 0 Z;M0 40 Q 90 30 180 10 T 360 40 V 44 H 0 Z;M0 40 Q 90 10 180 40 T 360 40 V 44 H 0 Z' dur='4s' repeatCount='indefinite'/></path></svg>
-        <div class='fire-emoji-spin' style='position:absolute;top:12px;right:24px;font-size:32px;animation:fireGlow 1.6s infinite alternate,spinFire 7s linear infinite;'>🔥</div>
-        <h4 class='fire-shimmer fire-rainbow' style='color:#ffd700;text-shadow:0 2px 12px #ff6a00,0 0 8px #000;margin-bottom:18px;letter-spacing:1px;position:relative;overflow:hidden;'>Fire Type Legend</h4>
-        <ul style='list-style:none;padding-left:0;'>
-            <li style='margin-bottom:14px;transition:background 0.2s;'>
-                <span class='fire-icon-bounce' style='display:inline-block;width:22px;height:22px;background:linear-gradient(135deg,#ffea00,#ff6a00);border-radius:4px;margin-right:12px;vertical-align:middle;box-shadow:0 2px 8px #ffea00bb;'><span style='font-size:18px;position:relative;top:-2px;left:2px;'>🌲</span></span>
-                <b style='color:#ffea00;text-shadow:0 2px 8px #ff6a00,0 0 4px #000;'>Vegetation Fire</b>: <span style='color:#fff;text-shadow:0 1px 4px #000;'>Wildfires, forest and grassland fires</span>
-            </li>
-            <li style='margin-bottom:14px;transition:background 0.2s;'>
-                <span class='fire-icon-bounce' style='display:inline-block;width:22px;height:22px;background:linear-gradient(135deg,#b0bec5,#263238);border-radius:4px;margin-right:12px;vertical-align:middle;box-shadow:0 2px 8px #b0bec599;'><span style='font-size:18px;position:relative;top:-2px;left:2px;'>🏭</span></span>
-                <b style='color:#b0bec5;text-shadow:0 2px 8px #263238,0 0 4px #000;'>Other Static Land Source</b>: <span style='color:#fff;text-shadow:0 1px 4px #000;'>Industrial, urban, or landfill fires</span>
-            </li>
-            <li style='margin-bottom:14px;transition:background 0.2s;'>
-                <span class='fire-icon-bounce' style='display:inline-block;width:22px;height:22px;background:linear-gradient(135deg,#ff9800,#ff512f);border-radius:4px;margin-right:12px;vertical-align:middle;box-shadow:0 2px 8px #ff9800bb;'><span style='font-size:18px;position:relative;top:-2px;left:2px;'>🚢</span></span>
-                <b style='color:#ff9800;text-shadow:0 2px 8px #ff512f,0 0 4px #000;'>Offshore Fire</b>: <span style='color:#fff;text-shadow:0 1px 4px #000;'>Oil/gas platform or ship fires</span>
-            </li>
-        </ul>
-        <div class='fire-particles'><div class='f3'></div><div class='f4'></div><div class='f5'></div><div class='f6'></div><div class='f7'></div><div class='f8'></div></div>
-        <style>
-        @keyframes fireGlow{0%{filter:drop-shadow(0 0 6px #ffd700);}100%{filter:drop-shadow(0 0 16px #ff6a00);}}
-        @keyframes pulseLegend{0%{box-shadow:0 2px 18px #000a,0 0 24px #ff980055;}100%{box-shadow:0 2px 28px #ffd70099,0 0 44px #ff6a00bb;}}
-        @keyframes bounceFireIcon{0%{transform:translateY(0);}50%{transform:translateY(-8px) scale(1.15);}100%{transform:translateY(0);}}
-        .fire-icon-bounce{animation:bounceFireIcon 1.8s infinite cubic-bezier(.6,.05,.4,.95);}
-        .fire-legend-border{box-shadow:0 0 0 4px #ff980055,0 0 24px #ffd70099,0 0 44px #ff6a00bb,0 2px 18px #000a;animation:glowBorder 2.8s infinite alternate;}
-        @keyframes glowBorder{0%{box-shadow:0 0 0 4px #ff980055,0 0 24px #ffd70099,0 0 44px #ff6a00bb,0 2px 18px #000a;}100%{box-shadow:0 0 0 8px #ffd70077,0 0 44px #ff6a00cc,0 0 64px #ffd700bb,0 2px 28px #000a;}}
-        .fire-emoji-spin{animation:fireGlow 1.6s infinite alternate,spinFire 7s linear infinite;display:inline-block;}
-        @keyframes spinFire{0%{transform:rotate(0deg);}100%{transform:rotate(360deg);}}
-        .fire-shimmer:after{content:'';position:absolute;top:0;left:-60px;width:60px;height:100%;background:linear-gradient(120deg,rgba(255,255,255,0.18) 0%,rgba(255,255,255,0.48) 60%,rgba(255,255,255,0.12) 100%);transform:skewX(-22deg);animation:shimmerFire 2.8s infinite;z-index:2;}
-        .fire-rainbow:before{content:'';position:absolute;top:0;left:0;width:100%;height:100%;background:linear-gradient(90deg,#ffd700,#ff6a00,#ff512f,#ffd700,#ff6a00,#ffd700);background-size:400% 100%;opacity:.18;z-index:1;animation:rainbowFire 3.2s linear infinite;pointer-events:none;}
-        @keyframes shimmerFire{0%{left:-60px;}100%{left:120%;}}
-        @keyframes rainbowFire{0%{background-position:0% 50%;}100%{background-position:100% 50%;}}
-        .fire-particles{position:absolute;left:0;top:0;width:100%;height:100%;pointer-events:none;z-index:2;}
-        .fire-particles:before,.fire-particles:after,.fire-particles .f3,.fire-particles .f4,.fire-particles .f5,.fire-particles .f6,.fire-particles .f7,.fire-particles .f8{
-          content:'';position:absolute;border-radius:50%;background:radial-gradient(circle,#ffd700 0%,#ff6a00 70%,#0000 100%);opacity:.7;
-        }
-        .fire-particles:before{left:50%;top:85%;width:8px;height:8px;animation:floatFire 2.2s infinite linear;}
-        .fire-particles:after{left:60%;top:80%;width:6px;height:6px;opacity:.5;animation:floatFire2 2.6s infinite linear;}
-        .fire-particles .f3{left:40%;top:90%;width:10px;height:10px;opacity:.4;animation:floatFire3 3.2s infinite linear;}
-        .fire-particles .f4{left:70%;top:88%;width:7px;height:7px;opacity:.6;animation:floatFire4 2.3s infinite linear;}
-        .fire-particles .f5{left:30%;top:92%;width:9px;height:9px;opacity:.5;animation:floatFire5 2.7s infinite linear;}
-        .fire-particles .f6{left:80%;top:93%;width:8px;height:8px;opacity:.4;animation:floatFire6 2.1s infinite linear;}
-        .fire-particles .f7{left:20%;top:95%;width:11px;height:11px;opacity:.3;animation:floatFire7 3.5s infinite linear;}
-        .fire-particles .f8{left:85%;top:91%;width:7px;height:7px;opacity:.5;animation:floatFire8 2.9s infinite linear;}
-        @keyframes floatFire{0%{top:85%;opacity:.7;}50%{top:40%;opacity:.3;}100%{top:10%;opacity:0;}}
-        @keyframes floatFire2{0%{top:80%;opacity:.5;}50%{top:50%;opacity:.2;}100%{top:18%;opacity:0;}}
-        @keyframes floatFire3{0%{top:90%;opacity:.4;}50%{top:60%;opacity:.2;}100%{top:8%;opacity:0;}}
-        @keyframes floatFire4{0%{top:88%;opacity:.6;}50%{top:60%;opacity:.3;}100%{top:15%;opacity:0;}}
-        @keyframes floatFire5{0%{top:92%;opacity:.5;}50%{top:65%;opacity:.2;}100%{top:12%;opacity:0;}}
-        @keyframes floatFire6{0%{top:93%;opacity:.4;}50%{top:62%;opacity:.1;}100%{top:18%;opacity:0;}}
-        @keyframes floatFire7{0%{top:95%;opacity:.3;}50%{top:70%;opacity:.1;}100%{top:10%;opacity:0;}}
-        @keyframes floatFire8{0%{top:91%;opacity:.5;}50%{top:58%;opacity:.2;}100%{top:19%;opacity:0;}}
-        .stButton > button{animation:btnPulse 2.2s infinite alternate;box-shadow:0 2px 8px #ff980044,0 0 18px #ffd70055 inset;}
-        .stButton > button:hover{animation:btnPulseHover .8s infinite alternate !important;box-shadow:0 2px 16px #ffd70099,0 0 32px #ff9800cc !important;}
-        @keyframes btnPulse{0%{box-shadow:0 2px 8px #ff980044,0 0 18px #ffd70055 inset;}100%{box-shadow:0 2px 18px #ffd70099,0 0 28px #ffd70055 inset;}}
-        @keyframes btnPulseHover{0%{box-shadow:0 2px 16px #ffd70099,0 0 32px #ff9800cc;}100%{box-shadow:0 2px 24px #ff9800cc,0 0 48px #ffd700cc;}}
-        </style>
-        </div>
-        """, unsafe_allow_html=True)
-        st.image("https://images.unsplash.com/photo-1464983953574-0892a716854b?auto=format&fit=crop&w=600&q=80", caption="MODIS Satellite Fire Detection", use_container_width=True)
+                st.error(f"Batch prediction failed: {e}")
     st.markdown("---")
 
 # --- Main: Data Visualization Page ---
 if page == "Data Visualization":
     st.markdown("<h1 style='color:#d7263d;'>📊 MODIS Fire Data Visualization</h1>", unsafe_allow_html=True)
     st.markdown("---")
+    prepare_store()
+    data_signature = ingest.store_signature()
+    streaming_mode = use_streaming(data_signature)
+    with profiler.stage("load.modis"):
+        modis_df = load_points(data_signature)
     if modis_df.empty:
         st.warning("No MODIS data files found.")
     else:
+        with profiler.stage("load.cube"):
+            cube = load_fire_cube(data_signature)
         # --- Sidebar Filters ---
         with st.sidebar:
             st.markdown("### Data Filters")
@@ -308,25 +539,81 @@ if page == "Data Visualization":
             filter_type = None
             filter_conf = None
             if 'year' in modis_df.columns:
-                years = sorted(modis_df['year'].unique())
+                years = cube.values('year')
                 filter_year = st.multiselect("Year", years, default=years)
             if 'type' in modis_df.columns:
-                types = sorted(modis_df['type'].unique())
+                types = cube.values('type')
                 filter_type = st.multiselect("Fire Type", types, default=types)
             if 'confidence' in modis_df.columns:
-                confs = sorted(modis_df['confidence'].unique())
+                confs = cube.values('confidence')
                 filter_conf = st.multiselect("Confidence", confs, default=confs)
+            st.markdown("### Map Settings")
+            map_zoom = st.slider("Map zoom", min_value=2, max_value=10, value=4, help="Streamlit does not report the map's own pan and zoom back to the app, so this sets the map zoom and the view the heatmap resolution is picked for. With an area selected, the heatmap follows that area instead.")
+            point_budget = st.number_input("Map point budget", min_value=1_000, max_value=500_000, value=spatial_lod.DEFAULT_POINT_BUDGET, step=5_000)
+            heat_level = st.selectbox("Heatmap resolution", ["Auto"] + [f"{level:g}°" for level in spatial_lod.LOD_LEVELS])
+            st.markdown("### Area Drill-down")
+            area_mode = st.radio("Area", ["Map selection", "Radius"], horizontal=True, help="Box- or lasso-select on the area picker map, or pick a point and radius.")
+            area = {}
+            if area_mode == "Radius":
+                center_lat = st.number_input("Latitude", min_value=-90.0, max_value=90.0, value=22.5, step=0.1)
+                center_lon = st.number_input("Longitude", min_value=-180.0, max_value=180.0, value=80.0, step=0.1)
+                radius_km = st.number_input("Radius (km)", min_value=1.0, max_value=2_000.0, value=25.0, step=5.0)
+                area.update(center=(center_lat, center_lon), radius_km=radius_km)
+            else:
+                area.update(selected_area(st.session_state.get("area_picker")))
+            days = load_daily_rollup(data_signature).counts["acq_date"]
+            first_day, last_day = days.min().date(), days.max().date()
+            date_range = st.date_input("Date range", value=(first_day, last_day), min_value=first_day, max_value=last_day)
+            if len(date_range) == 2 and tuple(date_range) != (first_day, last_day):
+                area.update(start=str(date_range[0]), end=str(date_range[1]))
+        # --- Area drill-down ---
+        # A selected area or date range is answered by the spatial index; the
+        # charts below then read a cube, rollup and row index of just those rows.
+        area = tuple(sorted(area.items()))
+        drill = None
+        if area:
+            with profiler.stage("drill_down"):
+                drill, area_rows = load_drill_down(data_signature, area)
+            if drill is None:
+                if area_rows:
+                    st.warning(f"The selection holds {area_rows:,} detections, too many to load within the memory limit; showing all data.")
+                else:
+                    st.warning("No detections in the selected area and dates; showing all data.")
+                area = ()
         # --- Apply Filters ---
-        filtered_df = modis_df.copy()
-        if filter_year is not None:
-            filtered_df = filtered_df[filtered_df['year'].isin(filter_year)]
-        if filter_type is not None:
-            filtered_df = filtered_df[filtered_df['type'].isin(filter_type)]
-        if filter_conf is not None:
-            filtered_df = filtered_df[filtered_df['confidence'].isin(filter_conf)]
+        # Aggregate charts read a slice of the pre-aggregated cube; raw-point charts
+        # read a row selection from the filter index (no copy of the frame).
+        # Inputs shared by every cached figure; chart-specific ones are added per chart.
+        data_version = (data_signature, streaming_mode)
+        filters = (filter_year, filter_type, filter_conf, area)
+        with profiler.stage("filter.apply"):
+            filtered_cube = (cube if drill is None else drill["cube"]).slice(year=filter_year, type=filter_type, confidence=filter_conf)
+            filter_index = load_filter_index(data_signature) if drill is None else drill["filter_index"]
+            selection = filter_index.select(year=filter_year, type=filter_type, confidence=filter_conf)
+        coarse_heatmap = streaming_mode and drill is None
+        if {'latitude', 'longitude'}.issubset(modis_df.columns):
+            with profiler.stage("load.pyramid"):
+                pyramid = load_spatial_pyramid(data_signature) if drill is None else drill["pyramid"]
+            # The heatmap view: the selected area's bounding box when there is
+            # one, else the viewport the zoom slider gives around the data.
+            area_bounds = spatial_index.query_bounds(**{k: v for k, v in area if k in ("box", "center", "radius_km", "polygon")})
+            lod_bounds = area_bounds or spatial_lod.view_bounds(*pyramid.center, map_zoom)
+            lod_level = spatial_lod.choose_level(lod_bounds) if heat_level == "Auto" else float(heat_level.rstrip("°"))
+            lod_rows = None if selection.mask is None else selection.rows
+            if coarse_heatmap:
+                lod_level = max(lod_level, 1.0)  # the cube's finest cells
+
+            def heat_cells(by=None):
+                if coarse_heatmap:
+                    return filtered_cube.grid(lod_level, by=by, bounds=lod_bounds)
+                return pyramid.cells(lod_level, rows=lod_rows, by=by, bounds=lod_bounds)
 
         # --- Summary Stats Panel ---
-        st.info(f"**Total Records:** {len(filtered_df)}  |  **Years:** {', '.join(map(str, sorted(filtered_df['year'].unique())))}  |  **Fire Types:** {', '.join(map(str, sorted(filtered_df['type'].unique())))}")
+        st.info(f"**Total Records:** {filtered_cube.total}  |  **Years:** {', '.join(map(str, filtered_cube.values('year')))}  |  **Fire Types:** {', '.join(map(str, filtered_cube.values('type')))}")
+        if drill is not None:
+            st.caption(f"Drill-down: {len(drill['frame']):,} detections in the selected area and dates.")
+        elif streaming_mode:
+            st.caption(f"Streaming mode: the map, animation and scatter charts use a uniform sample of {len(modis_df):,} of {load_aggregates(data_signature).rows:,} detections; heatmaps use 1° cells.")
         st.markdown("---")
 
         # --- Expanders for Chart Groups ---
@@ -340,139 +627,183 @@ if page == "Data Visualization":
             st.caption("Animated bar, scatter, and line charts showing trends and patterns over time.")
             # (Insert all animated charts here, using filtered_df)
         st.markdown("---")
-        st.caption("Data Source: NASA MODIS Fire Detections (2021-2023)")
 
         # Fire type distribution (Bar)
         if 'type' in modis_df.columns:
-            fire_type_counts = modis_df['type'].value_counts().rename_axis('Type').reset_index(name='Count')
-            fig1 = px.bar(fire_type_counts, x='Type', y='Count', color='Type', title="Fire Type Distribution", color_discrete_sequence=px.colors.qualitative.Set1)
-            st.plotly_chart(fig1, use_container_width=True)
+            show_chart("fire_type_bar", lambda: charts.fire_type_bar(filtered_cube), data_version, filters)
             # Pie chart of fire types
-            fig1_pie = px.pie(fire_type_counts, names='Type', values='Count', title="Fire Type Proportion", color_discrete_sequence=px.colors.qualitative.Set1)
-            st.plotly_chart(fig1_pie, use_container_width=True)
+            show_chart("fire_type_pie", lambda: charts.fire_type_pie(filtered_cube), data_version, filters)
         
         # Confidence level pie chart (already present, but move up)
         if 'confidence' in modis_df.columns:
-            conf_counts = modis_df['confidence'].value_counts().rename_axis('Confidence').reset_index(name='Count')
-            fig3 = px.pie(conf_counts, names='Confidence', values='Count', title="Confidence Level Distribution", color_discrete_sequence=px.colors.qualitative.Pastel)
-            st.plotly_chart(fig3, use_container_width=True)
+            show_chart("confidence_pie", lambda: charts.confidence_pie(filtered_cube), data_version, filters)
         
         # Bar chart: Fire counts by year
         if 'year' in modis_df.columns:
-            year_counts = modis_df['year'].value_counts().sort_index().rename_axis('Year').reset_index(name='Count')
-            fig_year = px.bar(year_counts, x='Year', y='Count', title="Fire Counts by Year", color='Year', color_discrete_sequence=px.colors.qualitative.Dark2)
-            st.plotly_chart(fig_year, use_container_width=True)
+            show_chart("year_bar", lambda: charts.year_bar(filtered_cube), data_version, filters)
         
-        # Box plot: FRP by fire type
+        # Box plot: FRP by fire type (from the FRP quantile sketch)
         if {'frp', 'type'}.issubset(modis_df.columns):
-            fig_box = px.box(modis_df, x='type', y='frp', color='type', title="FRP Distribution by Fire Type", color_discrete_sequence=px.colors.qualitative.Set2)
-            st.plotly_chart(fig_box, use_container_width=True)
+            show_chart("frp_box", lambda: charts.frp_box(filtered_cube), data_version, filters)
         
         # FRP distribution (Histogram)
         if 'frp' in modis_df.columns:
             st.subheader("FRP (Fire Radiative Power) Distribution")
-            fig2 = px.histogram(modis_df, x='frp', nbins=50, title="FRP Histogram", color_discrete_sequence=['#d7263d'])
-            st.plotly_chart(fig2, use_container_width=True)
+            show_chart("frp_histogram", lambda: charts.frp_histogram(filtered_cube), data_version, filters)
         
         # Heatmap: Fire counts by lat/lon grid (if available)
         if {'latitude', 'longitude'}.issubset(modis_df.columns):
             st.subheader("Recent Fire Locations in India")
-            st.map(modis_df[['latitude', 'longitude']].dropna(), zoom=4)
-            # Heatmap
-            heatmap_df = modis_df[['latitude', 'longitude']].dropna().copy()
-            if not heatmap_df.empty:
-                heatmap_df['lat_bin'] = (heatmap_df['latitude'] // 1) * 1
-                heatmap_df['lon_bin'] = (heatmap_df['longitude'] // 1) * 1
-                grid_counts = heatmap_df.groupby(['lat_bin', 'lon_bin']).size().reset_index(name='Count')
-                fig_heat = px.density_heatmap(grid_counts, x='lon_bin', y='lat_bin', z='Count', nbinsx=30, nbinsy=30, color_continuous_scale='YlOrRd', title="Fire Density Heatmap (1° grid)")
-                st.plotly_chart(fig_heat, use_container_width=True)
+            # Raw points are capped at the point budget with a uniform sample
+            with profiler.stage("chart.map") as stage:
+                map_points = selection.frame(['latitude', 'longitude']).dropna()
+                shown_points = spatial_lod.sample_points(map_points, int(point_budget))
+                stage.split("build")
+                if len(shown_points) < len(map_points):
+                    st.caption(f"Showing a uniform sample of {len(shown_points):,} of {len(map_points):,} detections (point budget).")
+                st.map(shown_points, zoom=map_zoom)
+                stage.payload(shown_points)
+            # Heatmap at a resolution picked from the map zoom
+            if len(selection):
+                show_chart("density_heatmap", lambda: charts.density_heatmap(heat_cells(), lod_level), data_version, filters + (lod_level, lod_bounds))
+            # Area picker: always over the whole archive, so a selection can be redrawn
+            st.subheader("Drill Down: Select an Area")
+            st.caption("Box- or lasso-select detections to narrow every chart on this page to that area; double-click to clear. The sidebar has a radius search and a date range.")
+            base_selection = selection if drill is None else load_filter_index(data_signature).select(year=filter_year, type=filter_type, confidence=filter_conf)
+            show_chart("area_picker", lambda: charts.area_picker(spatial_lod.sample_points(base_selection.frame(['latitude', 'longitude']).dropna())), data_version, filters[:3],
+                       key="area_picker", on_select="rerun", selection_mode=("box", "lasso"))
         
         # Pie chart: fires by year
         if 'year' in modis_df.columns:
-            year_counts = modis_df['year'].value_counts().sort_index().rename_axis('Year').reset_index(name='Count')
-            fig_year_pie = px.pie(year_counts, names='Year', values='Count', title="Fires by Year (Pie Chart)", color_discrete_sequence=px.colors.qualitative.Set3)
-            st.plotly_chart(fig_year_pie, use_container_width=True)
+            show_chart("year_pie", lambda: charts.year_pie(filtered_cube), data_version, filters)
 
         # Pie chart of top N locations (region/state)
         for loc_col in ['region', 'state', 'district', 'subdivision']:
             if loc_col in modis_df.columns:
                 st.subheader(f"Top 10 {loc_col.title()}s by Fire Count (Pie Chart)")
-                loc_counts = modis_df[loc_col].value_counts().nlargest(10).rename_axis(loc_col.title()).reset_index(name='Count')
-                fig_loc = px.pie(loc_counts, names=loc_col.title(), values='Count', title=f"Top 10 {loc_col.title()}s", color_discrete_sequence=px.colors.qualitative.Bold)
-                st.plotly_chart(fig_loc, use_container_width=True)
+                show_chart("top_locations_pie", lambda: charts.top_locations_pie(filtered_cube, loc_col), data_version, filters + (loc_col,))
                 break  # Only show for the first found location column
 
         # Animated scatter plot of fire detections over time
         if {'acq_date', 'latitude', 'longitude'}.issubset(modis_df.columns):
             st.subheader("Animated Fire Detections Over Time")
-            anim_df = modis_df.dropna(subset=['acq_date', 'latitude', 'longitude']).copy()
-            anim_df['acq_date'] = pd.to_datetime(anim_df['acq_date'], errors='coerce')
-            anim_df = anim_df.dropna(subset=['acq_date'])
+            anim_freq = st.radio("Animation frame", list(animation_frames.FRAME_FREQS), horizontal=True)
+            # Grid-binned counts per frame within per-frame / total point budgets
+            with profiler.stage("load.animation_frames"):
+                anim_df, used_freq = load_animation_frames(data_signature, area, filter_year, filter_type, filter_conf, animation_frames.FRAME_FREQS[anim_freq])
             if not anim_df.empty:
-                # Use date as string for animation_frame
-                anim_df['date_str'] = anim_df['acq_date'].dt.strftime('%Y-%m-%d')
-                fig_anim = px.scatter_geo(
-                    anim_df,
-                    lat='latitude',
-                    lon='longitude',
-                    color='type' if 'type' in anim_df.columns else None,
-                    animation_frame='date_str',
-                    title="Fire Detections Animation (by Day)",
-                    projection="natural earth",
-                    color_discrete_sequence=px.colors.qualitative.Prism,
-                    opacity=0.7,
-                    height=600
-                )
-                fig_anim.update_geos(fitbounds="locations", visible=False)
-                st.plotly_chart(fig_anim, use_container_width=True)
+                freq_label = {v: k for k, v in animation_frames.FRAME_FREQS.items()}[used_freq]
+                if freq_label != anim_freq:
+                    st.caption(f"Too many {anim_freq.lower()} frames for the point budget; showing one frame per {freq_label.lower()}.")
+                show_chart("fire_animation", lambda: charts.fire_animation(anim_df, freq_label), data_version, filters + (used_freq,))
 
         # Animated bar chart: Top states/regions by fire count over years
         for loc_col in ['state', 'region', 'district', 'subdivision']:
             if {'year', loc_col}.issubset(modis_df.columns):
                 st.subheader(f"Animated Bar Chart: Top {loc_col.title()}s by Fire Count Over Years")
-                bar_df = modis_df.groupby(['year', loc_col]).size().reset_index(name='Count')
-                bar_df = bar_df.sort_values(['year', 'Count'], ascending=[True, False])
-                fig_bar_anim = px.bar(bar_df, x=loc_col, y='Count', color=loc_col, animation_frame='year', range_y=[0, bar_df['Count'].max()*1.1], title=f"Top {loc_col.title()}s by Fire Count (Animated)", color_discrete_sequence=px.colors.qualitative.G10)
-                st.plotly_chart(fig_bar_anim, use_container_width=True)
+                show_chart("locations_by_year_bar", lambda: charts.locations_by_year_bar(filtered_cube, loc_col), data_version, filters + (loc_col,))
                 break
 
         # Animated heatmap: Fire density by year
         if {'latitude', 'longitude', 'year'}.issubset(modis_df.columns):
             st.subheader("Animated Heatmap: Fire Density by Year")
-            heat_df = modis_df.dropna(subset=['latitude', 'longitude', 'year']).copy()
-            heat_df['lat_bin'] = (heat_df['latitude'] // 1) * 1
-            heat_df['lon_bin'] = (heat_df['longitude'] // 1) * 1
-            grid_counts = heat_df.groupby(['year', 'lat_bin', 'lon_bin']).size().reset_index(name='Count')
-            fig_heat_anim = px.density_heatmap(grid_counts, x='lon_bin', y='lat_bin', z='Count', animation_frame='year', nbinsx=30, nbinsy=30, color_continuous_scale='YlOrRd', title="Fire Density Heatmap by Year (Animated)")
-            st.plotly_chart(fig_heat_anim, use_container_width=True)
+            show_chart("density_heatmap_by_year", lambda: charts.density_heatmap_by_year(heat_cells(by='year'), lod_level), data_version, filters + (lod_level, lod_bounds))
 
         # Animated scatter: FRP vs brightness by year
         if {'frp', 'brightness', 'year'}.issubset(modis_df.columns):
             st.subheader("Animated Scatter: FRP vs Brightness by Year")
-            fig_scatter_anim = px.scatter(modis_df, x='brightness', y='frp', animation_frame='year', color='type' if 'type' in modis_df.columns else None, title="FRP vs Brightness by Year (Animated)", opacity=0.7, color_discrete_sequence=px.colors.qualitative.Safe)
-            st.plotly_chart(fig_scatter_anim, use_container_width=True)
+            show_chart("frp_brightness_scatter", lambda: charts.frp_brightness_scatter(spatial_lod.sample_points(selection.frame(['brightness', 'frp', 'year', 'type']), int(point_budget))), data_version, filters + (int(point_budget),))
 
         # Pie chart: Fire type by year (static, with selector)
         if {'type', 'year'}.issubset(modis_df.columns):
             st.subheader("Fire Type Distribution by Year (Pie Chart)")
-            pie_df = modis_df.groupby(['year', 'type']).size().reset_index(name='Count')
-            years = sorted(pie_df['year'].unique())
-            selected_year = st.selectbox("Select Year for Pie Chart", years, index=0)
-            pie_data = pie_df[pie_df['year'] == selected_year]
-            fig_pie = px.pie(pie_data, names='type', values='Count', title=f"Fire Type Distribution for {selected_year}", color_discrete_sequence=px.colors.qualitative.Pastel)
-            st.plotly_chart(fig_pie, use_container_width=True)
-
-        # Animated line chart: Cumulative fires over time
+            years = filtered_cube.values('year')
+            if years:
+                selected_year = st.selectbox("Select Year for Pie Chart", years, index=0)
+                show_chart("fire_type_by_year_pie", lambda: charts.fire_type_by_year_pie(filtered_cube, selected_year), data_version, filters + (selected_year,))
+
+        # Animated line chart: Cumulative fires over time (from the daily rollup)
         if 'acq_date' in modis_df.columns:
+            with profiler.stage("load.rollup"):
+                rollup = load_daily_rollup(data_signature) if drill is None else drill["rollup"]
             st.subheader("Animated Line Chart: Cumulative Fires Over Time")
-            line_df = modis_df.dropna(subset=['acq_date']).copy()
-            line_df['acq_date'] = pd.to_datetime(line_df['acq_date'], errors='coerce')
-            line_df = line_df.dropna(subset=['acq_date'])
-            line_df = line_df.sort_values('acq_date')
-            line_df['cumulative'] = range(1, len(line_df)+1)
-            line_df['date_str'] = line_df['acq_date'].dt.strftime('%Y-%m-%d')
-            fig_line_anim = px.line(line_df, x='date_str', y='cumulative', title="Cumulative Fires Detected (Animated)", markers=True)
-            st.plotly_chart(fig_line_anim, use_container_width=True)
+            show_chart("cumulative_line", lambda: charts.cumulative_line(rollup.cumulative(year=filter_year, type=filter_type, confidence=filter_conf)), data_version, filters)
+            # Trend chart: weekly detections by fire type
+            st.subheader("Fire Trend: Weekly Detections by Type")
+            show_chart("weekly_trend", lambda: charts.weekly_trend(rollup.series("W", by='type' if 'type' in modis_df.columns else None, year=filter_year, type=filter_type, confidence=filter_conf)), data_version, filters)
+
+        # Fire events: detections of the same fire grouped together
+        if {'latitude', 'longitude', 'acq_date'}.issubset(modis_df.columns):
+            with profiler.stage("load.events"):
+                fire_events = load_events(data_signature) if drill is None else load_drill_events(data_signature, area)
+            if not fire_events.empty:
+                event_selection = events.select(fire_events, year=filter_year, type=filter_type)
+                event_filters = (filter_year, filter_type, area)
+                st.subheader("Fire Events")
+                st.caption(f"{len(event_selection):,} events from {int(event_selection['detections'].sum()):,} detections: detections on touching pixels at most {events.MAX_GAP_DAYS} day apart are one event. Events follow the year and fire type filters by start year and majority type.")
+                show_chart("events_weekly", lambda: charts.events_weekly(events.weekly(event_selection)), data_version, event_filters)
+                show_chart("event_scatter", lambda: charts.event_scatter(event_selection.nlargest(EVENT_CHART_POINTS, 'frp_sum')), data_version, event_filters)
+                st.dataframe(event_selection.nlargest(20, 'frp_sum')[['event_id', 'start', 'end', 'duration_days', 'detections', 'latitude', 'longitude', 'extent_km', 'frp_sum', 'type', 'type_share']], hide_index=True)
 
         st.markdown("---")
-        st.caption("Data Source: NASA MODIS Fire Detections (2021-2023)")
\ No newline at end of file
+        data_years = cube.values('year')
+        st.caption(f"Data Source: NASA MODIS Fire Detections ({data_years[0]}-{data_years[-1]})")
+
+# --- Main: Model Evaluation Page ---
+if page == "Model Evaluation":
+    st.markdown("<h1 style='color:#d7263d;'>🧪 Model Evaluation & Drift</h1>", unsafe_allow_html=True)
+    st.markdown("---")
+    prepare_store()
+    report = None
+    try:
+        with profiler.stage("artifacts.model"):
+            ensure_artifacts("model")
+        data_signature = ingest.store_signature()
+        model_signature = evaluation.model_signature()
+        with profiler.stage("evaluate"):
+            report = load_evaluation(data_signature, model_signature)
+    except artifacts.ArtifactError as e:
+        st.error(f"Could not download the model: {e}")
+    except FileNotFoundError as e:
+        # A deploy with only the compiled export: the evaluation cache is keyed on the pickles.
+        st.warning(f"Model evaluation needs the model pickles, which are missing: {e.filename}")
+    if report is not None and not report.rows:
+        st.warning("No labelled MODIS detections found.")
+    elif report is not None:
+        years = report.years()
+        with st.sidebar:
+            st.markdown("### Evaluation")
+            eval_years = st.multiselect("Evaluated years", years, default=years) or years
+            reference_years = st.multiselect("Drift reference years", years, default=years[:1]) or years[:1]
+            drift_feature = st.selectbox("Drift feature (map)", fire_model.FEATURE_COLUMNS)
+        eval_version = (data_signature, model_signature)
+        st.info(f"**Labelled detections:** {report.rows:,}  |  **Years:** {', '.join(map(str, years))}  |  Files classified by the model at ingest are left out.")
+
+        st.subheader("Accuracy by Year")
+        show_chart("accuracy_by_year", lambda: charts.accuracy_by_year(report.accuracy_by_year()), eval_version)
+
+        st.subheader("Confusion Matrix and Per-class Metrics")
+        show_chart("confusion_matrix", lambda: charts.confusion_heatmap(report.confusion_matrix(eval_years)), eval_version, (eval_years,))
+        st.dataframe(report.class_metrics(eval_years).style.format({"precision": "{:.3f}", "recall": "{:.3f}", "f1": "{:.3f}", "support": "{:,}"}), hide_index=True)
+
+        st.subheader("Feature Drift by Year")
+        show_chart("drift_by_year", lambda: charts.drift_heatmap(report.drift_by_year(reference_years)), eval_version, (reference_years,))
+        st.caption(f"Population stability index of each feature against {', '.join(map(str, reference_years))}: below {evaluation.PSI_MODERATE} stable, up to {evaluation.PSI_MAJOR} moderate shift, above that a major shift.")
+
+        st.subheader("Accuracy and Drift by 1° Region")
+        regions = report.regions(eval_years, reference_years)
+        show_chart("region_accuracy", lambda: charts.region_heatmap(regions, "accuracy", "Accuracy by 1° Cell"), eval_version, (eval_years,))
+        if regions[drift_feature].notna().any():
+            show_chart("region_drift", lambda: charts.region_heatmap(regions, drift_feature, f"{drift_feature} Drift by 1° Cell (PSI)"), eval_version, (eval_years, reference_years, drift_feature))
+        st.caption(f"Drift compares each cell with itself in the reference years; cells with fewer than {evaluation.MIN_DRIFT_ROWS:,} detections on either side are left blank.")
+
+# --- Debug panel: this rerun's profile ---
+profile_report = profiler.finish()
+if profile_report is not None:
+    with st.sidebar:
+        st.markdown("### ⏱️ Rerun Profile")
+        st.caption(f"**{profile_report['total_seconds']:.2f}s** total  |  RSS {profile_report['rss_mb']:.0f} MB (peak {profile_report['peak_rss_mb']:.0f} MB)  |  {profile_report['payload_bytes'] / 1024:,.0f} KB of chart data")
+        st.dataframe(profiler.table(), hide_index=True)
+        stats = figure_store().stats()
+        st.caption(f"Figure cache: {stats['entries']} figures, {stats['bytes'] / 2**20:,.1f} MB  |  {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})  |  {stats['evictions']} evicted")
+        st.caption(f"Logged to `{profiler.log_path}`")
@@ -0,0 +1,220 @@
+# --- Model/data artifact fetcher ---
+# Downloads the files listed in artifacts.json concurrently (bounded thread
+# pool). Partial downloads are kept as <name>.part and resumed with an HTTP
+# Range request. Each download is checked against the manifest's size/SHA-256
+# (when pinned) and then atomically renamed into place, so a truncated file is
+# never mistaken for a complete one. Entries without a pinned SHA-256 are not
+# verified; each one is logged as a warning once per process, and an existing
+# copy of one is only reused if this fetcher downloaded it (<name>.fetched).
+#
+#   python artifacts.py fetch --kind model     # model + scaler
+#   python artifacts.py pin                    # record size/SHA-256 of local files
+#
+# FIRE_ARTIFACT_MANIFEST points to another manifest, e.g. one whose URLs are
+# file:// paths or a local HTTP server for testing.
+import argparse
+import hashlib
+import http.client
+import json
+import logging
+import os
+import shutil
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+MANIFEST_PATH = Path(os.environ.get("FIRE_ARTIFACT_MANIFEST", Path(__file__).with_name("artifacts.json")))
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 2
+CHUNK_SIZE = 1 << 20
+# Everything a download can fail with: socket and HTTP errors (URLError is an
+# OSError), a connection dropped mid-body, a malformed URL.
+DOWNLOAD_ERRORS = (OSError, ValueError, http.client.HTTPException)
+
+logger = logging.getLogger(__name__)
+_warned_unpinned = set()
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path) as f:
+        return json.load(f)["artifacts"]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify(artifact, path, check_hash=True):
+    # Returns None when the file matches the manifest, else the reason it does not.
+    size = os.path.getsize(path)
+    if artifact.get("size") is not None and size != artifact["size"]:
+        return f"size {size} != expected {artifact['size']}"
+    if check_hash and artifact.get("sha256") and file_sha256(path) != artifact["sha256"]:
+        return "SHA-256 mismatch"
+    return None
+
+
+def _fetched_path(dest):
+    return dest.with_name(dest.name + ".fetched")
+
+
+def is_complete(artifact, dest):
+    # Whether an existing file can be used without downloading it again. Pinned
+    # files pass on their size, so reruns never re-hash large datasets; an
+    # unpinned one only when its .fetched record (written after a completed
+    # download) still matches its size.
+    if artifact.get("sha256"):
+        return verify(artifact, dest, check_hash=False) is None
+    try:
+        with open(_fetched_path(dest)) as f:
+            return json.load(f)["size"] == os.path.getsize(dest)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def _is_google_drive(url):
+    return urllib.parse.urlparse(url).netloc.endswith("drive.google.com")
+
+
+def _download_url(url, part_path, timeout):
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            return  # nothing left to fetch; verification decides
+        raise
+    with response:
+        if offset and getattr(response, "status", None) != 206:
+            offset = 0  # server ignored the Range header: start over
+        with open(part_path, "ab" if offset else "wb") as f:
+            shutil.copyfileobj(response, f, CHUNK_SIZE)
+
+
+def _download_drive(url, part_path, timeout):
+    try:
+        import gdown
+    except ImportError:
+        # confirm=t skips Drive's "can't scan for viruses" page for large files.
+        _download_url(url + ("&" if "?" in url else "?") + "confirm=t", part_path, timeout)
+        return
+    # gdown's own errors; socket/HTTP errors are DOWNLOAD_ERRORS and retried.
+    exceptions = getattr(gdown, "exceptions", None)
+    gdown_errors = tuple(getattr(exceptions, name) for name in ("FileURLRetrievalError", "DownloadError")
+                         if hasattr(exceptions, name))
+    try:
+        result = gdown.download(url, str(part_path), quiet=True, resume=True)
+    except gdown_errors as e:
+        raise ArtifactError(f"gdown could not download {url}: {e}") from e
+    if result is None:
+        raise ArtifactError(f"gdown could not download {url}")
+
+
+def fetch(artifact, dest_dir=".", retries=DEFAULT_RETRIES, timeout=60):
+    # Returns the final path; new downloads are fully verified.
+    dest = Path(dest_dir) / artifact["name"]
+    if dest.exists() and is_complete(artifact, dest):
+        return dest
+    part_path = dest.with_name(dest.name + ".part")
+    download = _download_drive if _is_google_drive(artifact["url"]) else _download_url
+    last_error = None
+    for _ in range(retries + 1):
+        try:
+            download(artifact["url"], part_path, timeout)
+        except DOWNLOAD_ERRORS + (ArtifactError,) as e:
+            last_error = e  # keep the .part file so the next attempt resumes
+            continue
+        problem = verify(artifact, part_path)
+        if problem is None:
+            size = part_path.stat().st_size
+            os.replace(part_path, dest)
+            if not artifact.get("sha256"):
+                with open(_fetched_path(dest), "w") as f:
+                    json.dump({"size": size}, f)
+            return dest
+        last_error = ArtifactError(f"{artifact['name']}: {problem}")
+        part_path.unlink(missing_ok=True)
+    raise ArtifactError(f"Failed to fetch {artifact['name']}: {last_error}")
+
+
+def fetch_all(kinds=None, names=None, dest_dir=".", manifest=None, max_workers=DEFAULT_WORKERS, **kwargs):
+    # Fetches the selected artifacts concurrently; raises ArtifactError listing
+    # every failure once all downloads have finished.
+    artifacts = manifest if manifest is not None else load_manifest()
+    selected = [a for a in artifacts
+                if (kinds is None or a["kind"] in kinds) and (names is None or a["name"] in names)]
+    for artifact in selected:
+        if not artifact.get("sha256") and artifact["name"] not in _warned_unpinned:
+            _warned_unpinned.add(artifact["name"])
+            logger.warning("%s has no pinned SHA-256 in the manifest; it is not verified "
+                           "(run `python artifacts.py pin` to pin it)", artifact["name"])
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {a["name"]: pool.submit(fetch, a, dest_dir, **kwargs) for a in selected}
+    errors, paths = [], {}
+    for name, future in futures.items():
+        try:
+            paths[name] = future.result()
+        except ArtifactError as e:
+            errors.append(str(e))
+        except DOWNLOAD_ERRORS as e:  # e.g. the final rename, or a size check
+            errors.append(f"Failed to fetch {name}: {e}")
+    if errors:
+        raise ArtifactError("; ".join(errors))
+    return paths
+
+
+def pin(manifest_path=MANIFEST_PATH, dest_dir="."):
+    # Records the size and SHA-256 of the local copies in the manifest.
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    for artifact in manifest["artifacts"]:
+        path = Path(dest_dir) / artifact["name"]
+        if path.exists():
+            artifact["size"] = path.stat().st_size
+            artifact["sha256"] = file_sha256(path)
+    tmp_path = Path(manifest_path).with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, manifest_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch or pin the model and data artifacts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fetch_parser = sub.add_parser("fetch", help="download missing artifacts")
+    fetch_parser.add_argument("--kind", action="append", help="only this kind (model, dataset, notebook); repeatable")
+    fetch_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    fetch_parser.add_argument("--dest", default=".")
+    pin_parser = sub.add_parser("pin", help="record size/SHA-256 of local files in the manifest")
+    pin_parser.add_argument("--dest", default=".")
+    args = parser.parse_args(argv)
+
+    if args.command == "pin":
+        pin(dest_dir=args.dest)
+        print(f"Pinned local artifacts in {MANIFEST_PATH}")
+        return 0
+    try:
+        paths = fetch_all(kinds=args.kind, dest_dir=args.dest, max_workers=args.workers)
+    except ArtifactError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# --- Bulk fire-type scoring for MODIS/FIRMS detection files ---
+# Streams a CSV or Parquet file in fixed-size chunks, scores each chunk with one
+# vectorised scaler/model call and appends the results to a CSV or Parquet file,
+# so memory stays bounded by the chunk size rather than the input size. With
+# --events the scored detections are grouped into fire events (see events.py)
+# and one row per event is written, typed by the majority of its predictions;
+# scored chunks are spilled to temporary files by month and the months folded
+# into the events in date order, so memory stays bounded by one month of
+# detections whatever the order of the file.
+#
+#   python batch_predict.py modis_2023_India.csv -o predictions.parquet
+#   python batch_predict.py modis_2023_India.csv -o events.parquet --events
+import argparse
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+import events
+import fire_model
+
+DEFAULT_CHUNKSIZE = 100_000
+NUMERIC_COLUMNS = ["latitude", "longitude", "brightness", "scan", "track", "bright_t31", "frp"]
+
+
+def _is_parquet(source, fmt=None):
+    if fmt is not None:
+        return fmt == "parquet"
+    name = getattr(source, "name", source)
+    return str(name).lower().endswith((".parquet", ".pq"))
+
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE, fmt=None):
+    # source may be a path or a binary file-like object (e.g. a Streamlit upload).
+    if _is_parquet(source, fmt):
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        # Inferred per chunk, a column can come out as float in one chunk and as
+        # text in the next (FIRMS "version": 61.03 vs 6.1NRT), which the fixed
+        # output schema rejects. The numeric features are read as float and
+        # every other column as text, the same in every chunk.
+        dtype = defaultdict(lambda: str, {column: "float64" for column in NUMERIC_COLUMNS})
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=dtype)
+
+
+def score_chunk(df, scaler, model):
+    labels, _ = fire_model.predict_frame(df, scaler, model)
+    out = df.copy()
+    out["predicted_type"] = labels
+    out["predicted_label"] = fire_model.label_names(labels)
+    return out
+
+
+class ResultWriter:
+    # Appends scored chunks to a CSV or Parquet file (one row group per chunk)
+    # using the schema of the first chunk. Columns that are empty in the first
+    # chunk are written as text.
+    def __init__(self, path, fmt=None):
+        self.path = Path(path)
+        self.parquet = _is_parquet(self.path, fmt)
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in table.schema],
+                                     metadata=table.schema.metadata)
+            table = table.cast(self._schema)
+            if self.parquet:
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pacsv.CSVWriter(self.path, self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _update(stats, scored, start, progress):
+    stats["rows"] += len(scored)
+    stats["valid_rows"] += int(scored["predicted_type"].notna().sum())
+    stats["chunks"] += 1
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    if progress is not None:
+        progress(dict(stats))
+
+
+def score_file(source, output, scaler, model, chunksize=DEFAULT_CHUNKSIZE, input_format=None,
+               output_format=None, progress=None):
+    # progress(stats) is called after every chunk with the running totals.
+    stats = {"rows": 0, "valid_rows": 0, "chunks": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    start = time.perf_counter()
+    with ResultWriter(output, output_format) as writer:
+        for chunk in iter_chunks(source, chunksize, input_format):
+            scored = score_chunk(chunk, scaler, model)
+            writer.write(scored)
+            _update(stats, scored, start, progress)
+    return stats
+
+
+def _event_columns(scored):
+    return scored[[c for c in events.INPUT_COLUMNS if c in scored.columns] + ["predicted_type"]]
+
+
+def _spill(rows, spill_dir, chunk, spilled):
+    # Writes the rows of each month to their own file; spilled maps a month
+    # (year * 100 + month) to its files. Rows without a date are dropped, as
+    # events.points() drops them.
+    rows = rows.assign(acq_date=pd.to_datetime(rows["acq_date"]))
+    months = rows["acq_date"].dt.year * 100 + rows["acq_date"].dt.month
+    for month, part in rows.groupby(months):
+        path = Path(spill_dir) / f"{int(month)}-{chunk}.parquet"
+        part.to_parquet(path, index=False)
+        spilled[int(month)].append(path)
+
+
+def score_events(source, output, scaler, model, chunksize=DEFAULT_CHUNKSIZE, input_format=None,
+                 output_format=None, progress=None):
+    # Like score_file, but writes the event table. The columns events need are
+    # spilled by month while the file is scored (in one pass), then each month
+    # extends the events in date order: EventBuilder only takes days on or
+    # after the latest one it has seen.
+    stats = {"rows": 0, "valid_rows": 0, "chunks": 0, "seconds": 0.0, "rows_per_sec": 0.0, "events": 0}
+    start = time.perf_counter()
+    builder = events.EventBuilder()
+    with tempfile.TemporaryDirectory(prefix="fire_events_") as spill_dir:
+        spilled = defaultdict(list)
+        for chunk in iter_chunks(source, chunksize, input_format):
+            scored = score_chunk(chunk, scaler, model)
+            _spill(_event_columns(scored), spill_dir, stats["chunks"], spilled)
+            _update(stats, scored, start, progress)
+        for month in sorted(spilled):
+            rows = pd.concat([pd.read_parquet(path) for path in spilled[month]], ignore_index=True)
+            builder.extend(rows, type_column="predicted_type")
+    table = builder.table()
+    if not table.empty:
+        table = table.rename(columns={"type": "predicted_type", "type_share": "predicted_share"})
+        table["predicted_label"] = fire_model.label_names(table["predicted_type"])
+    with ResultWriter(output, output_format) as writer:
+        writer.write(table)
+    stats["events"] = len(table)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score MODIS/FIRMS detections with the fire-type model.")
+    parser.add_argument("input", help="CSV or Parquet file of detections")
+    parser.add_argument("-o", "--output", required=True, help="output .csv or .parquet file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk (default: %(default)s)")
+    parser.add_argument("--model", default=fire_model.MODEL_PATH)
+    parser.add_argument("--scaler", default=fire_model.SCALER_PATH)
+    parser.add_argument("--engine", choices=["compiled", "sklearn"], default="compiled",
+                        help="NumPy-compiled model or the sklearn objects (default: %(default)s)")
+    parser.add_argument("--events", action="store_true", help="write one row per fire event instead of per detection")
+    args = parser.parse_args(argv)
+
+    scaler, model = fire_model.load_predictor(args.model, args.scaler, args.engine)
+
+    def report(stats):
+        print(f"\r{stats['rows']:,} rows scored  |  {stats['rows_per_sec']:,.0f} rows/sec", end="", file=sys.stderr)
+
+    score = score_events if args.events else score_file
+    stats = score(args.input, args.output, scaler, model, chunksize=args.chunksize, progress=report)
+    print(file=sys.stderr)
+    grouped = f" into {stats['events']:,} events" if args.events else ""
+    print(f"Scored {stats['rows']:,} rows ({stats['valid_rows']:,} valid){grouped} in {stats['seconds']:.1f}s "
+          f"-> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
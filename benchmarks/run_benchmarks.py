@@ -0,0 +1,273 @@
+# --- Stage-by-stage benchmarks of the app's data and model paths ---
+# Generates (or reuses) seeded synthetic MODIS CSVs and times every stage the
+# Streamlit app runs: ingestion into the partitioned store (whole archive,
+# loading it back, then one extra day, then a streaming rebuild of the
+# aggregates under a memory limit), fire event building, spatial index
+# queries, filter index and selection, the aggregations behind each Data
+# Visualization chart, Plotly figure construction plus JSON serialisation (with
+# the payload size), and single-row, what-if sweep and batch prediction. Each
+# stage reports wall time and peak traced memory (Python and NumPy allocations
+# via tracemalloc); results are compared against benchmarks/baselines.json and
+# the run exits non-zero on a regression.
+#
+#   python -m benchmarks.run_benchmarks --rows 1M
+#   python -m benchmarks.run_benchmarks --rows 10M 50M --repeat 1
+#   python -m benchmarks.run_benchmarks --rows 1M --update-baseline
+import argparse
+import json
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+import animation_frames
+import batch_predict
+import charts
+import daily_rollup
+import events
+import filter_engine
+import fire_cube
+import fire_model
+import ingest
+import spatial_lod
+import sweeps
+from benchmarks.synthetic_modis import generate, parse_rows
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+DATA_DIR = Path(".bench_data")
+SINGLE_PREDICTIONS = 200
+# A stage regresses when it exceeds its baseline by more than the relative
+# tolerance *and* the absolute slack (which absorbs noise on tiny stages).
+TOLERANCES = {"seconds": (0.30, 0.05), "peak_mb": (0.25, 2.0), "bytes": (0.05, 1024)}
+
+
+def measure(results, name, fn, repeat=1, setup=None):
+    # Times fn `repeat` times untraced (keeping the fastest run), then runs it
+    # once more under tracemalloc for the peak, since tracing slows down
+    # allocation-heavy code by several times.
+    best, value = None, None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    results[name] = {"seconds": round(best, 4), "peak_mb": round(peak, 2)}
+    return value
+
+
+def measure_figure(results, name, build, repeat=1):
+    # Figure stages include to_json(), which is what st.plotly_chart ships.
+    payload = measure(results, f"figure.{name}", lambda: build().to_json(), repeat)
+    results[f"figure.{name}"]["bytes"] = len(payload)
+
+
+def _train_model(sources, work_dir):
+    # Stand-in model for machines without the real pickles (not timed).
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    df = pd.read_csv(sources[0][1], nrows=100_000)
+    X = pd.DataFrame(fire_model.encode_features(df), columns=fire_model.FEATURE_COLUMNS)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=20, max_depth=12, random_state=0)
+    model.fit(pd.DataFrame(scaler.transform(X), columns=fire_model.FEATURE_COLUMNS), df["type"])
+    model_path, scaler_path = work_dir / "model.pkl", work_dir / "scaler.pkl"
+    joblib.dump(model, model_path)
+    joblib.dump(scaler, scaler_path)
+    return model_path, scaler_path
+
+
+def run_suite(sources, work_dir, model_path=None, scaler_path=None, repeat=1):
+    results = {}
+
+    # --- Ingestion: the whole archive, loaded back as the app does, then one
+    # near-real-time day on top ---
+    store_dir, archive_dir = work_dir / "store", work_dir / "store_archive"
+    def clear_store():
+        shutil.rmtree(store_dir, ignore_errors=True)
+    measure(results, "ingest.archive", lambda: ingest.ingest([p for _, p in sources], store_dir), repeat, setup=clear_store)
+    frame = measure(results, "load.store", lambda: ingest.load_frame(store_dir), repeat)
+    shutil.copytree(store_dir, archive_dir)
+    last_day = frame["acq_date"].max()
+    day = frame.loc[frame["acq_date"] == last_day, ingest.DEDUPE_KEYS + ["brightness", "frp", "confidence"]].copy()
+    day["acq_date"] = (last_day + np.timedelta64(1, "D")).strftime("%Y-%m-%d")
+    day_path = work_dir / "nrt_day.csv"
+    day.to_csv(day_path, index=False)
+    def restore_store():
+        clear_store()
+        shutil.copytree(archive_dir, store_dir)
+    measure(results, "ingest.day", lambda: ingest.ingest([day_path], store_dir), repeat, setup=restore_store)
+    results["ingest.day"]["rows"] = len(day)
+    # Streaming rebuild under a memory limit (the out-of-core mode)
+    measure(results, "ingest.rebuild_streaming", lambda: ingest.rebuild_aggregates(store_dir, memory_limit_mb=1024), repeat)
+
+    # --- Fire events: a month-by-month rebuild, then the day extending them ---
+    measure(results, "events.rebuild", lambda: ingest.rebuild_events(store_dir), repeat)
+    event_table = measure(results, "events.load", lambda: ingest.load_events(store_dir), repeat)
+    def restore_with_events():
+        restore_store()
+        ingest.rebuild_events(store_dir)
+    measure(results, "events.ingest_day", lambda: ingest.ingest([day_path], store_dir), repeat, setup=restore_with_events)
+
+    # --- Spatial index: 25 km radius, a 2° box in one month, a lasso polygon ---
+    index = measure(results, "index.open", lambda: ingest.load_spatial_index(store_dir), repeat)
+    lat, lon = float(frame["latitude"].median()), float(frame["longitude"].median())
+    month = str(last_day.to_period("M").start_time.date()), str(last_day.date())
+    measure(results, "index.query_radius", lambda: index.query(center=(lat, lon), radius_km=25), repeat)
+    measure(results, "index.query_box_month", lambda: index.query(box=(lat - 1, lat + 1, lon - 1, lon + 1), start=month[0], end=month[1]), repeat)
+    polygon = [(lat - 3, lon), (lat, lon + 3), (lat + 3, lon), (lat, lon - 3)]
+    measure(results, "index.query_polygon", lambda: index.query(polygon=polygon), repeat)
+
+    # --- Filters: about half of every sidebar filter selected ---
+    index = measure(results, "filter.index_build", lambda: filter_engine.FilterIndex(frame), repeat)
+    selected = {c: index.values(c)[::2] for c in filter_engine.FILTER_COLUMNS if c in frame.columns}
+    selection = measure(results, "filter.select", lambda: index.select(**selected), repeat)
+    measure(results, "filter.gather_points", lambda: selection.frame(["latitude", "longitude"]), repeat)
+    rows = selection.rows
+
+    # --- Aggregations behind the charts ---
+    cube = measure(results, "agg.cube_build", lambda: fire_cube.build_cube(frame), repeat)
+    sliced = measure(results, "agg.cube_slice", lambda: cube.slice(**selected), repeat)
+    measure(results, "agg.counts_by_type", lambda: sliced.counts(["type"]), repeat)
+    measure(results, "agg.counts_by_confidence", lambda: sliced.counts(["confidence"]), repeat)
+    measure(results, "agg.counts_by_year", lambda: sliced.counts(["year"]), repeat)
+    measure(results, "agg.frp_quantiles", lambda: sliced.quantiles("frp", by="type"), repeat)
+    measure(results, "agg.frp_histogram", lambda: sliced.histogram("frp"), repeat)
+    pyramid = measure(results, "agg.pyramid_build", lambda: spatial_lod.SpatialPyramid(frame), repeat)
+    bounds = spatial_lod.view_bounds(*pyramid.center, 4)
+    level = spatial_lod.choose_level(bounds)
+    grid = measure(results, "agg.heatmap_cells", lambda: pyramid.cells(level, rows=rows, bounds=bounds), repeat)
+    grid_by_year = measure(results, "agg.heatmap_cells_by_year", lambda: pyramid.cells(level, rows=rows, by="year", bounds=bounds), repeat)
+    measure(results, "agg.heatmap_cells_cube", lambda: sliced.grid(level, bounds=bounds), repeat)
+    points = measure(results, "agg.sample_points", lambda: spatial_lod.sample_points(selection.frame(["latitude", "longitude"])), repeat)
+    scatter = measure(results, "agg.sample_scatter", lambda: spatial_lod.sample_points(selection.frame(["brightness", "frp", "year", "type"])), repeat)
+    frames, freq = measure(results, "agg.animation_frames", lambda: animation_frames.build_frames(frame, "D", rows=rows), repeat)
+    rollup = measure(results, "agg.rollup_build", lambda: daily_rollup.DailyRollup.build(frame), repeat)
+    cumulative = measure(results, "agg.rollup_cumulative", lambda: rollup.cumulative(**selected), repeat)
+    weekly = measure(results, "agg.rollup_weekly", lambda: rollup.series("W", by="type", **selected), repeat)
+
+    # --- Figures (construction + serialisation) ---
+    freq_label = {v: k for k, v in animation_frames.FRAME_FREQS.items()}[freq]
+    year = sliced.values("year")[0]
+    charts.year_bar(sliced).to_json()  # warm-up: plotly's lazy imports are paid once per process
+    for name, build in [
+        ("fire_type_bar", lambda: charts.fire_type_bar(sliced)),
+        ("fire_type_pie", lambda: charts.fire_type_pie(sliced)),
+        ("confidence_pie", lambda: charts.confidence_pie(sliced)),
+        ("year_bar", lambda: charts.year_bar(sliced)),
+        ("frp_box", lambda: charts.frp_box(sliced)),
+        ("frp_histogram", lambda: charts.frp_histogram(sliced)),
+        ("density_heatmap", lambda: charts.density_heatmap(grid, level)),
+        ("year_pie", lambda: charts.year_pie(sliced)),
+        ("fire_animation", lambda: charts.fire_animation(frames, freq_label)),
+        ("density_heatmap_by_year", lambda: charts.density_heatmap_by_year(grid_by_year, level)),
+        ("frp_brightness_scatter", lambda: charts.frp_brightness_scatter(scatter)),
+        ("fire_type_by_year_pie", lambda: charts.fire_type_by_year_pie(sliced, year)),
+        ("cumulative_line", lambda: charts.cumulative_line(cumulative)),
+        ("weekly_trend", lambda: charts.weekly_trend(weekly)),
+        ("events_weekly", lambda: charts.events_weekly(events.weekly(event_table))),
+        ("event_scatter", lambda: charts.event_scatter(event_table.nlargest(2_000, "frp_sum"))),
+    ]:
+        measure_figure(results, name, build, repeat)
+    results["figure.map_points"] = {"bytes": len(points.to_json(orient="split"))}
+
+    # --- Prediction ---
+    if model_path is None or not Path(model_path).exists():
+        model_path, scaler_path = _train_model(sources, work_dir)
+    scaler, model = None, fire_model.load_compiled(work_dir / "model_compiled.npz", model_path, scaler_path)
+    X = fire_model.encode_features(frame.head(SINGLE_PREDICTIONS))
+    measure(results, "predict.single", lambda: [fire_model.predict_array(X[i:i + 1], scaler, model) for i in range(len(X))], repeat)
+    results["predict.single"]["ms_per_row"] = round(results["predict.single"]["seconds"] / len(X) * 1000, 3)
+    axes = [(f, *fire_model.SLIDER_RANGES[f][1:3], sweeps.GRID_POINTS) for f in ("brightness", "frp")]
+    measure(results, "predict.sweep_2d", lambda: sweeps.sweep(scaler, model, sweeps.default_inputs(), axes), repeat)
+    stats = measure(results, "predict.batch", lambda: batch_predict.score_file(sources[0][1], work_dir / "scored.parquet", scaler, model), repeat)
+    results["predict.batch"]["rows_per_sec"] = round(stats["rows_per_sec"])
+    return results
+
+
+def compare(results, baseline):
+    # Returns human-readable regressions of results against one baseline entry.
+    regressions = []
+    for stage, metrics in results.items():
+        for metric, (relative, absolute) in TOLERANCES.items():
+            old = baseline.get(stage, {}).get(metric)
+            new = metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + relative) and new - old > absolute:
+                regressions.append(f"{stage} {metric}: {new:g} vs baseline {old:g} (+{(new / old - 1) * 100 if old else float('inf'):.0f}%)")
+    return regressions
+
+
+def print_table(label, results, baseline):
+    print(f"\n=== {label} rows ===")
+    print(f"{'stage':<36}{'seconds':>10}{'base':>10}{'peak MB':>10}{'bytes':>12}")
+    for stage, metrics in results.items():
+        base = baseline.get(stage, {}).get("seconds")
+        print(f"{stage:<36}{metrics.get('seconds', ''):>10}{'' if base is None else base:>10}"
+              f"{metrics.get('peak_mb', ''):>10}{metrics.get('bytes', ''):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's load/filter/aggregate/figure/predict stages.")
+    parser.add_argument("--rows", nargs="+", default=["1M"], help="dataset sizes, e.g. 1M 10M 50M")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the fastest is kept (default: %(default)s)")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="where synthetic CSVs are generated and reused")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default=fire_model.MODEL_PATH, help="model pickle (a stand-in is trained if missing)")
+    parser.add_argument("--scaler", default=fire_model.SCALER_PATH)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    all_results, regressions = {}, []
+    for label in args.rows:
+        sources = generate(parse_rows(label), Path(args.data_dir) / label, seed=args.seed)
+        with tempfile.TemporaryDirectory(prefix="fire-bench-") as tmp:
+            results = run_suite(sources, Path(tmp), args.model, args.scaler, args.repeat)
+        all_results[label] = results
+        print_table(label, results, baselines.get(label, {}))
+        if label in baselines and not args.update_baseline:
+            regressions += [f"[{label}] {r}" for r in compare(results, baselines[label])]
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux, bytes on macOS
+    print(f"\nPeak RSS: {max_rss / (2**20 if sys.platform == 'darwin' else 2**10):.0f} MB")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(all_results, indent=2))
+    if args.update_baseline:
+        baselines.update(all_results)
+        baselines["_machine"] = {"platform": platform.platform(), "python": platform.python_version(),
+                                 "numpy": np.__version__}
+        baseline_path.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Baseline updated: {baseline_path}")
+        return 0
+    if regressions:
+        print("\nRegressions:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print("\nNo regressions." if any(label in baselines for label in args.rows) else "\nNo baseline for these sizes yet (use --update-baseline).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
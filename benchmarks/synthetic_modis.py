@@ -0,0 +1,108 @@
+# --- Seeded synthetic MODIS detections for benchmarks ---
+# Writes modis_<year>_India.csv files with the same columns and value ranges as
+# the real FIRMS exports (numeric 0-100 confidence, D/N daynight, Terra/Aqua).
+# Rows are generated and appended in fixed-size chunks, so 50M rows need no
+# more memory than one chunk. The same seed always produces the same files.
+#
+#   python -m benchmarks.synthetic_modis --rows 10M --out .bench_data/10M
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CSV_COLUMNS = [
+    "latitude", "longitude", "brightness", "scan", "track", "acq_date", "acq_time",
+    "satellite", "instrument", "confidence", "version", "bright_t31", "frp", "daynight", "type",
+]
+DEFAULT_YEARS = [2021, 2022, 2023]
+CHUNK_ROWS = 1_000_000
+# A few hundred fixed sites (industry, flares) produce the static land sources;
+# offshore detections cluster on the western shelf.
+N_STATIC_SITES = 300
+OFFSHORE_BOX = (18.5, 20.5, 70.5, 72.0)
+
+
+def parse_rows(text):
+    # "1M" -> 1_000_000, "500k" -> 500_000, "2500" -> 2500.
+    text = str(text).strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def _chunk(rng, n, year, sites):
+    kind = rng.choice([0, 2, 3], n, p=[0.9, 0.08, 0.02])
+    lat = rng.uniform(8.0, 35.0, n)
+    lon = rng.uniform(68.0, 97.0, n)
+    static = kind == 2
+    site = rng.integers(0, len(sites), static.sum())
+    lat[static] = sites[site, 0] + rng.normal(0, 0.01, static.sum())
+    lon[static] = sites[site, 1] + rng.normal(0, 0.01, static.sum())
+    offshore = kind == 3
+    lat[offshore] = rng.uniform(OFFSHORE_BOX[0], OFFSHORE_BOX[1], offshore.sum())
+    lon[offshore] = rng.uniform(OFFSHORE_BOX[2], OFFSHORE_BOX[3], offshore.sum())
+    # Vegetation fires peak in the spring burning season.
+    days = pd.date_range(f"{year}-01-01", f"{year}-12-31")
+    weights = 1.0 + 3.0 * np.exp(-((days.dayofyear.to_numpy() - 90) / 30.0) ** 2)
+    dates = days.to_numpy()[rng.choice(len(days), n, p=weights / weights.sum())]
+    frp = rng.gamma(1.5, 12.0, n) * np.where(static, 3.0, 1.0) * np.where(offshore, 5.0, 1.0)
+    brightness = 300.0 + 12.0 * np.log1p(frp) + rng.normal(0, 6, n)
+    daynight = rng.choice(np.array(["D", "N"]), n, p=[0.7, 0.3])
+    return pd.DataFrame({
+        "latitude": lat.round(4),
+        "longitude": lon.round(4),
+        "brightness": brightness.round(1),
+        "scan": rng.uniform(1.0, 4.8, n).round(1),
+        "track": rng.uniform(1.0, 2.0, n).round(1),
+        "acq_date": pd.DatetimeIndex(dates).strftime("%Y-%m-%d"),
+        "acq_time": np.where(daynight == "D", rng.integers(430, 900, n), rng.integers(1600, 2200, n)),
+        "satellite": rng.choice(np.array(["Terra", "Aqua"]), n),
+        "instrument": "MODIS",
+        "confidence": np.clip(rng.normal(70, 20, n), 0, 100).astype(int),
+        "version": "6.1NRT" if year == max(DEFAULT_YEARS) else "61.03",
+        "bright_t31": (brightness - 25.0 + rng.normal(0, 5, n)).round(1),
+        "frp": frp.round(1),
+        "daynight": daynight,
+        "type": kind,
+    }, columns=CSV_COLUMNS)
+
+
+def generate(rows, out_dir, years=DEFAULT_YEARS, seed=0, chunk_rows=CHUNK_ROWS):
+    # Splits `rows` evenly over `years`; returns [(year, csv_path)] as used by
+    # the benchmarks. Files already generated with the same row count and seed are reused.
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sites = np.random.default_rng([seed, 0]).uniform([8.0, 68.0], [35.0, 97.0], (N_STATIC_SITES, 2))
+    sources = []
+    for i, year in enumerate(years):
+        n_year = rows // len(years) + (1 if i < rows % len(years) else 0)
+        path = out_dir / f"modis_{year}_India.csv"
+        marker = path.with_suffix(".rows")
+        sources.append((year, path))
+        if path.exists() and marker.exists() and marker.read_text() == f"{n_year}:{seed}":
+            continue
+        tmp_path = path.with_suffix(".csv.tmp")
+        for c, start in enumerate(range(0, n_year, chunk_rows)):
+            rng = np.random.default_rng([seed, year, c])
+            chunk = _chunk(rng, min(chunk_rows, n_year - start), year, sites)
+            chunk.to_csv(tmp_path, mode="w" if c == 0 else "a", header=c == 0, index=False)
+        tmp_path.replace(path)
+        marker.write_text(f"{n_year}:{seed}")
+    return sources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write seeded synthetic MODIS CSVs.")
+    parser.add_argument("--rows", default="1M", help="total rows across all years, e.g. 1M, 10M, 50M")
+    parser.add_argument("--out", default=None, help="output directory (default: .bench_data/<rows>)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    out = args.out or Path(".bench_data") / args.rows
+    for year, path in generate(parse_rows(args.rows), out, seed=args.seed):
+        print(f"{year}: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
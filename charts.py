@@ -0,0 +1,190 @@
+# --- Plotly figure builders for the Prediction, Data Visualization and Model Evaluation pages ---
+# Aggregate charts take a (sliced) FireCube or pre-aggregated grid cells; raw-point
+# charts take a DataFrame; event charts take events.event_table() rows; evaluation
+# charts take evaluation.Evaluation outputs; sweep charts take sweeps.Sweep grids.
+import plotly.express as px
+import plotly.graph_objects as go
+
+from fire_cube import SKETCH_EDGES
+
+
+def fire_type_bar(cube):
+    counts = cube.counts(["type"]).rename(columns={"type": "Type"}).sort_values("Count", ascending=False)
+    return px.bar(counts, x='Type', y='Count', color='Type', title="Fire Type Distribution", color_discrete_sequence=px.colors.qualitative.Set1)
+
+
+def fire_type_pie(cube):
+    counts = cube.counts(["type"]).rename(columns={"type": "Type"}).sort_values("Count", ascending=False)
+    return px.pie(counts, names='Type', values='Count', title="Fire Type Proportion", color_discrete_sequence=px.colors.qualitative.Set1)
+
+
+def confidence_pie(cube):
+    counts = cube.counts(["confidence"]).rename(columns={"confidence": "Confidence"}).sort_values("Count", ascending=False)
+    return px.pie(counts, names='Confidence', values='Count', title="Confidence Level Distribution", color_discrete_sequence=px.colors.qualitative.Pastel)
+
+
+def year_bar(cube):
+    counts = cube.counts(["year"]).rename(columns={"year": "Year"})
+    return px.bar(counts, x='Year', y='Count', title="Fire Counts by Year", color='Year', color_discrete_sequence=px.colors.qualitative.Dark2)
+
+
+def year_pie(cube):
+    counts = cube.counts(["year"]).rename(columns={"year": "Year"})
+    return px.pie(counts, names='Year', values='Count', title="Fires by Year (Pie Chart)", color_discrete_sequence=px.colors.qualitative.Set3)
+
+
+def frp_box(cube):
+    # Box statistics come from the FRP sketch; fences follow the usual 1.5 IQR
+    # rule clipped to the observed min/max (outlier points are not drawn).
+    stats = cube.quantiles("frp", by="type")
+    fig = go.Figure()
+    colors = px.colors.qualitative.Set2
+    for i, row in stats.iterrows():
+        iqr = row["q75"] - row["q25"]
+        fig.add_trace(go.Box(
+            name=str(row["type"]),
+            x=[str(row["type"])],
+            q1=[row["q25"]], median=[row["q50"]], q3=[row["q75"]], mean=[row["mean"]],
+            lowerfence=[max(row["min"], row["q25"] - 1.5 * iqr)],
+            upperfence=[min(row["max"], row["q75"] + 1.5 * iqr)],
+            marker_color=colors[i % len(colors)],
+        ))
+    fig.update_layout(title="FRP Distribution by Fire Type", xaxis_title="type", yaxis_title="frp", legend_title_text="type")
+    return fig
+
+
+def frp_histogram(cube):
+    _, summed, _ = cube.histogram("frp")
+    edges = SKETCH_EDGES["frp"]
+    counts = summed[0] if len(summed) else summed
+    fig = go.Figure(go.Bar(x=edges[:-1], y=counts, width=edges[1:] - edges[:-1], offset=0, marker_color='#d7263d'))
+    fig.update_layout(title="FRP Histogram", xaxis_title="frp", yaxis_title="count", xaxis_type="log", bargap=0)
+    return fig
+
+
+def _grid_bins(grid_counts, column, level):
+    span = grid_counts[column].max() - grid_counts[column].min() if len(grid_counts) else 0
+    return max(int(round(span / level)) + 1, 1)
+
+
+def density_heatmap(grid_counts, level=1.0):
+    # grid_counts: lat_bin/lon_bin/Count cells from the spatial pyramid at `level` degrees.
+    return px.density_heatmap(grid_counts, x='lon_bin', y='lat_bin', z='Count', histfunc='sum', nbinsx=_grid_bins(grid_counts, 'lon_bin', level), nbinsy=_grid_bins(grid_counts, 'lat_bin', level), color_continuous_scale='YlOrRd', title=f"Fire Density Heatmap ({level:g}° grid)")
+
+
+def density_heatmap_by_year(grid_counts, level=1.0):
+    return px.density_heatmap(grid_counts, x='lon_bin', y='lat_bin', z='Count', histfunc='sum', animation_frame='year', nbinsx=_grid_bins(grid_counts, 'lon_bin', level), nbinsy=_grid_bins(grid_counts, 'lat_bin', level), color_continuous_scale='YlOrRd', title=f"Fire Density Heatmap by Year ({level:g}° grid, Animated)")
+
+
+def area_picker(points):
+    # Lon/lat scatter for box and lasso selection (a plain map cannot report a selection).
+    fig = px.scatter(points, x='longitude', y='latitude', render_mode='webgl', title="Select an Area (box or lasso)")
+    fig.update_traces(marker=dict(size=3, color='#d7263d', opacity=0.5))
+    fig.update_layout(dragmode='select', yaxis_scaleanchor='x')
+    return fig
+
+
+def top_locations_pie(cube, loc_col):
+    loc_counts = cube.location_counts(loc_col).nlargest(10, 'Count').rename(columns={loc_col: loc_col.title()})
+    return px.pie(loc_counts, names=loc_col.title(), values='Count', title=f"Top 10 {loc_col.title()}s", color_discrete_sequence=px.colors.qualitative.Bold)
+
+
+def locations_by_year_bar(cube, loc_col):
+    bar_df = cube.location_counts(loc_col, by=['year'])
+    bar_df = bar_df.sort_values(['year', 'Count'], ascending=[True, False])
+    return px.bar(bar_df, x=loc_col, y='Count', color=loc_col, animation_frame='year', range_y=[0, bar_df['Count'].max()*1.1], title=f"Top {loc_col.title()}s by Fire Count (Animated)", color_discrete_sequence=px.colors.qualitative.G10)
+
+
+def frp_brightness_scatter(points):
+    # points: a (sampled) row selection with brightness, frp, year and optionally type.
+    return px.scatter(points, x='brightness', y='frp', animation_frame='year', color='type' if 'type' in points.columns else None, title="FRP vs Brightness by Year (Animated)", opacity=0.7, color_discrete_sequence=px.colors.qualitative.Safe)
+
+
+def fire_type_by_year_pie(cube, year):
+    pie_data = cube.slice(year=[year]).counts(['type'])
+    return px.pie(pie_data, names='type', values='Count', title=f"Fire Type Distribution for {year}", color_discrete_sequence=px.colors.qualitative.Pastel)
+
+
+def fire_animation(frames, freq_label):
+    # frames: output of animation_frames.build_frames (one marker per busy cell).
+    fig = px.scatter_geo(
+        frames,
+        lat='latitude',
+        lon='longitude',
+        size='count',
+        color='type' if 'type' in frames.columns else None,
+        hover_data={'count': True, 'frp_sum': ':.1f'},
+        animation_frame='frame',
+        title=f"Fire Detections Animation (by {freq_label})",
+        projection="natural earth",
+        color_discrete_sequence=px.colors.qualitative.Prism,
+        opacity=0.7,
+        size_max=18,
+        height=600
+    )
+    fig.update_geos(fitbounds="locations", visible=False)
+    return fig
+
+
+def cumulative_line(daily):
+    # daily: DailyRollup.cumulative() output, one point per day.
+    return px.line(daily, x='acq_date', y='cumulative', title="Cumulative Fires Detected (Animated)", markers=True)
+
+
+def weekly_trend(weekly):
+    return px.line(weekly, x='acq_date', y='Count', color='type' if 'type' in weekly.columns else None, title="Weekly Fire Detections by Type", color_discrete_sequence=px.colors.qualitative.Set1)
+
+
+def events_weekly(weekly):
+    weekly = weekly.assign(type=weekly['type'].astype('string'))
+    return px.line(weekly, x='start', y='Events', color='type', title="Fire Events Started per Week by Majority Type", color_discrete_sequence=px.colors.qualitative.Set1)
+
+
+def event_scatter(events):
+    # events: the largest events of a selection.
+    events = events.assign(type=events['type'].astype('string'))
+    return px.scatter(events, x='duration_days', y='detections', size='frp_sum', color='type', log_y=True, hover_data=['event_id', 'start', 'extent_km'], title="Largest Fire Events: Duration vs Detections (size = total FRP)", color_discrete_sequence=px.colors.qualitative.Set1)
+
+
+def accuracy_by_year(accuracy):
+    return px.bar(accuracy, x='year', y='accuracy', text_auto='.1%', range_y=[0, 1], hover_data=['rows'], title="Model Accuracy by Year", color_discrete_sequence=['#2a5298'])
+
+
+def confusion_heatmap(matrix):
+    # matrix: Evaluation.confusion_matrix(), true types as rows.
+    return px.imshow(matrix, text_auto=',', color_continuous_scale='Blues', aspect='auto', title="Confusion Matrix (rows: true type)")
+
+
+def drift_heatmap(drift):
+    # drift: Evaluation.drift_by_year(), one PSI per year and feature.
+    psi = drift.set_index('year')
+    psi.index = psi.index.astype(str)
+    return px.imshow(psi, text_auto='.3f', color_continuous_scale='YlOrRd', zmin=0, zmax=max(0.25, float(psi.max().max())), aspect='auto', title="Feature Drift by Year (PSI vs reference years)")
+
+
+def region_heatmap(regions, column, title):
+    # regions: Evaluation.regions() rows on the 1° grid; cells without a value are left blank.
+    cells = regions.dropna(subset=[column])
+    return px.density_heatmap(cells, x='lon_bin', y='lat_bin', z=column, histfunc='avg', nbinsx=_grid_bins(cells, 'lon_bin', 1.0), nbinsy=_grid_bins(cells, 'lat_bin', 1.0), color_continuous_scale='RdYlGn' if column == 'accuracy' else 'YlOrRd', title=title)
+
+
+def sweep_probability(probabilities, x_label):
+    return px.line(probabilities, x='x', y='Probability', color='Class', range_y=[0, 1], labels={'x': x_label}, title=f"Class Probability across {x_label}", color_discrete_sequence=px.colors.qualitative.Set1)
+
+
+def sweep_surface(z, x, y, x_label, y_label, title):
+    # z: (len(x), len(y)) probabilities on the sweep grid.
+    fig = go.Figure(go.Heatmap(z=z.T, x=x, y=y, zmin=0, zmax=1, colorscale='YlOrRd', colorbar=dict(title='P')))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig
+
+
+def sweep_decision(index, x, y, x_label, y_label, names):
+    # index: (len(x), len(y)) predicted class as an index into names; one flat color per class.
+    colors = px.colors.qualitative.Set1
+    n = len(names)
+    scale = [step for i in range(n) for step in ([i / n, colors[i % len(colors)]], [(i + 1) / n, colors[i % len(colors)]])]
+    fig = go.Figure(go.Heatmap(z=index.T, x=x, y=y, zmin=-0.5, zmax=n - 0.5, colorscale=scale,
+                               colorbar=dict(tickvals=list(range(n)), ticktext=list(names))))
+    fig.update_layout(title="Predicted Fire Type (Decision Surface)", xaxis_title=x_label, yaxis_title=y_label)
+    return fig
@@ -0,0 +1,234 @@
+# --- sklearn-free inference for the fire-type model ---
+# compile() turns the fitted scaler + model into plain NumPy arrays that are
+# saved as an .npz file, so scoring needs neither sklearn nor joblib:
+#   - tree models (RandomForest/ExtraTrees/DecisionTree classifiers): all trees'
+#     nodes are flattened into shared arrays and a block of rows descends each
+#     tree together, one vectorised step per depth level;
+#   - linear classifiers (LogisticRegression, LinearSVC, SGD, ...): the scaler is
+#     folded into the weights, so prediction is one affine transform.
+# Tree scoring mirrors sklearn exactly (scale in float64, cast to float32,
+# compare against the thresholds, average the per-tree class proportions), so
+# the labels are identical.
+#
+#   python compiled_model.py export            # writes fire_model_compiled.npz
+#   python compiled_model.py verify data.csv   # compares labels with sklearn
+import argparse
+import os
+import sys
+
+import numpy as np
+
+COMPILED_PATH = "fire_model_compiled.npz"
+BLOCK_ROWS = 16_384
+# Below this many rows all trees are walked together (few, larger NumPy calls);
+# above it one tree at a time (smaller working set per call).
+LOCKSTEP_ROWS = 2_048
+_TREE_MODELS = ("RandomForestClassifier", "ExtraTreesClassifier", "DecisionTreeClassifier")
+
+
+def _scaler_steps(scaler, n_features):
+    # Returns (center, scale, mul, add) so that scaler.transform(X) equals
+    # ((X - center) / scale) * mul + add evaluated in that order, which is the
+    # order sklearn uses; the unused steps are exact identities (0 and 1).
+    zeros, ones = np.zeros(n_features), np.ones(n_features)
+    if scaler is None:
+        return zeros, ones, ones, zeros
+    name = type(scaler).__name__
+    if name in ("StandardScaler", "RobustScaler", "MaxAbsScaler"):
+        center = getattr(scaler, "mean_", None) if name == "StandardScaler" else getattr(scaler, "center_", None)
+        if name == "StandardScaler" and not scaler.with_mean:
+            center = None
+        scale = scaler.scale_
+        return (zeros if center is None else center.astype("float64"),
+                ones if scale is None else scale.astype("float64"), ones, zeros)
+    if name == "MinMaxScaler":
+        return zeros, ones, scaler.scale_.astype("float64"), scaler.min_.astype("float64")
+    raise ValueError(f"Unsupported scaler: {name}")
+
+
+def _float32_floor(values):
+    # Largest float32 <= each float64 value: for float32 x, x <= t exactly when
+    # x <= _float32_floor(t), so comparisons can stay in float32.
+    rounded = values.astype(np.float32)
+    over = rounded.astype("float64") > values
+    rounded[over] = np.nextafter(rounded[over], np.float32(-np.inf))
+    return rounded
+
+
+def _compile_trees(model):
+    estimators = model.estimators_ if hasattr(model, "estimators_") else [model]
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        n = tree.node_count
+        ids = np.arange(n)
+        leaf = tree.children_left == -1
+        # children[2 * node + went_right]; leaves point to themselves so extra
+        # traversal steps are no-ops.
+        left = np.where(leaf, ids, tree.children_left) + offset
+        right = np.where(leaf, ids, tree.children_right) + offset
+        children.append(np.stack([left, right], axis=1).ravel())
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold))
+        value = tree.value[:, 0, :].astype("float64")
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += n
+    return {
+        "kind": np.array("trees"),
+        "feature": np.concatenate(features).astype(np.int64),
+        "threshold": _float32_floor(np.concatenate(thresholds)),
+        "children": np.concatenate(children).astype(np.int64),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int64),
+        "depths": np.array([e.tree_.max_depth for e in estimators], dtype=np.int64),
+    }
+
+
+def _compile_linear(model, center, scale, mul, add):
+    coef = np.atleast_2d(model.coef_).astype("float64")
+    intercept = np.atleast_1d(model.intercept_).astype("float64")
+    # The scaler is x * a + b with a = mul / scale and b = add - center * a, so
+    # (x * a + b) @ coef.T + intercept == x @ (coef * a).T + (coef @ b + intercept).
+    a = mul / scale
+    b = add - center * a
+    return {
+        "kind": np.array("linear"),
+        "coef": coef * a,
+        "intercept": coef @ b + intercept,
+    }
+
+
+class CompiledModel:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.kind = str(arrays["kind"])
+        self.classes_ = arrays["classes"]
+        self.source = str(arrays["source"]) if "source" in arrays else None
+
+    @classmethod
+    def compile(cls, scaler, model, source=None):
+        # source: optional string identifying the pickles, kept with the export.
+        n_features = model.n_features_in_
+        center, scale, mul, add = _scaler_steps(scaler, n_features)
+        name = type(model).__name__
+        if name in _TREE_MODELS:
+            arrays = _compile_trees(model)
+            arrays.update(center=center, scale=scale, mul=mul, add=add)
+        elif hasattr(model, "coef_") and hasattr(model, "classes_"):
+            arrays = _compile_linear(model, center, scale, mul, add)
+        else:
+            raise ValueError(f"Unsupported model: {name}")
+        arrays["classes"] = np.asarray(model.classes_)
+        arrays["n_features"] = np.array(n_features)
+        if source is not None:
+            arrays["source"] = np.array(source)
+        return cls(arrays)
+
+    def save(self, path=COMPILED_PATH):
+        # Written under a per-process name and renamed into place, so processes
+        # refreshing the export together never leave or read a partial file.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **self.arrays)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path=COMPILED_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def _check(self, X):
+        X = np.asarray(X, dtype="float64")
+        if X.ndim != 2 or X.shape[1] != int(self.arrays["n_features"]):
+            raise ValueError(f"Expected an (n, {int(self.arrays['n_features'])}) feature array, got {X.shape}")
+        return X
+
+    def _tree_proba(self, X):
+        # X is scaled in float64, cast to float32 exactly as sklearn does before
+        # the splits, and gathered row-major.
+        a = self.arrays
+        n_features = X.shape[1]
+        Xf = (((X - a["center"]) / a["scale"]) * a["mul"] + a["add"]).astype(np.float32).ravel()
+        base = np.arange(len(X), dtype=np.int64) * n_features
+        proba = np.zeros((len(X), a["value"].shape[1]))
+        if len(X) <= LOCKSTEP_ROWS:
+            node = np.tile(a["roots"], (len(X), 1))
+            base = base[:, None]
+            for _ in range(int(a["depths"].max())):
+                went_right = Xf[a["feature"][node] + base] > a["threshold"][node]
+                node = a["children"][2 * node + went_right]
+            for t in range(node.shape[1]):
+                proba += a["value"][node[:, t]]
+        else:
+            for root, depth in zip(a["roots"], a["depths"]):
+                node = np.full(len(X), root, dtype=np.int64)
+                for _ in range(int(depth)):
+                    went_right = Xf[a["feature"][node] + base] > a["threshold"][node]
+                    node = a["children"][2 * node + went_right]
+                proba += a["value"][node]
+        return proba / len(a["roots"])
+
+    def _linear_scores(self, X):
+        return X @ self.arrays["coef"].T + self.arrays["intercept"]
+
+    def predict_proba(self, X):
+        # Tree models only: mean of the per-tree class proportions, per block of rows.
+        if self.kind != "trees":
+            raise ValueError("predict_proba is only available for tree models")
+        X = self._check(X)
+        if len(X) <= BLOCK_ROWS:
+            return self._tree_proba(X)
+        return np.concatenate([self._tree_proba(X[i:i + BLOCK_ROWS]) for i in range(0, len(X), BLOCK_ROWS)])
+
+    def predict(self, X):
+        X = self._check(X)
+        if self.kind == "trees":
+            return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+        scores = self._linear_scores(X)
+        if scores.shape[1] == 1:
+            return self.classes_.take((scores[:, 0] > 0).astype(np.intp))
+        return self.classes_.take(np.argmax(scores, axis=1))
+
+
+def main(argv=None):
+    import fire_model
+
+    parser = argparse.ArgumentParser(description="Export the fire-type model to NumPy arrays or check the export.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="compile model + scaler into an .npz file")
+    export_parser.add_argument("-o", "--output", default=COMPILED_PATH)
+    verify_parser = sub.add_parser("verify", help="compare compiled and sklearn labels on a CSV/Parquet file")
+    verify_parser.add_argument("input")
+    verify_parser.add_argument("--compiled", default=COMPILED_PATH)
+    for p in (export_parser, verify_parser):
+        p.add_argument("--model", default=fire_model.MODEL_PATH)
+        p.add_argument("--scaler", default=fire_model.SCALER_PATH)
+    args = parser.parse_args(argv)
+
+    scaler = fire_model.load_scaler(args.scaler)
+    model = fire_model.load_model(args.model)
+    if args.command == "export":
+        source = fire_model.pickle_signature(args.model, args.scaler)
+        CompiledModel.compile(scaler, model, source=source).save(args.output)
+        print(f"Wrote {args.output}")
+        return 0
+
+    import pandas as pd
+    df = pd.read_parquet(args.input) if args.input.endswith(".parquet") else pd.read_csv(args.input)
+    X = fire_model.encode_features(df)
+    X = X[~np.isnan(X).any(axis=1)]
+    expected = fire_model.predict_array(X, scaler, model)
+    actual = CompiledModel.load(args.compiled).predict(X)
+    mismatches = int((expected != actual).sum())
+    print(f"{len(X):,} rows, {mismatches:,} label mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# --- Daily fire-count rollup behind the time-series charts ---
+# Detections are counted per acq_date x year x type x confidence and saved with
+# the partitioned store's aggregates (see ingest.py). The cumulative and trend
+# charts read this table (one row per day and category) instead of sorting
+# every detection. New days are folded in with update(), which regroups only
+# the days it touches.
+import os
+from pathlib import Path
+
+import pandas as pd
+
+ROLLUP_KEYS = ["acq_date", "year", "type", "confidence"]
+
+
+def aggregate(frame):
+    keys = [c for c in ROLLUP_KEYS if c in frame.columns]
+    counts = frame.dropna(subset=["acq_date"]).groupby(keys, observed=True, dropna=False).size().reset_index(name="count")
+    # Store plain values rather than categoricals so built and reloaded rollups match.
+    for column in keys:
+        if isinstance(counts[column].dtype, pd.CategoricalDtype):
+            dtype = counts[column].cat.categories.dtype
+            if dtype.kind in "iu" and counts[column].isna().any():
+                dtype = pd.Int64Dtype()  # e.g. near-real-time rows with no type
+            counts[column] = counts[column].astype(dtype)
+    return counts
+
+
+class DailyRollup:
+    def __init__(self, counts):
+        self.counts = counts
+
+    @classmethod
+    def build(cls, frame):
+        return cls(aggregate(frame))
+
+    def update(self, frame):
+        # Adds the detections in `frame` (e.g. newly arrived days) to the rollup.
+        return self.merge(DailyRollup(aggregate(frame)))
+
+    def merge(self, other):
+        # Rollup of both rollups' detections; only days present in `other` are regrouped.
+        new = other.counts
+        if self.counts.empty:
+            return DailyRollup(new)
+        if new.empty:
+            return self
+        keys = [c for c in ROLLUP_KEYS if c in new.columns]
+        touched = self.counts["acq_date"].isin(new["acq_date"].unique()).to_numpy()
+        merged = pd.concat([self.counts[touched], new], ignore_index=True)
+        merged = merged.groupby(keys, observed=True, dropna=False)["count"].sum().reset_index()
+        return DailyRollup(pd.concat([self.counts[~touched], merged], ignore_index=True))
+
+    def select(self, **selected):
+        # selected maps a key column to the allowed values; None means all.
+        counts = self.counts
+        for column, allowed in selected.items():
+            if allowed is not None and column in counts.columns:
+                counts = counts[counts[column].isin(allowed)]
+        return counts
+
+    def series(self, freq="D", by=None, **selected):
+        # Counts per day ("D") or week ("W", labelled by week start), optionally
+        # split by another key column.
+        counts = self.select(**selected)
+        period = counts["acq_date"] if freq == "D" else counts["acq_date"].dt.to_period(freq).dt.start_time
+        keys = [period.rename("acq_date")] + ([counts[by]] if by else [])
+        return counts.groupby(keys, observed=True)["count"].sum().reset_index(name="Count")
+
+    def cumulative(self, **selected):
+        daily = self.series("D", **selected)
+        daily["cumulative"] = daily["Count"].cumsum()
+        return daily
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".parquet.tmp")
+        self.counts.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            counts = pd.read_parquet(path)
+        except (OSError, ValueError):
+            return None
+        return cls(counts)
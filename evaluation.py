@@ -0,0 +1,293 @@
+# --- Whole-archive evaluation of the fire-type model against the MODIS labels ---
+# The archive files carry the true `type`, so every labelled fragment of the
+# partitioned store is scored with the same encoding (fire_model.encode_features,
+# CONFIDENCE_MAP) and scaler as the Prediction page. Fragments are scored in
+# parallel in a process pool, in chunks; each one is reduced to confusion counts
+# per (year, 1° cell, true, predicted) and fixed-bin feature histograms per
+# (year, 1° cell), which are cached per fragment and per model. Fragments never
+# change once written, so a re-run scores only newly ingested ones. From the
+# merged counts come confusion matrices, per-class precision/recall and the
+# feature drift (PSI) of each year or cell against reference years.
+# Files classified by the model at ingest (no `type` column) are skipped.
+#
+#   python evaluation.py
+#   python evaluation.py --reference-year 2021 --workers 4
+import argparse
+import hashlib
+import multiprocessing
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import fire_model
+import ingest
+from batch_predict import DEFAULT_CHUNKSIZE
+from modis_store import CACHE_DIR
+from streaming import MEMORY_LIMIT_MB, plan
+
+EVAL_DIR = CACHE_DIR / "evaluation"
+REGION_KEYS = ["year", "lat_bin", "lon_bin"]
+CONFUSION_KEYS = REGION_KEYS + ["true", "pred"]
+# Inner bin edges of the drift histograms (values outside fall in the end bins).
+# Fixed edges keep the histograms of different fragments additive.
+DRIFT_EDGES = {
+    "brightness": np.arange(300.0, 501.0, 10.0),
+    "bright_t31": np.arange(270.0, 331.0, 5.0),
+    "frp": np.geomspace(1.0, 5_000.0, 20),
+    "scan": np.arange(1.0, 4.81, 0.25),
+    "track": np.arange(1.0, 2.01, 0.1),
+    "confidence": np.array([0.5, 1.5]),  # encoded low/nominal/high
+}
+PSI_EPSILON = 1e-4
+# Usual reading of the population stability index.
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+# Below this many rows on either side, a cell's PSI is mostly sampling noise.
+MIN_DRIFT_ROWS = 500
+_READ_COLUMNS = fire_model.FEATURE_COLUMNS + ["type"] + REGION_KEYS
+_predictors = {}
+
+
+def model_signature(model_path=fire_model.MODEL_PATH, scaler_path=fire_model.SCALER_PATH):
+    # Cached results are only valid for the model that produced them.
+    source = fire_model.pickle_signature(model_path, scaler_path)
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def _feature_columns(feature):
+    return [f"{feature}_{i:02d}" for i in range(len(DRIFT_EDGES[feature]) + 1)]
+
+
+def _predictor(model_path, scaler_path):
+    # One predictor per worker process, loaded on its first fragment.
+    key = (model_path, scaler_path)
+    if key not in _predictors:
+        _predictors[key] = fire_model.load_predictor(model_path, scaler_path)
+    return _predictors[key]
+
+
+def _score_chunk(df, scaler, model):
+    X = fire_model.encode_features(df)
+    truth = df["type"].astype("float64").to_numpy()
+    valid = ~np.isnan(X).any(axis=1) & ~np.isnan(truth)
+    if not valid.any():
+        return pd.DataFrame(columns=CONFUSION_KEYS + ["count"]), pd.DataFrame(columns=REGION_KEYS)
+    X, df = X[valid], df[valid]
+    keys = pd.DataFrame({c: df[c].to_numpy() for c in REGION_KEYS})
+    confusion = keys.assign(true=truth[valid].astype("int64"), pred=np.asarray(fire_model.predict_array(X, scaler, model), dtype="int64"))
+    confusion = confusion.groupby(CONFUSION_KEYS, sort=False).size().reset_index(name="count")
+    # Histograms per (year, cell): one bincount per feature over group x bin.
+    grouped = keys.groupby(REGION_KEYS, sort=False)
+    codes = grouped.ngroup().to_numpy()
+    features = grouped.size().reset_index()[REGION_KEYS]
+    for i, feature in enumerate(fire_model.FEATURE_COLUMNS):
+        edges = DRIFT_EDGES[feature]
+        bins = np.searchsorted(edges, X[:, i], side="right")
+        counts = np.bincount(codes * (len(edges) + 1) + bins, minlength=len(features) * (len(edges) + 1))
+        features = features.join(pd.DataFrame(counts.reshape(len(features), -1), columns=_feature_columns(feature)))
+    return confusion, features
+
+
+def _sum(frames, keys):
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True).groupby(keys, sort=False).sum().reset_index()
+
+
+def score_fragment(task):
+    # Worker: scores one fragment in chunks. Returns (fragment, confusion, features).
+    store_dir, fragment, model_path, scaler_path = task
+    scaler, model = _predictor(model_path, scaler_path)
+    table = pa.ipc.open_file(pa.memory_map(str(Path(store_dir) / fragment))).read_all()
+    table = table.select([c for c in _READ_COLUMNS if c in table.column_names])
+    confusion, features = [], []
+    for start in range(0, table.num_rows, DEFAULT_CHUNKSIZE):
+        c, f = _score_chunk(table.slice(start, DEFAULT_CHUNKSIZE).to_pandas(), scaler, model)
+        confusion.append(c)
+        features.append(f)
+    return fragment, _sum(confusion, CONFUSION_KEYS), _sum(features, REGION_KEYS)
+
+
+def labelled_fragments(ledger):
+    # Fragments of files that came with a `type` column.
+    return sorted(f for entry in ledger["files"].values() if not entry.get("typed_by_model") for f in entry["fragments"])
+
+
+def _cache_paths(model_dir, fragment):
+    name = fragment.replace("/", "__").removesuffix(".arrow")
+    return model_dir / f"{name}.confusion.parquet", model_dir / f"{name}.features.parquet"
+
+
+def _save(model_dir, fragment, confusion, features):
+    confusion_path, features_path = _cache_paths(model_dir, fragment)
+    empty = pd.DataFrame(columns=CONFUSION_KEYS + ["count"], dtype="int64")
+    # features first: a fragment counts as scored once its confusion file exists.
+    (features if features is not None else pd.DataFrame(columns=REGION_KEYS, dtype="int64")).to_parquet(features_path, index=False)
+    (confusion if confusion is not None else empty).to_parquet(confusion_path, index=False)
+
+
+def evaluate(store_dir=ingest.STORE_DIR, eval_dir=EVAL_DIR, memory_limit_mb=MEMORY_LIMIT_MB, max_workers=None,
+             model_path=fire_model.MODEL_PATH, scaler_path=fire_model.SCALER_PATH, progress=None):
+    # Scores the labelled fragments not yet cached for this model, then merges
+    # every fragment's counts. progress(done, total) is called per fragment.
+    eval_dir = Path(eval_dir)
+    model_dir = eval_dir / model_signature(model_path, scaler_path)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    for stale in eval_dir.iterdir():
+        if stale != model_dir:
+            shutil.rmtree(stale, ignore_errors=True)  # results of a replaced model
+    fragments = labelled_fragments(ingest.read_ledger(store_dir))
+    todo = [f for f in fragments if not _cache_paths(model_dir, f)[0].exists()]
+    tasks = [(str(store_dir), f, str(model_path), str(scaler_path)) for f in todo]
+    workers = min(plan(memory_limit_mb, max_workers)[0], max(len(tasks), 1))
+    if workers == 1:
+        for done, task in enumerate(tasks, 1):
+            _save(model_dir, *score_fragment(task))
+            if progress is not None:
+                progress(done, len(tasks))
+    elif tasks:
+        # spawn rather than fork: the app process runs threads (Streamlit, Arrow).
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pending, done = set(), 0
+            for task in tasks:
+                pending.add(pool.submit(score_fragment, task))
+                if len(pending) < 2 * workers:
+                    continue
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    _save(model_dir, *future.result())
+                    done += 1
+                    if progress is not None:
+                        progress(done, len(tasks))
+            for future in pending:
+                _save(model_dir, *future.result())
+                done += 1
+                if progress is not None:
+                    progress(done, len(tasks))
+    paths = [_cache_paths(model_dir, f) for f in fragments]
+    confusion = _sum([pd.read_parquet(c) for c, _ in paths], CONFUSION_KEYS)
+    features = _sum([pd.read_parquet(f) for _, f in paths], REGION_KEYS)
+    return Evaluation(confusion, features, scored=len(todo))
+
+
+def psi(actual, expected):
+    # Population stability index between histogram rows and a reference histogram.
+    actual = np.asarray(actual, dtype="float64")
+    expected = np.asarray(expected, dtype="float64")
+    p = np.maximum(actual / np.maximum(actual.sum(axis=-1, keepdims=True), 1), PSI_EPSILON)
+    q = np.maximum(expected / max(expected.sum(), 1), PSI_EPSILON)
+    return ((p - q) * np.log(p / q)).sum(axis=-1)
+
+
+class Evaluation:
+    def __init__(self, confusion, features, scored=0):
+        self.confusion = confusion if confusion is not None else pd.DataFrame(columns=CONFUSION_KEYS + ["count"], dtype="int64")
+        self.features = features if features is not None else pd.DataFrame(columns=REGION_KEYS, dtype="int64")
+        self.scored = scored  # fragments scored in this run (the rest came from the cache)
+
+    @property
+    def rows(self):
+        return int(self.confusion["count"].sum())
+
+    def years(self):
+        return sorted(self.confusion["year"].unique().tolist())
+
+    def _select(self, frame, years):
+        return frame if years is None else frame[frame["year"].isin(years)]
+
+    def confusion_matrix(self, years=None):
+        # Counts with true types as rows and predicted types as columns.
+        counts = self._select(self.confusion, years).groupby(["true", "pred"])["count"].sum()
+        labels = sorted(set(counts.index.get_level_values(0)) | set(counts.index.get_level_values(1)))
+        matrix = counts.unstack(fill_value=0).reindex(index=labels, columns=labels, fill_value=0)
+        names = [fire_model.FIRE_TYPES.get(label, str(label)) for label in labels]
+        matrix.index, matrix.columns = pd.Index(names, name="True type"), pd.Index(names, name="Predicted type")
+        return matrix
+
+    def class_metrics(self, years=None):
+        matrix = self.confusion_matrix(years).to_numpy()
+        hits = np.diag(matrix)
+        support, predicted = matrix.sum(axis=1), matrix.sum(axis=0)
+        precision = hits / np.where(predicted > 0, predicted, np.nan)
+        recall = hits / np.where(support > 0, support, np.nan)
+        return pd.DataFrame({
+            "type": self.confusion_matrix(years).index,
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall),
+            "support": support,
+        })
+
+    def accuracy_by_year(self):
+        frame = self.confusion.assign(correct=np.where(self.confusion["true"] == self.confusion["pred"], self.confusion["count"], 0))
+        by_year = frame.groupby("year")[["count", "correct"]].sum()
+        return pd.DataFrame({"year": by_year.index, "rows": by_year["count"].to_numpy(),
+                             "accuracy": (by_year["correct"] / by_year["count"]).to_numpy()})
+
+    def _histograms(self, frame, feature):
+        return frame[_feature_columns(feature)].to_numpy()
+
+    def drift_by_year(self, reference_years=None):
+        # PSI of every feature, per year, against the pooled reference years
+        # (default: the first year in the archive).
+        years = self.years()
+        reference_years = years[:1] if reference_years is None else reference_years
+        by_year = self.features.groupby("year").sum()
+        reference = by_year[by_year.index.isin(reference_years)].sum()
+        out = pd.DataFrame({"year": by_year.index})
+        for feature in fire_model.FEATURE_COLUMNS:
+            columns = _feature_columns(feature)
+            out[feature] = psi(by_year[columns].to_numpy(), reference[columns].to_numpy())
+        return out
+
+    def regions(self, years, reference_years=None):
+        # Per 1° cell: rows and accuracy in `years`, and the PSI of every feature
+        # in `years` against the same cell in the reference years.
+        reference_years = self.years()[:1] if reference_years is None else reference_years
+        cells = ["lat_bin", "lon_bin"]
+        confusion = self._select(self.confusion, years)
+        correct = confusion.assign(correct=np.where(confusion["true"] == confusion["pred"], confusion["count"], 0))
+        out = correct.groupby(cells)[["count", "correct"]].sum().reset_index()
+        out["accuracy"] = out["correct"] / out["count"]
+        out = out.rename(columns={"count": "rows"}).drop(columns="correct")
+        current = self._select(self.features, years).groupby(cells).sum()
+        reference = self._select(self.features, reference_years).groupby(cells).sum()
+        enough = lambda frame: frame[frame[_feature_columns("confidence")].sum(axis=1) >= MIN_DRIFT_ROWS].index
+        shared = enough(current).intersection(enough(reference))
+        drift = pd.DataFrame(index=shared)
+        for feature in fire_model.FEATURE_COLUMNS:
+            columns = _feature_columns(feature)
+            drift[feature] = [psi(a, e) for a, e in zip(current.loc[shared, columns].to_numpy(), reference.loc[shared, columns].to_numpy())]
+        # Cells with too few rows in `years` or the reference have no drift value.
+        return out.merge(drift.reset_index(), on=cells, how="left")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score the labelled MODIS archive with the model and report accuracy and drift.")
+    parser.add_argument("--store", default=str(ingest.STORE_DIR))
+    parser.add_argument("--reference-year", type=int, action="append", help="baseline year(s) for drift (default: the first year)")
+    parser.add_argument("--memory-limit", type=int, default=MEMORY_LIMIT_MB, help="MB (default: FIRE_MEMORY_LIMIT_MB or %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="at most this many worker processes (default: cores)")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    report = evaluate(Path(args.store), memory_limit_mb=args.memory_limit, max_workers=args.workers,
+                      progress=lambda done, total: print(f"\rscored {done}/{total} fragments", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    print(f"{report.rows:,} labelled detections ({report.scored} fragments scored) in {time.perf_counter() - start:.1f}s\n")
+    print(report.accuracy_by_year().to_string(index=False), end="\n\n")
+    print(report.class_metrics().round(4).to_string(index=False), end="\n\n")
+    print(report.confusion_matrix().to_string(), end="\n\n")
+    print("PSI against", args.reference_year or report.years()[:1])
+    print(report.drift_by_year(args.reference_year).round(4).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+# --- Spatiotemporal clustering of detections into fire events ---
+# One fire burning for days shows up as many detections: adjacent pixels of one
+# pass, and the same pixels again on the next passes. Two detections belong to
+# the same event when their pixels touch (centres closer than half the sum of
+# their scan widths east-west and track lengths north-south, with a little
+# slack for geolocation jitter) and their acq_dates are at most MAX_GAP_DAYS
+# apart; events are the connected components of that relation. Candidate pairs
+# come from a hash grid of CELL_KM cells per day, so only detections in the
+# neighbouring cells of the same or the next days are compared and the cost
+# grows with the number of detections, not its square.
+#
+# EventBuilder extends the events day by day: it keeps the last MAX_GAP_DAYS
+# days of detections (the only ones new days can still link to) with their
+# event ids, links the new rows to them and to each other, and folds the new
+# rows into mergeable per-event stats; events joined by a new detection merge.
+# Every event row also carries the mean detection features (FEATURE_COLUMNS),
+# so an event table can be scored by the fire-type model like detections.
+# ingest.py keeps the store's events up to date:
+#
+#   python events.py                    # summary and largest events of the store
+#   python events.py --top 20 -o events.parquet
+import argparse
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fire_model import CONFIDENCE_MAP, FIRE_TYPES, encode_confidence
+
+KM_PER_DEG = 111.32
+MAX_GAP_DAYS = 1
+PIXEL_SLACK = 1.1
+MAX_PIXEL_KM = 4.8  # MODIS pixels grow to 4.8 km along-scan at the swath edge
+CELL_KM = MAX_PIXEL_KM * PIXEL_SLACK
+INPUT_COLUMNS = ["latitude", "longitude", "acq_date", "scan", "track", "frp", "brightness", "bright_t31",
+                 "confidence", "type"]
+TYPE_COLUMNS = [f"type_{code}" for code in FIRE_TYPES]
+
+
+class BackfillError(ValueError):
+    # Raised by EventBuilder.extend for detections older than its latest day.
+    pass
+SUM_COLUMNS = ["detections", "frp_sum", "brightness_sum", "bright_t31_sum", "scan_sum", "track_sum",
+               "lat_sum", "lon_sum"] + TYPE_COLUMNS
+MIN_COLUMNS = ["first_day", "lat_min", "lon_min"]
+MAX_COLUMNS = ["last_day", "lat_max", "lon_max", "frp_max", "brightness_max", "confidence_max"]
+_CONFIDENCE_NAMES = {level: name for name, level in CONFIDENCE_MAP.items()}
+_BITS = 21
+_BIAS = 1 << (_BITS - 1)
+# (dx, dy, dt) cell offsets holding every possible neighbour: the full 3x3
+# block on later days, and half of it on the same day so each pair turns up once.
+_OFFSETS = [(0, 0, 0), (1, -1, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)] + [
+    (dx, dy, dt) for dt in range(1, MAX_GAP_DAYS + 1) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def _by_category(values, convert):
+    # convert() applied to a categorical's categories only, then taken by code.
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return convert(values)
+    converted = np.append(convert(values.cat.categories.to_series()), np.nan)
+    return converted[values.cat.codes.to_numpy()]
+
+
+def _numeric(values):
+    return pd.to_numeric(pd.Series(np.asarray(values, dtype=object)), errors="coerce").to_numpy(dtype="float64")
+
+
+def points(frame, type_column="type"):
+    # The columns event building needs, compacted: day number, position in km,
+    # pixel size and the per-event stat inputs. Rows without a position or date
+    # are dropped.
+    frame = frame[frame["latitude"].notna() & frame["longitude"].notna() & frame["acq_date"].notna()]
+    lat = frame["latitude"].to_numpy(dtype="float64")
+    lon = frame["longitude"].to_numpy(dtype="float64")
+    numeric = {c: pd.to_numeric(frame[c], errors="coerce").to_numpy(dtype="float64") if c in frame.columns
+               else np.full(len(frame), np.nan) for c in ("scan", "track", "frp", "brightness", "bright_t31")}
+    types = frame[type_column] if type_column in frame.columns else pd.Series(np.nan, index=frame.index)
+    dates = frame["acq_date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    confidence = _by_category(frame["confidence"], encode_confidence) if "confidence" in frame.columns else np.full(len(frame), np.nan)
+    return pd.DataFrame({
+        "day": dates.to_numpy().astype("datetime64[D]").astype(np.int64),
+        "latitude": lat,
+        "longitude": lon,
+        # Unknown pixel sizes count as nadir pixels (1 km).
+        "scan": np.clip(np.nan_to_num(numeric["scan"], nan=1.0), 0.0, MAX_PIXEL_KM),
+        "track": np.clip(np.nan_to_num(numeric["track"], nan=1.0), 0.0, MAX_PIXEL_KM),
+        "frp": numeric["frp"],
+        "brightness": numeric["brightness"],
+        "bright_t31": numeric["bright_t31"],
+        "confidence": confidence,
+        "type": _by_category(types, _numeric),
+    })
+
+
+def _pack(cx, cy, day):
+    return ((cx + _BIAS) << (2 * _BITS)) | ((cy + _BIAS) << _BITS) | day
+
+
+def _cross(start_a, n_a, start_b, n_b):
+    # Every (i, j) pair of rows start_a[k]+i, start_b[k]+j over all cell pairs k.
+    sizes = n_a * n_b
+    pair = np.repeat(np.arange(len(sizes)), sizes)
+    k = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return start_a[pair] + k // n_b[pair], start_b[pair] + k % n_b[pair]
+
+
+def link_pairs(pts):
+    # (a, b) row positions of every pair of linked detections.
+    lat, lon, day = pts["latitude"].to_numpy(), pts["longitude"].to_numpy(), pts["day"].to_numpy()
+    y = lat * KM_PER_DEG
+    x = lon * KM_PER_DEG * np.cos(np.radians(lat))
+    half_scan = pts["scan"].to_numpy() * (PIXEL_SLACK / 2)
+    half_track = pts["track"].to_numpy() * (PIXEL_SLACK / 2)
+    keys = _pack(np.floor(x / CELL_KM).astype(np.int64), np.floor(y / CELL_KM).astype(np.int64), day)
+    order = np.argsort(keys, kind="stable")
+    cells, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    found_a, found_b = [], []
+    for dx, dy, dt in _OFFSETS:
+        target = cells + _pack(dx, dy, dt) - _pack(0, 0, 0)
+        pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        hit = np.flatnonzero(cells[pos] == target)
+        if not len(hit):
+            continue
+        a, b = _cross(starts[hit], counts[hit], starts[pos[hit]], counts[pos[hit]])
+        if (dx, dy, dt) == (0, 0, 0):
+            keep = a < b
+            a, b = a[keep], b[keep]
+        a, b = order[a], order[b]
+        touch = ((np.abs(x[a] - x[b]) <= half_scan[a] + half_scan[b])
+                 & (np.abs(y[a] - y[b]) <= half_track[a] + half_track[b]))
+        found_a.append(a[touch])
+        found_b.append(b[touch])
+    if not found_a:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(found_a), np.concatenate(found_b)
+
+
+def components(pts, extra=None):
+    # Event label of every row: connected components of the link graph, plus
+    # the `extra` (a, b) edges if given.
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    n = len(pts)
+    a, b = link_pairs(pts)
+    if extra is not None:
+        a, b = np.concatenate([a, extra[0]]), np.concatenate([b, extra[1]])
+    graph = coo_matrix((np.ones(len(a), dtype=np.int8), (a, b)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def _stats(pts, ids):
+    # Mergeable per-event stats of the rows `pts`, grouped by event id.
+    frame = pd.DataFrame({
+        "event_id": ids,
+        "detections": 1,
+        "frp_sum": np.nan_to_num(pts["frp"].to_numpy()),
+        "brightness_sum": np.nan_to_num(pts["brightness"].to_numpy()),
+        "bright_t31_sum": np.nan_to_num(pts["bright_t31"].to_numpy()),
+        "scan_sum": pts["scan"].to_numpy(),
+        "track_sum": pts["track"].to_numpy(),
+        "lat_sum": pts["latitude"].to_numpy(),
+        "lon_sum": pts["longitude"].to_numpy(),
+        **{column: (pts["type"].to_numpy() == code).astype(np.int64) for code, column in zip(FIRE_TYPES, TYPE_COLUMNS)},
+        "first_day": pts["day"].to_numpy(),
+        "last_day": pts["day"].to_numpy(),
+        "lat_min": pts["latitude"].to_numpy(),
+        "lat_max": pts["latitude"].to_numpy(),
+        "lon_min": pts["longitude"].to_numpy(),
+        "lon_max": pts["longitude"].to_numpy(),
+        "frp_max": pts["frp"].to_numpy(),
+        "brightness_max": pts["brightness"].to_numpy(),
+        "confidence_max": pts["confidence"].to_numpy(),
+    })
+    return _combine(frame.groupby("event_id"))
+
+
+def _combine(grouped):
+    return pd.concat([grouped[SUM_COLUMNS].sum(), grouped[MIN_COLUMNS].min(), grouped[MAX_COLUMNS].max()], axis=1)
+
+
+class EventBuilder:
+    def __init__(self, tail=None, last_day=None, next_id=0):
+        self.tail = tail          # the last MAX_GAP_DAYS days of points, with their event_id
+        self.last_day = last_day  # latest day seen (days since the epoch)
+        self.next_id = next_id
+        # Per-event stats indexed by event_id, split into the events the tail
+        # can still extend and closed ones, which are only ever appended to.
+        self._closed, self._open = [], None
+        self._path, self._saved = None, 0  # where it was loaded/saved, closed parts written there
+
+    @property
+    def events(self):
+        if self._open is None:
+            return None
+        return pd.concat(self._closed + [self._open]) if self._closed else self._open
+
+    @property
+    def detections(self):
+        events = self.events
+        return 0 if events is None else int(events["detections"].sum())
+
+    def extend(self, frame, type_column="type"):
+        # Adds detections on or after the latest day already seen. Earlier days
+        # could link to rows the tail no longer holds, so they raise
+        # BackfillError and the events have to be rebuilt in date order instead.
+        new = points(frame, type_column)
+        if new.empty:
+            return self
+        if self.last_day is not None and new["day"].min() < self.last_day:
+            raise BackfillError("detections older than the latest day already in the events")
+        old_ids = np.full(len(new), -1, dtype=np.int64)
+        if self.tail is not None and len(self.tail):
+            old_ids = np.concatenate([self.tail["event_id"].to_numpy(), old_ids])
+            combined = pd.concat([self.tail.drop(columns="event_id"), new], ignore_index=True)
+        else:
+            combined = new
+        # Tail rows of one event may only be connected through older days, so
+        # rows sharing an event id are chained together as well.
+        known = old_ids >= 0
+        rows = np.flatnonzero(known)[np.argsort(old_ids[known], kind="stable")]
+        same = old_ids[rows[1:]] == old_ids[rows[:-1]]
+        labels = components(combined, (rows[:-1][same], rows[1:][same]))
+        # Each component keeps the lowest event id among its tail rows; a
+        # component of new rows only gets a fresh id.
+        survivor = np.full(labels.max() + 1, -1, dtype=np.int64)
+        lowest = pd.Series(old_ids[known]).groupby(labels[known]).min()
+        survivor[lowest.index.to_numpy()] = lowest.to_numpy()
+        fresh = np.flatnonzero(survivor < 0)
+        survivor[fresh] = self.next_id + np.arange(len(fresh))
+        self.next_id += len(fresh)
+        ids = survivor[labels]
+
+        added = _stats(new, ids[~known])
+        if self._open is not None:
+            # Open events merged into a survivor are relabelled and recombined
+            # with the new rows' stats; every tail event id is an open event.
+            remap = {old: new_id for old, new_id in zip(old_ids[known], ids[known]) if old != new_id}
+            touched = self._open.index.isin(added.index) | self._open.index.isin(list(remap))
+            merging = self._open[touched].rename(index=lambda i: remap.get(i, i))
+            added = pd.concat([self._open[~touched], _combine(pd.concat([merging, added]).groupby(level=0))])
+        self.last_day = int(max(combined["day"].max(), self.last_day if self.last_day is not None else 0))
+        keep = combined["day"].to_numpy() >= self.last_day - MAX_GAP_DAYS
+        self.tail = combined[keep].assign(event_id=ids[keep]).reset_index(drop=True)
+        is_open = added.index.isin(np.unique(ids[keep]))
+        if not is_open.all():
+            self._closed.append(added[~is_open])
+        self._open = added[is_open]
+        return self
+
+    def table(self):
+        return event_table(self.events)
+
+    def save(self, path, **state):
+        # Closed events are saved by the month of their last day, so a builder
+        # loaded from `path` only appends the events it has closed since, to
+        # the latest months. Saving anywhere else rewrites the directory.
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "state.json").unlink(missing_ok=True)  # written last: no state, no events
+        closed_dir = path / "closed"
+        if self._path != path:
+            shutil.rmtree(closed_dir, ignore_errors=True)
+            self._saved = 0
+        closed_dir.mkdir(exist_ok=True)
+        if len(self._closed) > self._saved:
+            closed = pd.concat(self._closed[self._saved:])
+            months = closed["last_day"].to_numpy().astype("datetime64[D]").astype("datetime64[M]").astype(str)
+            for month, part in closed.groupby(months):
+                month_path = closed_dir / f"{month}.parquet"
+                if month_path.exists():
+                    part = pd.concat([pd.read_parquet(month_path), part])
+                part.to_parquet(month_path)
+        self._open.to_parquet(path / "open.parquet")
+        self.tail.to_parquet(path / "tail.parquet")
+        state = {**state, "last_day": self.last_day, "next_id": self.next_id}
+        (path / "state.json").write_text(json.dumps(state))
+        self._path, self._saved = path, len(self._closed)
+
+    @classmethod
+    def load(cls, path, closed=True):
+        # (builder, state) or None. With closed=False only what extend() needs
+        # is read, and the builder's events are just the open ones and those it
+        # closes later: enough to extend and save back to `path`.
+        path = Path(path)
+        try:
+            state = json.loads((path / "state.json").read_text())
+            builder = cls(pd.read_parquet(path / "tail.parquet"), state["last_day"], state["next_id"])
+            builder._open = pd.read_parquet(path / "open.parquet")
+            if closed:
+                builder._closed = [pd.read_parquet(p) for p in sorted((path / "closed").glob("*.parquet"))]
+        except (OSError, ValueError, KeyError):
+            return None
+        builder._path, builder._saved = path, len(builder._closed)
+        return builder, state
+
+
+def build_events(frame, type_column="type"):
+    # Events of a whole frame in one go (dates in any order).
+    return EventBuilder().extend(frame, type_column)
+
+
+def event_table(events):
+    # One row per event: time span, extent, totals, majority type, and the
+    # mean detection features under FEATURE_COLUMNS.
+    if events is None or events.empty:
+        return pd.DataFrame()
+    n = events["detections"].to_numpy()
+    type_counts = events[TYPE_COLUMNS].to_numpy()
+    codes = np.array(list(FIRE_TYPES))
+    typed = type_counts.sum(axis=1)
+    start = events["first_day"].to_numpy().astype("datetime64[D]")
+    end = events["last_day"].to_numpy().astype("datetime64[D]")
+    lat_mid = np.radians((events["lat_min"] + events["lat_max"]).to_numpy() / 2)
+    table = pd.DataFrame({
+        "event_id": events.index.to_numpy(),
+        "start": start.astype("datetime64[ns]"),
+        "end": end.astype("datetime64[ns]"),
+        "duration_days": (end - start).astype(np.int64) + 1,
+        "detections": n,
+        "latitude": events["lat_sum"].to_numpy() / n,
+        "longitude": events["lon_sum"].to_numpy() / n,
+        "lat_min": events["lat_min"].to_numpy(),
+        "lat_max": events["lat_max"].to_numpy(),
+        "lon_min": events["lon_min"].to_numpy(),
+        "lon_max": events["lon_max"].to_numpy(),
+        "extent_km": np.hypot((events["lat_max"] - events["lat_min"]).to_numpy() * KM_PER_DEG,
+                              (events["lon_max"] - events["lon_min"]).to_numpy() * KM_PER_DEG * np.cos(lat_mid)),
+        "frp_sum": events["frp_sum"].to_numpy(),
+        "frp_max": events["frp_max"].to_numpy(),
+        "type": pd.array(np.where(typed > 0, codes[type_counts.argmax(axis=1)], -1), dtype="Int64"),
+        "type_share": np.where(typed > 0, type_counts.max(axis=1) / np.maximum(typed, 1), np.nan),
+        "brightness": events["brightness_sum"].to_numpy() / n,
+        "bright_t31": events["bright_t31_sum"].to_numpy() / n,
+        "frp": events["frp_sum"].to_numpy() / n,
+        "scan": events["scan_sum"].to_numpy() / n,
+        "track": events["track_sum"].to_numpy() / n,
+        "confidence": pd.Series(events["confidence_max"].to_numpy()).map(_CONFIDENCE_NAMES).to_numpy(),
+    })
+    table["type"] = table["type"].mask(table["type"] < 0)
+    table["year"] = table["start"].dt.year
+    return table
+
+
+def select(table, year=None, type=None):
+    # Events started in `year` with majority type in `type` (None: any).
+    keep = np.ones(len(table), dtype=bool)
+    if year is not None:
+        keep &= table["year"].isin(year).to_numpy()
+    if type is not None:
+        keep &= table["type"].isin(type).to_numpy(dtype=bool, na_value=False)
+    return table[keep]
+
+
+def weekly(table):
+    # Events started per week (ending Sunday, like pandas "W"), by majority type.
+    days = table["start"].to_numpy().astype("datetime64[D]")
+    weeks = days + (6 - (days.astype(np.int64) + 3) % 7)  # day 0 was a Thursday
+    counts = pd.DataFrame({"start": weeks.astype("datetime64[ns]"), "type": table["type"].array})
+    return counts.groupby(["start", "type"], dropna=False).size().reset_index(name="Events")
+
+
+def main(argv=None):
+    import ingest
+    parser = argparse.ArgumentParser(description="Fire events of the MODIS store.")
+    parser.add_argument("--store", default=str(ingest.STORE_DIR))
+    parser.add_argument("--top", type=int, default=10, help="largest events to list, by total FRP (default: %(default)s)")
+    parser.add_argument("-o", "--output", help="write the event table to this .csv or .parquet file")
+    args = parser.parse_args(argv)
+
+    table = ingest.load_events(args.store)
+    if table.empty:
+        print("No events: the store is empty")
+        return 1
+    print(f"{len(table):,} events from {int(table['detections'].sum()):,} detections")
+    columns = ["event_id", "start", "duration_days", "detections", "latitude", "longitude", "extent_km",
+               "frp_sum", "type"]
+    print(table.nlargest(args.top, "frp_sum")[columns].to_string(index=False))
+    if args.output:
+        if args.output.endswith(".parquet"):
+            table.to_parquet(args.output, index=False)
+        else:
+            table.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
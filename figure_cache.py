@@ -0,0 +1,115 @@
+# --- Server-side cache of built Plotly figures ---
+# Every widget change reruns the whole page, and most of its figures come out
+# the same as last time. Figures are cached under (chart id, hash of the inputs
+# the chart depends on, dataset version) in one process-wide LRU that every
+# session shares, bounded by entry count and by the figures' data size. Each
+# key is built by one thread at a time, so concurrent viewers of the same view
+# wait for a single build instead of each building it. The app keeps one cache
+# in st.cache_resource; its hit/miss counters are shown in the Debug panel.
+# The same figure object is handed to every session, so cached figures must be
+# treated as read-only: st.plotly_chart only serialises a copy of them.
+#
+#   FIRE_FIGURE_CACHE_MB=512 FIRE_FIGURE_CACHE_ENTRIES=500 streamlit run app.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_ENTRIES = int(os.environ.get("FIRE_FIGURE_CACHE_ENTRIES", "256"))
+MAX_MB = int(os.environ.get("FIRE_FIGURE_CACHE_MB", "256"))
+
+
+def state_hash(*state):
+    # Stable digest of the chart inputs: filter selections, widget values, etc.
+    # repr() covers lists, tuples, numbers and strings, which is all we key on.
+    return hashlib.sha256(repr(state).encode()).hexdigest()[:16]
+
+
+def _value_bytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(k) + _value_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_value_bytes(v) for v in value)
+    return 8
+
+
+def figure_bytes(fig):
+    # What the figure costs to keep: the bytes of its arrays and strings, within
+    # a small factor of its JSON size but without serialising it on every miss.
+    traces = list(fig.data) + [trace for frame in fig.frames for trace in frame.data]
+    return _value_bytes(fig.layout.to_plotly_json()) + sum(_value_bytes(t.to_plotly_json()) for t in traces)
+
+
+class FigureCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_MB * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (figure, bytes), least recently used first
+        self._building = {}            # key -> lock held while the key is built
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, chart, version, *state):
+        return chart, state_hash(*state), state_hash(version)
+
+    def get_or_build(self, key, build):
+        # Returns (figure, hit).
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key), True
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                if key in self._entries:  # built by another session meanwhile
+                    return self._hit(key), True
+                self.misses += 1
+            try:
+                fig = build()
+                size = figure_bytes(fig)
+                with self._lock:
+                    self._store(key, fig, size)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+        return fig, False
+
+    def _hit(self, key):
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def _store(self, key, fig, size):
+        if size > self.max_bytes:
+            return  # would evict everything else; served but not kept
+        self._entries[key] = (fig, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,94 @@
+# --- Indexed filter engine for the sidebar filters ---
+# Each filter column gets an inverted index built once: the row ids sorted by
+# value, with per-value offsets. A filter turns into a boolean row mask built
+# from those row lists (from the unselected values instead when that is
+# cheaper) and masks of different columns are AND-ed in place. The DataFrame
+# itself is never copied. Charts ask the Selection for just the columns they
+# plot.
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ["year", "type", "confidence"]
+
+
+class Selection:
+    def __init__(self, frame, mask=None):
+        self._frame = frame
+        self.mask = mask  # None means every row
+        self._rows = None
+
+    def __len__(self):
+        return len(self._frame) if self.mask is None else len(self.rows)
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = np.arange(len(self._frame)) if self.mask is None else np.flatnonzero(self.mask)
+        return self._rows
+
+    def frame(self, columns):
+        # Only the requested columns are gathered (and only for selected rows);
+        # with no active filter the columns are passed through without a copy.
+        columns = [c for c in columns if c in self._frame.columns]
+        if self.mask is None:
+            return pd.DataFrame({c: self._frame[c] for c in columns}, copy=False)
+        rows = self.rows
+        return pd.DataFrame({c: self._frame[c].take(rows) for c in columns}, copy=False)
+
+
+class FilterIndex:
+    def __init__(self, frame, columns=FILTER_COLUMNS):
+        self.frame = frame
+        self.n_rows = len(frame)
+        self._index = {}
+        for column in columns:
+            if column not in frame.columns:
+                continue
+            codes, uniques = pd.factorize(frame[column], sort=True)
+            # Bucket 0 holds missing values (code -1); bucket i + 1 holds uniques[i].
+            buckets = codes.astype(np.int64) + 1
+            order = np.argsort(buckets, kind="stable").astype(np.int64 if self.n_rows >= 2**31 else np.int32)
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(buckets, minlength=len(uniques) + 1))])
+            lookup = {value: i + 1 for i, value in enumerate(uniques)}
+            self._index[column] = (order, offsets, lookup)
+
+    def values(self, column):
+        return list(self._index[column][2]) if column in self._index else []
+
+    def _rows_of(self, column, bucket):
+        order, offsets, _ = self._index[column]
+        return order[offsets[bucket]:offsets[bucket + 1]]
+
+    def mask(self, column, allowed):
+        # Returns None when the filter keeps every row.
+        order, offsets, lookup = self._index[column]
+        chosen = {lookup[v] for v in allowed if v in lookup}
+        sizes = np.diff(offsets)
+        selected = int(sizes[list(chosen)].sum()) if chosen else 0
+        if selected == self.n_rows:
+            return None
+        if selected <= self.n_rows - selected:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            for bucket in chosen:
+                mask[self._rows_of(column, bucket)] = True
+        else:
+            mask = np.ones(self.n_rows, dtype=bool)
+            for bucket in range(len(sizes)):
+                if bucket not in chosen:
+                    mask[self._rows_of(column, bucket)] = False
+        return mask
+
+    def select(self, **selected):
+        # selected maps a column to the allowed values; None means no filter.
+        combined = None
+        for column, allowed in selected.items():
+            if allowed is None or column not in self._index:
+                continue
+            mask = self.mask(column, allowed)
+            if mask is None:
+                continue
+            if combined is None:
+                combined = mask
+            else:
+                combined &= mask
+        return Selection(self.frame, combined)
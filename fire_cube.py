@@ -0,0 +1,291 @@
+# --- Pre-aggregated fire-count cube for the Data Visualization page ---
+# The raw detections are reduced once to counts and FRP/brightness sums over
+# year x month x type x confidence x 1° lat/lon bin, plus fixed-bin histograms
+# ("sketches") of FRP and brightness per year x type x confidence from which
+# quantiles and histograms are read back. Every chart renders from a slice of
+# the cube, so a filter change costs a scan of the (small) cube, not of the data.
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+CUBE_DIMS = ["year", "month", "type", "confidence", "lat_bin", "lon_bin"]
+SKETCH_DIMS = ["year", "type", "confidence"]
+FILTER_DIMS = ["year", "type", "confidence"]
+LOCATION_COLUMNS = ["state", "region", "district", "subdivision"]
+
+# Fixed bin edges make sketches mergeable across partitions. FRP is heavy-tailed,
+# so it gets log-spaced bins; brightness (Kelvin) gets 1 K bins.
+SKETCH_EDGES = {
+    "frp": np.concatenate([[0.0], np.geomspace(0.1, 20_000.0, 160)]),
+    "brightness": np.arange(250.0, 551.0, 1.0),
+}
+
+
+def _sketch(values, codes, n_keys, edges):
+    ok = ~np.isnan(values)
+    values, codes = values[ok], codes[ok]
+    n_bins = len(edges) - 1
+    bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, n_bins - 1)
+    hist = np.bincount(codes * n_bins + bins, minlength=n_keys * n_bins).reshape(n_keys, n_bins)
+    stats = pd.DataFrame({"v": values, "k": codes}).groupby("k")["v"].agg(["count", "sum", "min", "max"])
+    return hist, stats.reindex(range(n_keys))
+
+
+def _periods(cells):
+    # year * 100 + month of every cell (0 when the cube has no year/month).
+    if not {"year", "month"}.issubset(cells.columns):
+        return np.zeros(len(cells), dtype=np.int64)
+    return cells["year"].to_numpy(dtype="int64") * 100 + cells["month"].to_numpy(dtype="int64")
+
+
+def _restore_categoricals(frame, categorical):
+    # Parquet does not restore categoricals with non-string categories.
+    for column, dtype in categorical.items():
+        values = frame[column]
+        categories = pd.Index(values.dropna().unique()).astype(dtype).sort_values()
+        frame[column] = pd.Categorical(values, categories=categories)
+    return frame
+
+
+def _concat(frames):
+    # Concatenates frames whose categorical columns may have different
+    # categories, keeping them categorical (pd.concat would fall back to object).
+    out = pd.concat(frames, ignore_index=True)
+    for column in frames[0].columns:
+        parts = [f[column] for f in frames]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            # An all-null column has empty categories of an arbitrary dtype.
+            typed = [p.cat.categories.dtype for p in parts if len(p.cat.categories)]
+            if typed:
+                empty = pd.CategoricalDtype(pd.Index([], dtype=typed[0]))
+                parts = [p if len(p.cat.categories) else p.astype(empty) for p in parts]
+            out[column] = pd.api.types.union_categoricals(parts, ignore_order=True)
+    return out
+
+
+class FireCube:
+    def __init__(self, cells, sketch_keys, sketches, locations):
+        self.cells = cells              # CUBE_DIMS + count, frp_sum, brightness_sum
+        self.sketch_keys = sketch_keys  # SKETCH_DIMS + {measure}_{count,sum,min,max}
+        self.sketches = sketches        # measure -> (n_keys, n_bins) histogram counts
+        self.locations = locations      # location column -> year/type/confidence/location counts
+
+    @property
+    def total(self):
+        return int(self.cells["count"].sum())
+
+    def values(self, dim):
+        if dim not in self.cells.columns:
+            return []
+        return sorted(self.cells[dim].dropna().unique())
+
+    def slice(self, **selected):
+        # selected maps a filter dimension to the allowed values; None means all.
+        def mask(frame):
+            keep = np.ones(len(frame), dtype=bool)
+            for dim, allowed in selected.items():
+                if allowed is not None and dim in frame.columns:
+                    keep &= frame[dim].isin(allowed).to_numpy()
+            return keep
+
+        key_mask = mask(self.sketch_keys)
+        return FireCube(
+            self.cells[mask(self.cells)],
+            self.sketch_keys[key_mask],
+            {m: h[key_mask] for m, h in self.sketches.items()},
+            {c: f[mask(f)] for c, f in self.locations.items()},
+        )
+
+    def merge(self, other):
+        # Cube of the union of the two cubes' detections. Cells and sketch
+        # histograms are additive because the bins are fixed (see SKETCH_EDGES).
+        dims = [c for c in CUBE_DIMS if c in self.cells.columns]
+        # Only cells of the months present in `other` can change, so the rest
+        # are carried over without regrouping; adding a day costs one month.
+        touched = np.isin(_periods(self.cells), np.unique(_periods(other.cells)))
+        cells = _concat([self.cells[touched], other.cells])
+        cells = cells.groupby(dims, observed=True, dropna=False, sort=False).sum().reset_index()
+        cells = _concat([self.cells[~touched], cells])
+
+        sketch_dims = [c for c in SKETCH_DIMS if c in self.sketch_keys.columns]
+        keys = _concat([self.sketch_keys, other.sketch_keys])
+        grouped = keys.groupby(sketch_dims, observed=True, dropna=False, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        sketch_keys = grouped.size().reset_index()[sketch_dims]
+        sketches = {}
+        for m in self.sketches:
+            hist = np.zeros((len(sketch_keys), self.sketches[m].shape[1]), dtype=np.int64)
+            np.add.at(hist, codes, np.concatenate([self.sketches[m], other.sketches[m]]))
+            sketches[m] = hist
+            by_key = keys.groupby(codes)
+            sketch_keys[f"{m}_count"] = by_key[f"{m}_count"].sum().to_numpy()
+            sketch_keys[f"{m}_sum"] = by_key[f"{m}_sum"].sum().to_numpy()
+            sketch_keys[f"{m}_min"] = by_key[f"{m}_min"].min().to_numpy()
+            sketch_keys[f"{m}_max"] = by_key[f"{m}_max"].max().to_numpy()
+
+        locations = {}
+        for column in set(self.locations) | set(other.locations):
+            frames = [f[column] for f in (self, other) if column in f.locations]
+            merged = _concat(frames)
+            by = [c for c in merged.columns if c != "count"]
+            locations[column] = merged.groupby(by, observed=True, sort=False)["count"].sum().reset_index()
+        return FireCube(cells, sketch_keys, sketches, locations)
+
+    def periods(self):
+        return np.unique(_periods(self.cells)).tolist()
+
+    def save(self, path, periods=None):
+        # A directory of Parquet tables plus the histograms in one .npz file.
+        # Cells are stored one file per year/month; with `periods` (year * 100
+        # + month values) only those months are rewritten, so an incremental
+        # update writes what it touched. The categorical columns and their
+        # category dtypes are listed in cube.json and restored on load.
+        path = Path(path)
+        (path / "cells").mkdir(parents=True, exist_ok=True)
+        cell_periods = _periods(self.cells)
+        for period in (np.unique(cell_periods) if periods is None else periods):
+            self.cells[cell_periods == period].to_parquet(path / "cells" / f"{period}.parquet", index=False)
+        if periods is None:
+            current = set(cell_periods.tolist())
+            for stale in path.glob("cells/*.parquet"):
+                if int(stale.stem) not in current:
+                    stale.unlink()
+        tables = {"sketch_keys": self.sketch_keys}
+        tables.update({f"locations_{c}": f for c, f in self.locations.items()})
+        for name, frame in tables.items():
+            frame.to_parquet(path / f"{name}.parquet", index=False)
+        categorical = {name: {c: str(frame[c].cat.categories.dtype) for c in frame.columns
+                              if isinstance(frame[c].dtype, pd.CategoricalDtype)}
+                       for name, frame in {"cells": self.cells, **tables}.items()}
+        np.savez(path / "sketches.npz", **self.sketches)
+        with open(path / "cube.json", "w") as f:
+            json.dump({"locations": sorted(self.locations), "categorical": categorical}, f)
+
+    @classmethod
+    def load(cls, path, periods=None):
+        # periods: load only these months' cells (for an incremental merge).
+        path = Path(path)
+        try:
+            with open(path / "cube.json") as f:
+                meta = json.load(f)
+            with np.load(path / "sketches.npz", allow_pickle=False) as data:
+                sketches = {m: data[m] for m in data.files}
+            categorical = meta["categorical"]
+            files = sorted(path.glob("cells/*.parquet"), key=lambda p: int(p.stem))
+            if periods is not None:
+                files = [p for p in files if int(p.stem) in set(periods)]
+            if files:
+                cells = _concat([_restore_categoricals(pd.read_parquet(p), categorical["cells"]) for p in files])
+            else:
+                schema = pq.read_schema(next(path.glob("cells/*.parquet")))
+                cells = _restore_categoricals(schema.empty_table().to_pandas(), categorical["cells"])
+            sketch_keys = _restore_categoricals(pd.read_parquet(path / "sketch_keys.parquet"), categorical["sketch_keys"])
+            locations = {c: _restore_categoricals(pd.read_parquet(path / f"locations_{c}.parquet"), categorical[f"locations_{c}"])
+                         for c in meta["locations"]}
+        except (OSError, ValueError, KeyError, StopIteration):
+            return None
+        return cls(cells, sketch_keys, sketches, locations)
+
+    def counts(self, by, value="count"):
+        return self.cells.groupby(by, observed=True)[value].sum().reset_index(name="Count" if value == "count" else value)
+
+    def location_counts(self, column, by=()):
+        frame = self.locations[column]
+        return frame.groupby(list(by) + [column], observed=True)["count"].sum().reset_index(name="Count")
+
+    def grid(self, level=1.0, by=None, bounds=None):
+        # Counts per cell of a `level`° grid (at least the cube's 1° bins), laid
+        # out like SpatialPyramid.cells: lat_bin/lon_bin are south-west corners.
+        level = max(level, 1.0)
+        cells = self.cells.dropna(subset=["lat_bin", "lon_bin"])
+        lat = np.floor((cells["lat_bin"].to_numpy(dtype="float64") + 90.0) / level) * level - 90.0
+        lon = np.floor((cells["lon_bin"].to_numpy(dtype="float64") + 180.0) / level) * level - 180.0
+        keys = ([cells[by].to_numpy()] if by is not None else []) + [lat, lon]
+        names = ([by] if by is not None else []) + ["lat_bin", "lon_bin"]
+        result = cells["count"].groupby(keys, sort=True).sum().rename_axis(names).reset_index(name="Count")
+        if bounds is not None:
+            lat_min, lat_max, lon_min, lon_max = bounds
+            inside = (result["lat_bin"] + level > lat_min) & (result["lat_bin"] < lat_max) & \
+                     (result["lon_bin"] + level > lon_min) & (result["lon_bin"] < lon_max)
+            result = result[inside]
+        return result
+
+    def histogram(self, measure, by=None):
+        # Returns (group keys, summed bin counts, stats) for the requested grouping.
+        keys, hist = self.sketch_keys, self.sketches[measure]
+        if by is None:
+            groups = np.zeros(len(keys), dtype=np.int64)
+            index = pd.DataFrame(index=[0])
+        else:
+            grouped = keys.groupby(by, observed=True, dropna=False, sort=True)
+            groups = grouped.ngroup().to_numpy()
+            index = grouped.size().reset_index()[list(np.atleast_1d(by))]
+        n_groups = len(index)
+        summed = np.zeros((n_groups, hist.shape[1]), dtype=np.int64)
+        np.add.at(summed, groups, hist)
+        stats = pd.DataFrame({
+            "count": np.bincount(groups, keys[f"{measure}_count"].fillna(0), n_groups),
+            "sum": np.bincount(groups, keys[f"{measure}_sum"].fillna(0), n_groups),
+            "min": pd.Series(keys[f"{measure}_min"].to_numpy()).groupby(groups).min().reindex(range(n_groups)).to_numpy(),
+            "max": pd.Series(keys[f"{measure}_max"].to_numpy()).groupby(groups).max().reindex(range(n_groups)).to_numpy(),
+        })
+        return index.reset_index(drop=True), summed, stats
+
+    def quantiles(self, measure, qs=(0.25, 0.5, 0.75), by=None):
+        # Quantiles interpolated linearly inside the sketch bins and clipped to
+        # the exact min/max, so the error is bounded by one bin width.
+        index, summed, stats = self.histogram(measure, by)
+        edges = SKETCH_EDGES[measure]
+        out = index.copy()
+        cumulative = np.cumsum(summed, axis=1)
+        for q in qs:
+            values = np.full(len(index), np.nan)
+            for i, cum in enumerate(cumulative):
+                total = cum[-1]
+                if total == 0:
+                    continue
+                target = q * total
+                b = int(np.searchsorted(cum, target, side="left"))
+                before = cum[b - 1] if b > 0 else 0
+                frac = (target - before) / max(summed[i, b], 1)
+                values[i] = np.clip(edges[b] + frac * (edges[b + 1] - edges[b]), stats["min"][i], stats["max"][i])
+            out[f"q{int(round(q * 100))}"] = values
+        for column in stats.columns:
+            out[column] = stats[column].to_numpy()
+        out["mean"] = out["sum"] / out["count"].where(out["count"] > 0)
+        return out
+
+
+def build_cube(df):
+    dims = [c for c in CUBE_DIMS if c in df.columns]
+    measures = {m: m in df.columns for m in ("frp", "brightness")}
+    if not dims:
+        raise ValueError("Data has none of the cube dimensions")
+    agg = {"count": (dims[0], "size")}
+    for m, present in measures.items():
+        if present:
+            agg[f"{m}_sum"] = (m, "sum")
+    cells = df.groupby(dims, observed=True, dropna=False, sort=False).agg(**agg).reset_index()
+
+    sketch_dims = [c for c in SKETCH_DIMS if c in df.columns]
+    grouped = df.groupby(sketch_dims, observed=True, dropna=False, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    sketch_keys = grouped.size().reset_index()[sketch_dims]
+    sketches = {}
+    for m, present in measures.items():
+        if not present:
+            continue
+        values = pd.to_numeric(df[m], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        sketches[m], stats = _sketch(values, codes, len(sketch_keys), SKETCH_EDGES[m])
+        for stat in stats.columns:
+            sketch_keys[f"{m}_{stat}"] = stats[stat].to_numpy()
+
+    locations = {}
+    for column in LOCATION_COLUMNS:
+        if column in df.columns:
+            keys = [c for c in FILTER_DIMS if c in df.columns] + [column]
+            locations[column] = df.groupby(keys, observed=True, sort=False).size().reset_index(name="count")
+    return FireCube(cells, sketch_keys, sketches, locations)
@@ -0,0 +1,178 @@
+# --- Shared feature encoding and scoring for the fire-type model ---
+# Used by the Streamlit Prediction page and the headless batch scorer so both
+# build the model input exactly the same way.
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from compiled_model import COMPILED_PATH, CompiledModel
+
+MODEL_PATH = "best_fire_detection_model.pkl"
+SCALER_PATH = "scaler.pkl"
+
+# Model input order: the scaler was fitted on these six columns in this order.
+FEATURE_COLUMNS = ["brightness", "bright_t31", "frp", "scan", "track", "confidence"]
+CONFIDENCE_MAP = {"low": 0, "nominal": 1, "high": 2}
+FIRE_TYPES = {
+    0: "Vegetation Fire",
+    2: "Other Static Land Source",
+    3: "Offshore Fire"
+}
+# Prediction page inputs: label and (min, max, default, step) of each numeric feature.
+SLIDER_RANGES = {
+    "brightness": ("Brightness", 200.0, 500.0, 300.0, 0.1),
+    "bright_t31": ("Brightness T31", 200.0, 350.0, 290.0, 0.1),
+    "frp": ("Fire Radiative Power (FRP)", 0.0, 100.0, 15.0, 0.1),
+    "scan": ("Scan", 0.1, 10.0, 1.0, 0.1),
+    "track": ("Track", 0.1, 10.0, 1.0, 0.1),
+}
+
+
+def load_model(path=MODEL_PATH):
+    import joblib
+    return joblib.load(path)
+
+
+def load_scaler(path=SCALER_PATH):
+    import joblib
+    return joblib.load(path)
+
+
+def pickle_signature(model_path, scaler_path):
+    # Size/mtime of the source pickles, stored in the export to detect staleness.
+    return "|".join(f"{os.path.abspath(p)}:{os.stat(p).st_size}:{os.stat(p).st_mtime_ns}"
+                    for p in (model_path, scaler_path))
+
+
+def load_compiled(path=COMPILED_PATH, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    # Reuses the export while it was compiled from these exact pickles (or when
+    # only the export is deployed); otherwise compiles the pickles (needs
+    # sklearn) and refreshes the export.
+    have_pickles = os.path.exists(model_path) and os.path.exists(scaler_path)
+    signature = pickle_signature(model_path, scaler_path) if have_pickles else None
+    if os.path.exists(path):
+        try:
+            compiled = CompiledModel.load(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            compiled = None  # unreadable export: compile it again below
+        if compiled is not None and (signature is None or compiled.source == signature):
+            return compiled
+    compiled = CompiledModel.compile(load_scaler(scaler_path), load_model(model_path), source=signature)
+    try:
+        compiled.save(path)
+    except OSError:
+        pass  # read-only checkout: keep the in-memory copy
+    return compiled
+
+
+def load_predictor(model_path=MODEL_PATH, scaler_path=SCALER_PATH, engine="compiled"):
+    # Returns (scaler, model) for predict_array: (None, CompiledModel) when the
+    # model can be compiled, else the sklearn scaler and model.
+    if engine == "compiled":
+        try:
+            return None, load_compiled(model_path=model_path, scaler_path=scaler_path)
+        except (ValueError, OSError, zipfile.BadZipFile):
+            pass  # unsupported model type, or an unreadable export and no pickles
+    return load_scaler(scaler_path), load_model(model_path)
+
+
+def load_pipeline(model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    # Fuses the fitted scaler and model into one sklearn Pipeline; the scaler
+    # emits a DataFrame so the model still sees its fitted feature names.
+    from sklearn.pipeline import Pipeline
+    pipeline = Pipeline([("scaler", load_scaler(scaler_path)), ("model", load_model(model_path))])
+    return pipeline.set_output(transform="pandas")
+
+
+def confidence_value(value):
+    # Scalar version of encode_confidence for single records.
+    if isinstance(value, str) and value.strip().lower() in CONFIDENCE_MAP:
+        return CONFIDENCE_MAP[value.strip().lower()]
+    numeric = float(value)
+    if numeric != numeric:
+        raise ValueError("confidence is NaN")
+    return 0 if numeric < 30 else 1 if numeric < 80 else 2
+
+
+def encode_record(record):
+    # Encodes one dict-like detection into a float64 row in FEATURE_COLUMNS order.
+    missing = [c for c in FEATURE_COLUMNS if c not in record]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    row = [float(record[c]) for c in FEATURE_COLUMNS[:-1]]
+    row.append(float(confidence_value(record["confidence"])))
+    row = np.array(row, dtype="float64")
+    if np.isnan(row).any():
+        raise ValueError("Feature values must not be NaN")
+    return row
+
+
+def encode_confidence(values):
+    # Text levels go through CONFIDENCE_MAP. Raw MODIS files carry a numeric
+    # 0-100 % confidence instead, which is bucketed into the C6.1 classes
+    # (low < 30 <= nominal < 80 <= high) before mapping.
+    values = pd.Series(values)
+    numeric = pd.to_numeric(values, errors="coerce")
+    text = values.astype("string").str.strip().str.lower()
+    encoded = text.map(CONFIDENCE_MAP).astype("float64")
+    buckets = np.select([numeric < 30, numeric < 80], [0, 1], 2).astype("float64")
+    use_numeric = numeric.notna().to_numpy() & encoded.isna().to_numpy()
+    return np.where(use_numeric, buckets, encoded.to_numpy())
+
+
+def encode_features(df):
+    # Returns a float64 (n, 6) block in FEATURE_COLUMNS order; rows with missing
+    # or unmappable values contain NaN.
+    missing = [c for c in FEATURE_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    X = np.empty((len(df), len(FEATURE_COLUMNS)), dtype="float64")
+    for i, column in enumerate(FEATURE_COLUMNS[:-1]):
+        X[:, i] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    X[:, -1] = encode_confidence(df["confidence"])
+    return X
+
+
+def _with_names(X, estimator):
+    # Wrap once per block so sklearn sees the feature names it was fitted with.
+    names = getattr(estimator, "feature_names_in_", None)
+    return X if names is None else pd.DataFrame(X, columns=names)
+
+
+def predict_array(X, scaler, model):
+    if isinstance(model, CompiledModel):
+        return model.predict(X)  # the scaler is folded into the compiled model
+    scaled = scaler.transform(_with_names(X, scaler))
+    return np.asarray(model.predict(_with_names(scaled, model)))
+
+
+def predict_proba_array(X, scaler, model):
+    # (classes, probabilities) from one scaler + model call. Probabilities are
+    # None for models without them (e.g. linear SVMs); use predict_array then.
+    if isinstance(model, CompiledModel):
+        return model.classes_, model.predict_proba(X) if model.kind == "trees" else None
+    if not hasattr(model, "predict_proba"):
+        return np.asarray(model.classes_), None
+    scaled = scaler.transform(_with_names(X, scaler))
+    return np.asarray(model.classes_), np.asarray(model.predict_proba(_with_names(scaled, model)))
+
+
+def predict_pipeline(X, pipeline):
+    return np.asarray(pipeline.predict(_with_names(X, pipeline)))
+
+
+def predict_frame(df, scaler, model):
+    # Scores every valid row of df in one vectorised call. Returns (labels, valid)
+    # where labels is a nullable Int64 array aligned with df.
+    X = encode_features(df)
+    valid = ~np.isnan(X).any(axis=1)
+    labels = pd.array(np.full(len(df), pd.NA), dtype="Int64")
+    if valid.any():
+        labels[valid] = predict_array(X[valid], scaler, model)
+    return labels, valid
+
+
+def label_names(labels):
+    return pd.Series(labels, dtype="Int64").map(FIRE_TYPES).fillna("Unknown").to_numpy()
@@ -0,0 +1,489 @@
+# --- Incremental ingestion into a year/month-partitioned MODIS store ---
+# Detection files (yearly archive exports and daily FIRMS near-real-time files)
+# are discovered by glob under the data directory, validated, de-duplicated on
+# (latitude, longitude, acq_date, acq_time, satellite) and appended as Arrow IPC
+# fragments to .modis_cache/store/year=YYYY/month=MM/, clustered by grid cell for
+# the spatial index (see spatial_index.py). A ledger records every
+# processed file, so a run reads only new or changed files and checks only the
+# partitions they touch for duplicates. The fire cube and the daily rollup are
+# updated by merging in the aggregates of the new rows, so ingesting a day
+# costs time proportional to that day rather than to the whole archive; full
+# rebuilds stream the store in bounded batches (see streaming.py). Fire events
+# (see events.py) are extended with the new days the same way.
+#
+#   python ingest.py                       # ingest new files under FIRE_DATA_DIR
+#   python ingest.py incoming/2024-05-01.csv
+#   python ingest.py --rebuild-aggregates --memory-limit 1024
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import events
+import spatial_index
+from daily_rollup import DailyRollup
+from fire_cube import FireCube
+from modis_store import CACHE_DIR, file_sha256, prepare_table, read_csv, source_state
+from streaming import MEMORY_LIMIT_MB, Aggregates, aggregate_fragments, fragment_sizes, plan, row_bytes, seed_for
+
+DATA_DIR = Path(os.environ.get("FIRE_DATA_DIR", "."))
+INGEST_PATTERNS = ["modis_*_India.csv", "incoming/*.csv"]
+STORE_DIR = CACHE_DIR / "store"
+STORE_FORMAT = 2  # 2: fragments clustered by grid cell, with spatial_index directories
+DEDUPE_KEYS = ["latitude", "longitude", "acq_date", "acq_time", "satellite"]
+REQUIRED_COLUMNS = DEDUPE_KEYS + ["brightness", "frp", "confidence"]
+# Every fragment gets this schema, whatever types the CSV reader inferred, so
+# fragments from different files concatenate without promotion. Missing
+# optional columns become nulls; unknown columns are dropped.
+COLUMN_TYPES = {
+    "latitude": pa.float64(), "longitude": pa.float64(), "brightness": pa.float64(),
+    "scan": pa.float64(), "track": pa.float64(), "acq_date": pa.string(), "acq_time": pa.int64(),
+    "satellite": pa.string(), "instrument": pa.string(), "confidence": pa.int64(),
+    "version": pa.string(), "bright_t31": pa.float64(), "frp": pa.float64(),
+    "daynight": pa.string(), "type": pa.int64(),
+}
+# FIRMS near-real-time files abbreviate the satellite; the archive spells it out.
+SATELLITE_NAMES = {"T": "Terra", "A": "Aqua"}
+
+
+class IngestError(Exception):
+    pass
+
+
+def discover(data_dir=DATA_DIR, patterns=INGEST_PATTERNS):
+    data_dir = Path(data_dir)
+    return sorted({p for pattern in patterns for p in data_dir.glob(pattern) if p.is_file()})
+
+
+def files_signature(paths):
+    # Stat-only fingerprint of the discovered files, used as a cache key.
+    return tuple((str(p), *source_state(p).values()) for p in paths if Path(p).exists())
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    tmp_path = Path(path).with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_ledger(store_dir=STORE_DIR):
+    ledger = _read_json(Path(store_dir) / "ledger.json", None)
+    if ledger is None or ledger.get("format") != STORE_FORMAT:
+        return {"format": STORE_FORMAT, "generation": 0, "files": {}, "rejected": {}}
+    return ledger
+
+
+def store_signature(store_dir=STORE_DIR):
+    # Changes whenever an ingest commits (the ledger is rewritten last).
+    path = Path(store_dir) / "ledger.json"
+    return (str(path), *source_state(path).values()) if path.exists() else (str(path),)
+
+
+def fragments(ledger):
+    return [f for entry in ledger["files"].values() for f in entry["fragments"]]
+
+
+def pending(paths, ledger):
+    # Files not in the ledger, or whose content changed since they were ingested.
+    # A touched but unchanged file only gets its recorded mtime refreshed.
+    todo = []
+    for path in paths:
+        key = str(Path(path).resolve())
+        entry = ledger["files"].get(key) or ledger["rejected"].get(key)
+        state = source_state(path)
+        if entry is not None and entry["size"] == state["size"] and entry["mtime_ns"] == state["mtime_ns"]:
+            continue
+        if key in ledger["files"] and entry["size"] == state["size"] and entry["sha256"] == file_sha256(path):
+            entry.update(state)
+            continue
+        todo.append(Path(path))
+    return todo
+
+
+def _row_keys(table):
+    # 64-bit hash of the de-duplication key of every row.
+    keys = table.select(DEDUPE_KEYS).to_pandas()
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def read_detections(path, predictor=None):
+    # Reads one CSV into the store schema. Returns (table, invalid_rows, typed_rows);
+    # raises IngestError when the file cannot be used at all. Files without a
+    # `type` column (FIRMS NRT) are classified with predictor() when given.
+    try:
+        raw = read_csv(path)
+    except (pa.ArrowInvalid, OSError) as e:
+        raise IngestError(f"unreadable CSV: {e}") from e
+    missing = [c for c in REQUIRED_COLUMNS if c not in raw.column_names]
+    if missing:
+        raise IngestError(f"missing required columns: {', '.join(missing)}")
+    columns = {}
+    for name, type_ in COLUMN_TYPES.items():
+        if name not in raw.column_names:
+            columns[name] = pa.nulls(raw.num_rows, type_)
+            continue
+        try:
+            columns[name] = pc.cast(raw[name], type_)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise IngestError(f"column {name}: {e}") from e
+    satellite = columns["satellite"]
+    for short, name in SATELLITE_NAMES.items():
+        satellite = pc.if_else(pc.equal(satellite, short), name, satellite)
+    columns["satellite"] = satellite
+
+    # Rows with an unusable key or measurement are dropped and counted.
+    date = pc.strptime(columns["acq_date"], format="%Y-%m-%d", unit="ns", error_is_null=True)
+    time_ = columns["acq_time"]
+    valid = pc.and_kleene(pc.is_valid(date), pc.is_valid(columns["satellite"]))
+    for check in (
+        pc.and_(pc.greater_equal(columns["latitude"], -90), pc.less_equal(columns["latitude"], 90)),
+        pc.and_(pc.greater_equal(columns["longitude"], -180), pc.less_equal(columns["longitude"], 180)),
+        pc.and_(pc.greater_equal(time_, 0), pc.less_equal(time_, 2359)),
+        pc.is_valid(columns["brightness"]),
+        pc.is_valid(columns["frp"]),
+    ):
+        valid = pc.and_kleene(valid, pc.fill_null(check, False))
+    table = pa.table(columns).filter(valid)
+    invalid = raw.num_rows - table.num_rows
+
+    typed = 0
+    if "type" not in raw.column_names and predictor is not None and table.num_rows:
+        import fire_model
+        labels, valid_features = fire_model.predict_frame(table.to_pandas(), *predictor())
+        table = table.set_column(table.schema.get_field_index("type"), "type", pa.array(labels, pa.int64()))
+        typed = int(valid_features.sum())
+    return prepare_table(table), invalid, typed
+
+
+def _read_fragment(store_dir, fragment):
+    return pa.ipc.open_file(pa.memory_map(str(Path(store_dir) / fragment))).read_all()
+
+
+def _existing_keys(store_dir, ledger, partition):
+    prefix = partition + "/"
+    keys = [_read_fragment(store_dir, f)["row_key"].to_numpy() for f in fragments(ledger) if f.startswith(prefix)]
+    return np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64)
+
+
+def _write_fragment(path, table):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=1 << 20)
+    os.replace(tmp_path, path)
+
+
+def append_file(path, ledger, store_dir=STORE_DIR, predictor=None):
+    # Splits one file's new detections into year/month fragments. Returns the
+    # ledger entry and the tables of rows actually added (one per partition).
+    table, invalid, typed = read_detections(path, predictor)
+    rows = table.num_rows + invalid
+    keys = _row_keys(table)
+    _, first = np.unique(keys, return_index=True)  # duplicates inside the file
+    first.sort()
+    duplicates = table.num_rows - len(first)
+    table = table.take(first).append_column("row_key", pa.array(keys[first], pa.uint64()))
+
+    state = source_state(path)
+    sha256 = file_sha256(path)
+    partition_id = pc.add(pc.multiply(table["year"].cast(pa.int32()), 100), table["month"].cast(pa.int32()))
+    added, written = [], []
+    for pid in sorted(pc.unique(partition_id).to_pylist()):
+        year, month = divmod(pid, 100)
+        part = table.filter(pc.equal(partition_id, pid))
+        partition = f"year={year}/month={month:02d}"
+        seen = np.isin(part["row_key"].to_numpy(), _existing_keys(store_dir, ledger, partition))
+        duplicates += int(seen.sum())
+        part = part.filter(pa.array(~seen))
+        if part.num_rows == 0:
+            continue
+        fragment = f"{partition}/{Path(path).stem}-{sha256[:12]}.arrow"
+        part, cells, offsets = spatial_index.cluster(part.unify_dictionaries())
+        _write_fragment(Path(store_dir) / fragment, part)
+        spatial_index.write_directory(Path(store_dir) / fragment, cells, offsets)
+        written.append(fragment)
+        added.append(part)
+    entry = {
+        **state,
+        "sha256": sha256,
+        "rows": rows,
+        "added": sum(t.num_rows for t in added),
+        "duplicates": duplicates,
+        "invalid": invalid,
+        "typed_by_model": typed,
+        "fragments": written,
+        "ingested": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return entry, added
+
+
+def _drop_orphans(store_dir, ledger):
+    # Fragments (and their spatial directories) written by a run that died
+    # before committing its ledger.
+    known = set(fragments(ledger))
+    known |= {spatial_index.directory_path(f).as_posix() for f in known}
+    for path in Path(store_dir).glob("year=*/month=*/*.arrow*"):
+        if path.relative_to(store_dir).as_posix() not in known:
+            path.unlink()
+
+
+def _concat(tables):
+    return pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+
+
+def load_frame(store_dir=STORE_DIR, ledger=None):
+    ledger = read_ledger(store_dir) if ledger is None else ledger
+    tables = [_read_fragment(store_dir, f) for f in sorted(fragments(ledger))]
+    if not tables:
+        return pd.DataFrame()
+    # split_blocks lets numeric columns stay backed by the memory-mapped buffers.
+    return _concat(tables).drop_columns("row_key").to_pandas(split_blocks=True)
+
+
+def load_spatial_index(store_dir=STORE_DIR, ledger=None):
+    # Row ids follow load_frame's fragment order.
+    ledger = read_ledger(store_dir) if ledger is None else ledger
+    return spatial_index.SpatialIndex(store_dir, fragments(ledger))
+
+
+def _aggregates_dir(store_dir):
+    return Path(store_dir) / "aggregates"
+
+
+def _save_aggregates(store_dir, aggregates, generation, periods=None):
+    path = _aggregates_dir(store_dir)
+    aggregates.cube.save(path / "cube", periods)
+    aggregates.rollup.save(path / "daily_rollup.parquet")
+    aggregates.sample.to_feather(path / "sample.arrow")
+    _write_json(path / "state.json", {"generation": generation, "rows": aggregates.rows})
+
+
+def _load_saved(store_dir, periods=None):
+    # The saved aggregates (with only `periods` of the cube), or None.
+    path = _aggregates_dir(store_dir)
+    state = _read_json(path / "state.json", {})
+    cube = FireCube.load(path / "cube", periods)
+    rollup = DailyRollup.load(path / "daily_rollup.parquet")
+    try:
+        sample = pd.read_feather(path / "sample.arrow")
+    except (OSError, ValueError):
+        return None
+    if cube is None or rollup is None or "rows" not in state:
+        return None
+    return Aggregates(cube, rollup, sample, state["rows"])
+
+
+def _file_aggregates(tables, seed):
+    # Aggregates of the rows one file added.
+    return Aggregates.build(_concat(tables).drop_columns("row_key").to_pandas(), seed=seed)
+
+
+def _merge_aggregates(store_dir, new, generation):
+    # Folds the new rows' aggregates into the saved ones; only the cube months
+    # that received rows are read, merged and rewritten. False when the saved
+    # aggregates cannot be read.
+    periods = new.cube.periods()
+    saved = _load_saved(store_dir, periods)
+    if saved is None:
+        return False
+    _save_aggregates(store_dir, saved.merge(new), generation, periods)
+    return True
+
+
+def rebuild_aggregates(store_dir=STORE_DIR, ledger=None, memory_limit_mb=MEMORY_LIMIT_MB, max_workers=None):
+    # Recomputes the aggregates out of core (see streaming.py), so the store
+    # never has to fit in memory.
+    ledger = read_ledger(store_dir) if ledger is None else ledger
+    aggregates = aggregate_fragments(store_dir, fragments(ledger), memory_limit_mb, max_workers)
+    if aggregates.cube is not None:
+        _save_aggregates(store_dir, aggregates, ledger["generation"])
+    return aggregates
+
+
+def _events_dir(store_dir):
+    return Path(store_dir) / "events"
+
+
+def _event_rows(tables):
+    table = _concat(tables)
+    return table.select([c for c in events.INPUT_COLUMNS if c in table.column_names]).to_pandas()
+
+
+def rebuild_events(store_dir=STORE_DIR, ledger=None):
+    # Builds the events one month partition at a time in date order, so only a
+    # month of detections is in memory at once.
+    ledger = read_ledger(store_dir) if ledger is None else ledger
+    by_partition = {}
+    for fragment in sorted(fragments(ledger)):
+        by_partition.setdefault(Path(fragment).parent.as_posix(), []).append(_read_fragment(store_dir, fragment))
+    builder = events.EventBuilder()
+    for partition in sorted(by_partition):
+        builder.extend(_event_rows(by_partition[partition]))
+    if builder.events is not None:
+        builder.save(_events_dir(store_dir), generation=ledger["generation"])
+    return builder
+
+
+def _extend_events(store_dir, frames, generation):
+    # Extends the saved events with the new rows. Saved events that cannot be
+    # read, or new rows older than their latest day (a backfill), leave them
+    # stale, to be rebuilt by load_events.
+    loaded = events.EventBuilder.load(_events_dir(store_dir), closed=False)
+    if loaded is None:
+        return
+    builder = loaded[0]
+    try:
+        if frames:
+            builder.extend(pd.concat(frames, ignore_index=True))
+    except ValueError:
+        return
+    builder.save(_events_dir(store_dir), generation=generation)
+
+
+def load_events(store_dir=STORE_DIR):
+    # The event table of the committed store. Ingest extends the saved events
+    # when they are current; otherwise they are rebuilt here, on first use.
+    ledger = read_ledger(store_dir)
+    if _read_json(_events_dir(store_dir) / "state.json", {}).get("generation") == ledger["generation"]:
+        loaded = events.EventBuilder.load(_events_dir(store_dir))
+        if loaded is not None:
+            return loaded[0].table()
+    return rebuild_events(store_dir, ledger).table()
+
+
+def stored_rows(store_dir=STORE_DIR):
+    return sum(entry["added"] for entry in read_ledger(store_dir)["files"].values())
+
+
+def load_aggregates(store_dir=STORE_DIR):
+    # Aggregates (cube, daily rollup, row sample) of the committed store;
+    # recomputed when missing or left behind by an interrupted ingest.
+    ledger = read_ledger(store_dir)
+    if _read_json(_aggregates_dir(store_dir) / "state.json", {}).get("generation") == ledger["generation"]:
+        saved = _load_saved(store_dir)
+        if saved is not None:
+            return saved
+    return rebuild_aggregates(store_dir, ledger)
+
+
+def ingest(paths, store_dir=STORE_DIR, predictor=None):
+    # Ingests the new or changed files among `paths`. Returns {path: ledger entry
+    # or {"error": ...}} for the files processed in this run.
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    ledger = read_ledger(store_dir)
+    _drop_orphans(store_dir, ledger)
+    before = json.dumps(ledger, sort_keys=True)
+    todo = pending(paths, ledger)
+    # New rows are aggregated file by file as they are appended, then merged
+    # into the saved aggregates (or saved as they are for a new store); stale
+    # aggregates are instead rebuilt from the store after the files are in.
+    state = _read_json(_aggregates_dir(store_dir) / "state.json", {})
+    new_store = not fragments(ledger)
+    incremental = new_store or state.get("generation") == ledger["generation"]
+    # Events are only extended when they are current and the new rows come in
+    # date order; anything else leaves them stale for load_events to rebuild.
+    events_current = _read_json(_events_dir(store_dir) / "state.json", {}).get("generation") == ledger["generation"]
+    report, added, event_rows = {}, Aggregates(), []
+    for path in todo:
+        key = str(path.resolve())
+        try:
+            entry, tables = append_file(path, ledger, store_dir, predictor)
+        except IngestError as e:
+            ledger["rejected"][key] = {**source_state(path), "error": str(e)}
+            report[key] = {"error": str(e)}
+            continue
+        ledger["rejected"].pop(key, None)
+        previous = ledger["files"].get(key)
+        if previous is not None:
+            # A re-issued file keeps its earlier fragments; the new one holds only
+            # the rows that were not seen before.
+            entry["fragments"] = previous["fragments"] + entry["fragments"]
+        ledger["files"][key] = entry
+        report[key] = entry
+        if incremental and tables:
+            added = added.merge(_file_aggregates(tables, seed_for(f"{ledger['generation']}:{key}")))
+        if events_current and tables:
+            event_rows.append(_event_rows(tables))
+
+    if not todo:
+        if json.dumps(ledger, sort_keys=True) != before:
+            _write_json(store_dir / "ledger.json", ledger)  # refreshed mtimes only
+        return report
+    # Aggregates are saved under the next generation before the ledger commits
+    # it, so a crash in between is detected by load_aggregates and repaired.
+    ledger["generation"] += 1
+    if not incremental:
+        rebuild_aggregates(store_dir, ledger)
+    elif added.cube is None:
+        if not new_store:
+            _write_json(_aggregates_dir(store_dir) / "state.json", {**state, "generation": ledger["generation"]})
+    elif new_store:
+        _save_aggregates(store_dir, added, ledger["generation"])
+    elif not _merge_aggregates(store_dir, added, ledger["generation"]):
+        rebuild_aggregates(store_dir, ledger)
+    if events_current:
+        _extend_events(store_dir, event_rows, ledger["generation"])
+    _write_json(store_dir / "ledger.json", ledger)
+    return report
+
+
+def _model_predictor():
+    import fire_model
+    if not (os.path.exists(fire_model.MODEL_PATH) and os.path.exists(fire_model.SCALER_PATH)):
+        return None
+    return fire_model.load_predictor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest new MODIS/FIRMS detection files into the partitioned store.")
+    parser.add_argument("files", nargs="*", help="files to ingest (default: discover under --data-dir)")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--pattern", action="append", help=f"glob under --data-dir (default: {' '.join(INGEST_PATTERNS)})")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--no-classify", action="store_true", help="leave `type` empty for files without it")
+    parser.add_argument("--rebuild-aggregates", action="store_true")
+    parser.add_argument("--memory-limit", type=int, default=MEMORY_LIMIT_MB, help="MB for rebuilds (default: FIRE_MEMORY_LIMIT_MB or %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="at most this many worker processes (default: cores)")
+    args = parser.parse_args(argv)
+
+    if args.rebuild_aggregates:
+        sizes = fragment_sizes(args.store, fragments(read_ledger(args.store)))
+        workers, batch_rows = plan(args.memory_limit, args.workers, row_bytes(sizes))
+        print(f"{workers} worker(s), batches of {batch_rows:,} rows")
+        start = time.perf_counter()
+        aggregates = rebuild_aggregates(args.store, memory_limit_mb=args.memory_limit, max_workers=args.workers)
+        print(f"Rebuilt aggregates over {aggregates.rows:,} detections in {time.perf_counter() - start:.1f}s")
+        return 0
+    paths = [Path(p) for p in args.files] or discover(args.data_dir, args.pattern or INGEST_PATTERNS)
+    predictor = None if args.no_classify else _model_predictor()
+    start = time.perf_counter()
+    report = ingest(paths, args.store, predictor=predictor)
+    for path, entry in report.items():
+        if "error" in entry:
+            print(f"{path}: rejected ({entry['error']})")
+        else:
+            print(f"{path}: {entry['added']:,} added, {entry['duplicates']:,} duplicates, {entry['invalid']:,} invalid")
+    print(f"{len(report)} of {len(paths)} files processed in {time.perf_counter() - start:.1f}s")
+    return 1 if any("error" in e for e in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
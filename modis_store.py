@@ -0,0 +1,56 @@
+# --- Parsing of MODIS CSVs into typed Arrow tables ---
+# read_csv() parses a modis_{year}_India.csv (or an NRT file) with the same
+# schema for every file, and prepare_table() adds categorical
+# type/confidence/daynight, a parsed acq_date and 1° lat/lon bins. ingest.py
+# writes the prepared tables into the partitioned store under .modis_cache/.
+import hashlib
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+CACHE_DIR = Path(".modis_cache")
+CATEGORICAL_COLUMNS = ["type", "confidence", "daynight"]
+# Read as text so every year gets the same schema (e.g. version is "61.03" in
+# archive files but "6.1NRT" in near-real-time ones).
+TEXT_COLUMNS = ["acq_date", "satellite", "instrument", "version", "daynight"]
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_state(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_csv(csv_path):
+    convert_options = pacsv.ConvertOptions(column_types={name: pa.string() for name in TEXT_COLUMNS})
+    return pacsv.read_csv(csv_path, convert_options=convert_options)
+
+
+def prepare_table(table):
+    # Each row's year comes from its acq_date (NRT files can span years).
+    if "acq_date" not in table.column_names:
+        raise ValueError("table has no acq_date column; year and month are derived from it")
+    columns = {}
+    for name in table.column_names:
+        column = table[name]
+        if name == "acq_date":
+            column = pc.strptime(column, format="%Y-%m-%d", unit="ns", error_is_null=True)
+        elif name in CATEGORICAL_COLUMNS:
+            column = column.dictionary_encode()
+        columns[name] = column
+    if "latitude" in columns and "longitude" in columns:
+        columns["lat_bin"] = pc.floor(columns["latitude"]).cast(pa.int16())
+        columns["lon_bin"] = pc.floor(columns["longitude"]).cast(pa.int16())
+    columns["month"] = pc.month(columns["acq_date"]).cast(pa.int8())
+    columns["year"] = pc.year(columns["acq_date"]).cast(pa.int16())
+    return pa.table(columns).unify_dictionaries()
@@ -0,0 +1,219 @@
+# --- Headless fire-type scoring service ---
+# Local HTTP/JSON service around the compiled fire-type model (or, with
+# --engine sklearn, the fused scaler+model pipeline). Concurrent
+# single-row requests are queued and coalesced into micro-batches (up to
+# --max-batch rows or --max-wait-ms, whichever comes first) so each batch costs
+# one vectorised predict call instead of one call per request.
+#
+#   python predict_service.py --port 8502
+#   curl -s localhost:8502/predict -d '{"brightness": 320, "bright_t31": 295,
+#        "frp": 18, "scan": 1.1, "track": 1.0, "confidence": "high"}'
+#
+# Endpoints: POST /predict (one record, or {"instances": [...]}), GET /stats,
+# GET /health.
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import fire_model
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+LATENCY_WINDOW = 10_000
+
+
+class MicroBatcher:
+    # predict_fn takes an (n, 6) float64 block and returns n labels.
+    def __init__(self, predict_fn, max_batch_size=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes = {}
+        self._requests = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        future = Future()
+        self._queue.put((row, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                labels = self.predict_fn(np.vstack([row for row, _, _ in batch]))
+                if len(labels) != len(batch):
+                    # Zipping would leave the unmatched requests waiting forever.
+                    raise ValueError(f"predict_fn returned {len(labels)} labels for {len(batch)} rows")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            done = time.perf_counter()
+            for (_, future, queued), label in zip(batch, labels):
+                future.set_result(label)
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                # Power-of-two buckets keep the histogram small.
+                bucket = 1 << (len(batch) - 1).bit_length()
+                self._batch_sizes[bucket] = self._batch_sizes.get(bucket, 0) + 1
+                self._latencies.extend(done - queued for _, _, queued in batch)
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000.0
+            stats = {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": self._batches,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "batch_size_histogram": {f"<={k}": v for k, v in sorted(self._batch_sizes.items())},
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+        if len(latencies):
+            for q in (50, 95, 99):
+                stats[f"latency_p{q}_ms"] = float(np.percentile(latencies, q))
+        return stats
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    batcher = None  # set by make_server
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.batcher.stats())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            records = payload["instances"] if isinstance(payload, dict) and "instances" in payload else [payload]
+            if not all(isinstance(r, dict) for r in records):
+                raise ValueError("Each record must be a JSON object")
+            rows = [fire_model.encode_record(r) for r in records]
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        try:
+            futures = [self.batcher.submit(row) for row in rows]
+            predictions = [_prediction(f.result()) for f in futures]
+        except Exception as e:
+            self._send_json(500, {"error": f"Prediction failed: {e}"})
+            return
+        if isinstance(payload, dict) and "instances" in payload:
+            self._send_json(200, {"predictions": predictions})
+        else:
+            self._send_json(200, predictions[0])
+
+    def log_message(self, format, *args):
+        pass  # keep per-request logging off the hot path
+
+
+def _prediction(label):
+    label = int(label)
+    return {"predicted_type": label, "predicted_label": fire_model.FIRE_TYPES.get(label, "Unknown")}
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # listen backlog; the default of 5 resets bursts
+
+
+def make_server(batcher, host="127.0.0.1", port=8502):
+    handler = type("BoundPredictionHandler", (PredictionHandler,), {"batcher": batcher})
+    return PredictionServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fire-type predictions over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="rows per micro-batch (default: %(default)s)")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="batching window (default: %(default)s)")
+    parser.add_argument("--model", default=fire_model.MODEL_PATH)
+    parser.add_argument("--scaler", default=fire_model.SCALER_PATH)
+    parser.add_argument("--engine", choices=["compiled", "sklearn"], default="compiled",
+                        help="NumPy-compiled model or the fused sklearn pipeline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.engine == "sklearn":
+        pipeline = fire_model.load_pipeline(args.model, args.scaler)
+        predict_fn = lambda X: fire_model.predict_pipeline(X, pipeline)
+    else:
+        scaler, model = fire_model.load_predictor(args.model, args.scaler)
+        predict_fn = lambda X: fire_model.predict_array(X, scaler, model)
+    batcher = MicroBatcher(predict_fn, args.max_batch, args.max_wait_ms)
+    server = make_server(batcher, args.host, args.port)
+    print(f"Serving fire-type predictions on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
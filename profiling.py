@@ -0,0 +1,198 @@
+# --- Per-rerun profiling for the Streamlit app ---
+# A RerunProfiler is created at the top of every rerun. Named stages are timed
+# with `with profiler.stage("load.modis"):`, recording wall time, process RSS
+# and (optionally) the tracemalloc peak; chart stages also record the size of
+# the payload sent to the browser. At the end of the rerun the stages are
+# appended as one JSON line to the profile log and shown in the sidebar panel.
+# When profiling is off, stage() returns a shared no-op object, so the
+# instrumentation costs one attribute check per stage. Allocation tracing is
+# shared by all sessions: it starts with the first tracing profiler and stops
+# when the last one is closed, whether by finish() or, for a rerun cut short by
+# st.rerun()/st.stop(), by close() at the start of the session's next rerun.
+# The tracemalloc peak is process-wide, so traced stages of different sessions
+# run one at a time: tracing is for profiling, not for serving many users.
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from pathlib import Path
+
+import pandas as pd
+
+PROFILE_LOG = Path(os.environ.get("FIRE_PROFILE_LOG", "profile_log.jsonl"))
+_LOG_LOCK = threading.Lock()
+_TRACE_LOCK = threading.Lock()
+# Held by a traced stage from reset_peak() until its peak is read.
+_TRACED_STAGE_LOCK = threading.RLock()
+_tracers = 0          # open profilers that trace allocations
+_owns_tracing = False  # tracing was started here (not by the host process)
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb():
+    # Resident set size from /proc (Linux); elsewhere the peak RSS so far.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux, bytes on macOS
+    return max_rss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def payload_bytes(obj):
+    # Approximate bytes shipped to the browser: Plotly figures go as JSON,
+    # DataFrames (st.map, st.dataframe) as Arrow.
+    if hasattr(obj, "to_json") and hasattr(obj, "data") and hasattr(obj, "layout"):
+        return len(obj.to_json())
+    if isinstance(obj, pd.DataFrame):
+        import pyarrow as pa
+        return pa.Table.from_pandas(obj, preserve_index=False).nbytes
+    return len(json.dumps(obj, default=str))
+
+
+def _start_tracing():
+    global _tracers, _owns_tracing
+    with _TRACE_LOCK:
+        if _tracers == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracing = True
+        _tracers += 1
+
+
+def _stop_tracing():
+    global _tracers, _owns_tracing
+    with _TRACE_LOCK:
+        _tracers -= 1
+        if _tracers == 0 and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def split(self, label):
+        pass
+
+    def payload(self, obj):
+        pass
+
+    def note(self, key, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.record = {"stage": name}
+
+    def __enter__(self):
+        if self.profiler.trace:
+            _TRACED_STAGE_LOCK.acquire()
+            tracemalloc.reset_peak()
+            self._traced = tracemalloc.get_traced_memory()[0]
+        self._rss = current_rss_mb()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record["seconds"] = round(time.perf_counter() - self._start, 4)
+        rss = current_rss_mb()
+        self.record["rss_mb"] = round(rss, 1)
+        self.record["rss_delta_mb"] = round(rss - self._rss, 1)
+        if self.profiler.trace:
+            self.record["traced_peak_mb"] = round((tracemalloc.get_traced_memory()[1] - self._traced) / 2**20, 2)
+            _TRACED_STAGE_LOCK.release()
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        self.profiler.stages.append(self.record)
+        return False
+
+    def split(self, label):
+        # Elapsed time from the start of the stage to this point, e.g. "build".
+        self.record[f"{label}_seconds"] = round(time.perf_counter() - self._start, 4)
+
+    def payload(self, obj):
+        self.record["payload_bytes"] = payload_bytes(obj)
+
+    def note(self, key, value):
+        # Extra per-stage detail, e.g. figure_cache="hit".
+        self.record[key] = value
+
+
+class RerunProfiler:
+    def __init__(self, enabled=False, trace=False, page=None, session=None, log_path=PROFILE_LOG):
+        self.enabled = enabled
+        self.trace = enabled and trace
+        self.page = page
+        self.session = session
+        self.log_path = log_path
+        self.stages = []
+        self._release = None
+        if self.trace:
+            _start_tracing()
+            # Also released if the profiler is dropped without being closed.
+            self._release = weakref.finalize(self, _stop_tracing)
+        self._start = time.perf_counter()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def close(self):
+        # Releases allocation tracing; safe to call more than once.
+        if self._release is not None:
+            self._release()
+
+    def finish(self):
+        # Closes the rerun and appends the report to the JSON log. Returns the
+        # report (None when disabled).
+        try:
+            return self._report() if self.enabled else None
+        finally:
+            self.close()
+
+    def _report(self):
+        report = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "session": self.session,
+            "page": self.page,
+            "total_seconds": round(time.perf_counter() - self._start, 4),
+            "rss_mb": round(current_rss_mb(), 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "payload_bytes": sum(s.get("payload_bytes", 0) for s in self.stages),
+            "stages": self.stages,
+        }
+        if self.log_path is not None:
+            try:
+                with _LOG_LOCK, open(self.log_path, "a") as f:
+                    f.write(json.dumps(report) + "\n")
+            except OSError:
+                pass  # read-only deployment: the panel still shows the report
+        return report
+
+    def table(self):
+        # Stages as a DataFrame for the sidebar panel, slowest first.
+        columns = ["stage", "seconds", "build_seconds", "figure_cache", "payload_bytes", "rss_mb", "rss_delta_mb", "traced_peak_mb", "error"]
+        table = pd.DataFrame(self.stages)
+        table = table[[c for c in columns if c in table.columns]]
+        return table.sort_values("seconds", ascending=False, ignore_index=True) if len(table) else table
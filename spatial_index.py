@@ -0,0 +1,194 @@
+# --- Grid index over the partitioned store for spatial drill-down queries ---
+# Fragments are written clustered by 1/8° grid cell (then by date), so the rows
+# of a cell are contiguous, and each fragment gets a small CSR directory next to
+# it (<fragment>.cells.npz: the sorted cell keys and the first row of each),
+# written once at ingest. A box, radius or polygon query becomes one row range
+# per grid row crossing its bounding box, found by binary search in every
+# fragment's directory; only those candidate rows are tested exactly (box,
+# haversine distance, even-odd point-in-polygon, date range). Month partitions
+# outside the date range are skipped without being touched. Row ids are global
+# positions in the order ingest.load_frame() concatenates the fragments.
+import math
+import re
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+CELL_DEG = 0.125
+EARTH_RADIUS_KM = 6371.0088
+_LAT_CELLS = int(180 / CELL_DEG)
+_LON_CELLS = int(360 / CELL_DEG)
+_PARTITION = re.compile(r"year=(\d+)/month=(\d+)/")
+
+
+def cell_keys(lat, lon):
+    lat_idx = np.clip(np.floor((np.nan_to_num(lat) + 90.0) / CELL_DEG), 0, _LAT_CELLS - 1).astype(np.int64)
+    lon_idx = np.clip(np.floor((np.nan_to_num(lon) + 180.0) / CELL_DEG), 0, _LON_CELLS - 1).astype(np.int64)
+    return lat_idx * _LON_CELLS + lon_idx
+
+
+def directory_path(fragment_path):
+    return Path(f"{fragment_path}.cells.npz")
+
+
+def cluster(table):
+    # Orders a fragment's rows by (cell, date). Returns (table, cells, offsets):
+    # the rows of cells[i] are offsets[i]:offsets[i + 1].
+    keys = cell_keys(table["latitude"].to_numpy(), table["longitude"].to_numpy())
+    dates = table["acq_date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    order = np.lexsort((dates, keys))
+    cells, first = np.unique(keys[order], return_index=True)
+    return table.take(order), cells, np.append(first, len(order))
+
+
+def write_directory(fragment_path, cells, offsets):
+    with open(directory_path(fragment_path), "wb") as f:
+        np.savez(f, cells=cells, offsets=offsets)
+
+
+def haversine_km(lat, lon, center_lat, center_lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    lat0, lon0 = math.radians(center_lat), math.radians(center_lon)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat) * math.cos(lat0) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def in_polygon(lat, lon, polygon):
+    # Even-odd rule over the polygon's (lat, lon) vertices, one edge at a time.
+    inside = np.zeros(len(lat), dtype=bool)
+    vertices = list(polygon)
+    for (lat1, lon1), (lat2, lon2) in zip(vertices, vertices[1:] + vertices[:1]):
+        if lat1 == lat2:
+            continue
+        crosses = (lat1 > lat) != (lat2 > lat)
+        inside ^= crosses & (lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1))
+    return inside
+
+
+def query_bounds(box=None, center=None, radius_km=None, polygon=None):
+    # (lat_min, lat_max, lon_min, lon_max) enclosing every spatial condition, or None.
+    bounds = []
+    if box is not None:
+        bounds.append(tuple(box))
+    if center is not None:
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        widest = max(abs(center[0]) + dlat, 0.0)
+        dlon = 180.0 if widest >= 90 else dlat / math.cos(math.radians(widest))
+        bounds.append((center[0] - dlat, center[0] + dlat, center[1] - dlon, center[1] + dlon))
+    if polygon is not None:
+        lats, lons = zip(*polygon)
+        bounds.append((min(lats), max(lats), min(lons), max(lons)))
+    if not bounds:
+        return None
+    lat_min, lat_max, lon_min, lon_max = zip(*bounds)
+    return max(lat_min), min(lat_max), max(lon_min), min(lon_max)
+
+
+def _expand(starts, ends):
+    # Concatenated aranges start:end for every range, without a Python loop.
+    lengths = ends - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if not len(lengths):
+        return np.empty(0, dtype=np.int64)
+    shifts = starts - np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.repeat(shifts, lengths) + np.arange(lengths.sum())
+
+
+class _Fragment:
+    def __init__(self, path, base):
+        self.path = path
+        self.base = base
+        self.table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        match = _PARTITION.search(path.as_posix())
+        month = np.datetime64(f"{int(match.group(1)):04d}-{int(match.group(2)):02d}", "M")
+        self.first_day, self.end_day = month.astype("datetime64[D]"), (month + 1).astype("datetime64[D]")
+        try:
+            with np.load(directory_path(path)) as directory:
+                self.cells, self.offsets = directory["cells"], directory["offsets"]
+        except OSError:
+            self.cells = self.offsets = None  # no directory: every row is a candidate
+        self._columns = {}
+
+    def column(self, name):
+        # Zero-copy over the memory map for single-chunk fragments.
+        if name not in self._columns:
+            self._columns[name] = self.table[name].to_numpy()
+        return self._columns[name]
+
+    def candidates(self, bounds):
+        if bounds is None or self.cells is None:
+            return np.arange(self.table.num_rows)
+        lat_min, lat_max, lon_min, lon_max = bounds
+        i0, i1 = np.clip(np.floor((np.array([lat_min, lat_max]) + 90.0) / CELL_DEG), 0, _LAT_CELLS - 1).astype(np.int64)
+        j0, j1 = np.clip(np.floor((np.array([lon_min, lon_max]) + 180.0) / CELL_DEG), 0, _LON_CELLS - 1).astype(np.int64)
+        grid_rows = np.arange(i0, i1 + 1) * _LON_CELLS
+        lo = np.searchsorted(self.cells, grid_rows + j0, side="left")
+        hi = np.searchsorted(self.cells, grid_rows + j1, side="right")
+        return _expand(self.offsets[lo], self.offsets[hi])
+
+
+class SpatialIndex:
+    def __init__(self, store_dir, fragments):
+        self._fragments = []
+        base = 0
+        for fragment in sorted(fragments):
+            part = _Fragment(Path(store_dir) / fragment, base)
+            self._fragments.append(part)
+            base += part.table.num_rows
+        self.n_rows = base
+        self._bases = np.array([f.base for f in self._fragments], dtype=np.int64)
+
+    def query(self, box=None, center=None, radius_km=None, polygon=None, start=None, end=None):
+        # Sorted global row ids of the detections inside every given condition:
+        # box (lat_min, lat_max, lon_min, lon_max), center (lat, lon) with
+        # radius_km, polygon [(lat, lon), ...], and start/end dates (inclusive).
+        bounds = query_bounds(box, center, radius_km, polygon)
+        start = None if start is None else np.datetime64(start, "D")
+        end = None if end is None else np.datetime64(end, "D") + 1
+        if bounds is not None and (bounds[0] > bounds[1] or bounds[2] > bounds[3]):
+            return np.empty(0, dtype=np.int64)
+        found = []
+        for part in self._fragments:
+            if (start is not None and part.end_day <= start) or (end is not None and part.first_day >= end):
+                continue
+            rows = part.candidates(bounds)
+            if not len(rows):
+                continue
+            keep = np.ones(len(rows), dtype=bool)
+            if bounds is not None:
+                lat, lon = part.column("latitude")[rows], part.column("longitude")[rows]
+                keep &= (lat >= bounds[0]) & (lat <= bounds[1]) & (lon >= bounds[2]) & (lon <= bounds[3])
+                if center is not None:
+                    keep &= haversine_km(lat, lon, *center) <= radius_km
+                if polygon is not None:
+                    keep &= in_polygon(lat, lon, polygon)
+            if start is not None and start > part.first_day or end is not None and end < part.end_day:
+                days = part.column("acq_date")[rows]
+                if start is not None:
+                    keep &= days >= start
+                if end is not None:
+                    keep &= days < end
+            found.append(np.sort(rows[keep]) + part.base)
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def table(self, rows, columns=None):
+        # The detections at global row ids `rows` (sorted), gathered from the
+        # memory-mapped fragments.
+        rows = np.asarray(rows, dtype=np.int64)
+        owner = np.searchsorted(self._bases, rows, side="right") - 1
+        tables = []
+        for i in np.unique(owner):
+            part = self._fragments[i]
+            table = part.table if columns is None else part.table.select([c for c in columns if c in part.table.column_names])
+            tables.append(table.take(rows[owner == i] - part.base))
+        if not tables:
+            return None
+        return pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+
+    def frame(self, rows, columns=None):
+        table = self.table(rows, columns)
+        if table is None:
+            return None
+        return table.drop_columns([c for c in ("row_key",) if c in table.column_names]).to_pandas()
@@ -0,0 +1,117 @@
+# --- Level-of-detail spatial aggregation for the maps and heatmaps ---
+# Detections are assigned once to a 1/8° grid; every coarser level (1/4° ... 4°)
+# is a power-of-two shift of those indices, so the whole pyramid costs 4 bytes
+# per row. Counts for the unfiltered data are precomputed per level; filtered
+# views aggregate only the selected rows. The level shown is picked from the
+# map zoom so the number of cells in view stays bounded, and raw point layers
+# are capped by a uniform (density-preserving) random sample.
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+LOD_LEVELS = [4.0, 2.0, 1.0, 0.5, 0.25, 0.125]  # cell size in degrees, coarse -> fine
+FINEST_LEVEL = LOD_LEVELS[-1]
+DEFAULT_POINT_BUDGET = 20_000
+MAX_VIEW_CELLS = 6_000
+_LON_CELLS = int(360 / FINEST_LEVEL)
+
+
+def _shift(level):
+    return int(round(math.log2(level / FINEST_LEVEL)))
+
+
+def view_bounds(center_lat, center_lon, zoom, width_px=900, height_px=600):
+    # Approximate (lat_min, lat_max, lon_min, lon_max) of a web-mercator viewport.
+    lon_span = 360.0 * width_px / (256.0 * 2 ** zoom)
+    lat_span = lon_span * height_px / width_px * math.cos(math.radians(center_lat))
+    return (max(center_lat - lat_span / 2, -90.0), min(center_lat + lat_span / 2, 90.0),
+            max(center_lon - lon_span / 2, -180.0), min(center_lon + lon_span / 2, 180.0))
+
+
+def choose_level(bounds, max_cells=MAX_VIEW_CELLS):
+    # Finest level whose grid over the viewport stays within max_cells.
+    lat_min, lat_max, lon_min, lon_max = bounds
+    for level in reversed(LOD_LEVELS):
+        n_cells = math.ceil((lat_max - lat_min) / level + 1) * math.ceil((lon_max - lon_min) / level + 1)
+        if n_cells <= max_cells:
+            return level
+    return LOD_LEVELS[0]
+
+
+def sample_points(frame, budget=DEFAULT_POINT_BUDGET, seed=0):
+    # Uniform sampling keeps the spatial density in expectation; a fixed seed
+    # keeps the sample stable across reruns.
+    if len(frame) <= budget:
+        return frame
+    rows = np.sort(np.random.default_rng(seed).choice(len(frame), size=budget, replace=False))
+    return frame.iloc[rows]
+
+
+class SpatialPyramid:
+    def __init__(self, frame, by=("year",)):
+        lat = pd.to_numeric(frame["latitude"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        lon = pd.to_numeric(frame["longitude"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        self.valid = np.isfinite(lat) & np.isfinite(lon)
+        self.lat_idx = np.clip(np.floor((np.nan_to_num(lat) + 90.0) / FINEST_LEVEL), 0, 180 / FINEST_LEVEL - 1).astype(np.int16)
+        self.lon_idx = np.clip(np.floor((np.nan_to_num(lon) + 180.0) / FINEST_LEVEL), 0, _LON_CELLS - 1).astype(np.int16)
+        self.extent = (
+            (float(np.min(lat[self.valid])), float(np.max(lat[self.valid])), float(np.min(lon[self.valid])), float(np.max(lon[self.valid])))
+            if self.valid.any() else (-90.0, 90.0, -180.0, 180.0)
+        )
+        self._by = {}
+        for column in by:
+            if column in frame.columns:
+                codes, uniques = pd.factorize(frame[column], sort=True)
+                self._by[column] = (codes, uniques)
+        self._full = {}  # (level, by) -> counts over all rows, built on first use
+        self._full_lock = threading.Lock()  # the pyramid is shared by every session
+
+    @property
+    def center(self):
+        lat_min, lat_max, lon_min, lon_max = self.extent
+        return (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+
+    def cells(self, level, rows=None, by=None, bounds=None):
+        # Counts per cell at `level` for the given row ids (None = all rows),
+        # optionally split by a precomputed `by` column and clipped to bounds.
+        # lat_bin/lon_bin are the south-west corners of the cells.
+        if rows is None:
+            key = (level, by)
+            with self._full_lock:
+                if key not in self._full:
+                    self._full[key] = self._aggregate(level, None, by)
+                result = self._full[key]
+        else:
+            result = self._aggregate(level, rows, by)
+        if bounds is not None:
+            lat_min, lat_max, lon_min, lon_max = bounds
+            inside = (result["lat_bin"] + level > lat_min) & (result["lat_bin"] < lat_max) & \
+                     (result["lon_bin"] + level > lon_min) & (result["lon_bin"] < lon_max)
+            result = result[inside]
+        return result
+
+    def _aggregate(self, level, rows, by):
+        shift = _shift(level)
+        valid = self.valid if rows is None else self.valid[rows]
+        lat_idx = (self.lat_idx if rows is None else self.lat_idx[rows])[valid].astype(np.int64) >> shift
+        lon_idx = (self.lon_idx if rows is None else self.lon_idx[rows])[valid].astype(np.int64) >> shift
+        width = _LON_CELLS >> shift
+        keys = lat_idx * width + lon_idx
+        n_cells = (int(180 / FINEST_LEVEL) >> shift) * width
+        if by is not None:
+            codes, uniques = self._by[by]
+            codes = (codes if rows is None else codes[rows])[valid].astype(np.int64)
+            keep = codes >= 0
+            keys = codes[keep] * n_cells + keys[keep]
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        cell = unique_keys % n_cells
+        result = pd.DataFrame({
+            "lat_bin": (cell // width) * level - 90.0,
+            "lon_bin": (cell % width) * level - 180.0,
+            "Count": counts,
+        })
+        if by is not None:
+            result.insert(0, by, uniques.take(unique_keys // n_cells))
+        return result
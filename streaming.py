@@ -0,0 +1,190 @@
+# --- Out-of-core aggregation of the partitioned MODIS store ---
+# Computes everything the dashboard needs without ever holding the archive in
+# memory: the store's fragments are split into record batches of a bounded
+# size, each batch is reduced in a worker process to mergeable partials (the
+# fire cube with its FRP/brightness sketches and 1° spatial bins, daily counts,
+# and a priority sample of rows for the point charts), and the parent folds the
+# partials together as they arrive. The memory limit sets the number of workers
+# and the batch size, so peak memory depends on the limit, not the archive.
+# ingest.py uses this whenever it rebuilds the aggregates:
+#
+#   FIRE_MEMORY_LIMIT_MB=1024 python ingest.py --rebuild-aggregates
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from daily_rollup import DailyRollup
+from fire_cube import LOCATION_COLUMNS, build_cube
+
+MEMORY_LIMIT_MB = int(os.environ.get("FIRE_MEMORY_LIMIT_MB", "2048"))
+# Peak memory while a batch is reduced (the pandas frame plus groupby
+# temporaries) as a multiple of the batch's Arrow size, and the fixed cost of
+# one worker process (interpreter, libraries and their buffers), both measured
+# on 1M-row batches. ROW_BYTES is the peak per row of a MODIS store row, for
+# callers that have no fragments to measure.
+REDUCE_FACTOR = 3.2
+ROW_BYTES = 400
+WORKER_OVERHEAD_MB = 256
+# Kept back from the limit for the parent: merged aggregates and the sample.
+PARENT_RESERVE_MB = 384
+MIN_BATCH_ROWS = 50_000
+MAX_BATCH_ROWS = 1 << 20
+SAMPLE_ROWS = 200_000
+SAMPLE_COLUMNS = ["latitude", "longitude", "acq_date", "brightness", "frp", "year", "type", "confidence"] + LOCATION_COLUMNS
+
+
+def fragment_sizes(store_dir, fragments):
+    # fragment -> (rows, Arrow bytes), from the record batches of the
+    # memory-mapped file: only their metadata is read, not the column data.
+    sizes = {}
+    for fragment in fragments:
+        with pa.memory_map(str(Path(store_dir) / fragment)) as source:
+            reader = pa.ipc.open_file(source)
+            batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]
+            sizes[fragment] = (sum(b.num_rows for b in batches), sum(b.nbytes for b in batches))
+    return sizes
+
+
+def row_bytes(sizes):
+    # Peak bytes per row of these fragments while they are reduced.
+    rows = sum(n_rows for n_rows, _ in sizes.values())
+    return REDUCE_FACTOR * sum(n_bytes for _, n_bytes in sizes.values()) / rows if rows else ROW_BYTES
+
+
+def plan(memory_limit_mb=MEMORY_LIMIT_MB, max_workers=None, row_bytes=ROW_BYTES):
+    # (workers, batch_rows) that fit in the limit: as many workers as there are
+    # cores and budget for, each with the largest batch its share allows.
+    budget = max(memory_limit_mb - PARENT_RESERVE_MB, 0)
+    per_worker_min = WORKER_OVERHEAD_MB + MIN_BATCH_ROWS * row_bytes / 2**20
+    workers = int(max(1, min(max_workers or os.cpu_count() or 1, budget // per_worker_min)))
+    batch_rows = (budget / workers - WORKER_OVERHEAD_MB) * 2**20 / row_bytes
+    return workers, int(np.clip(batch_rows, MIN_BATCH_ROWS, MAX_BATCH_ROWS))
+
+
+def fits_in_memory(rows, memory_limit_mb=MEMORY_LIMIT_MB, row_bytes=ROW_BYTES):
+    # Whether the whole store can be loaded as one DataFrame (the in-memory mode).
+    return rows * row_bytes / 2**20 <= max(memory_limit_mb - PARENT_RESERVE_MB, 0)
+
+
+def _plain(frame):
+    # Categoricals -> plain values, so samples from different batches concatenate.
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            values = frame[column]
+            dtype = values.cat.categories.dtype
+            frame[column] = values.astype(pd.Int64Dtype() if dtype.kind in "iu" and values.isna().any() else dtype)
+    return frame
+
+
+def sample_rows(frame, size=SAMPLE_ROWS, seed=0):
+    # Priority sample: every row gets a uniform random priority and the `size`
+    # lowest are kept. The lowest priorities of a union are the lowest of the
+    # parts' lowest, so samples of disjoint batches merge into a uniform sample.
+    columns = [c for c in SAMPLE_COLUMNS if c in frame.columns]
+    priority = np.random.default_rng(seed).random(len(frame))
+    keep = np.argpartition(priority, size)[:size] if len(frame) > size else np.arange(len(frame))
+    sample = _plain(frame[columns].take(keep).reset_index(drop=True))
+    sample["priority"] = priority[keep]
+    return sample
+
+
+def merge_samples(a, b, size=SAMPLE_ROWS):
+    if a is None or a.empty:
+        return b
+    if b is None or b.empty:
+        return a
+    merged = pd.concat([a, b], ignore_index=True)
+    if len(merged) > size:
+        merged = merged.take(np.argpartition(merged["priority"].to_numpy(), size)[:size]).reset_index(drop=True)
+    return merged
+
+
+def seed_for(name):
+    # Stable per-batch seed, so rebuilding the same store gives the same sample.
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "little")
+
+
+class Aggregates:
+    def __init__(self, cube=None, rollup=None, sample=None, rows=0):
+        self.cube = cube
+        self.rollup = rollup
+        self.sample = sample
+        self.rows = rows
+
+    @classmethod
+    def build(cls, frame, seed=0):
+        if frame.empty:
+            return cls()
+        return cls(build_cube(frame), DailyRollup.build(frame), sample_rows(frame, seed=seed), len(frame))
+
+    def merge(self, other):
+        if other.cube is None:
+            return self
+        if self.cube is None:
+            return other
+        return Aggregates(self.cube.merge(other.cube), self.rollup.merge(other.rollup),
+                          merge_samples(self.sample, other.sample), self.rows + other.rows)
+
+
+def _batch_tasks(store_dir, sizes, batch_rows):
+    # Lists of (path, first row, row count) slices holding about batch_rows rows
+    # each: large fragments are split, small ones (a month of one file) packed
+    # together so the per-batch cost is paid per batch, not per fragment.
+    batch, size = [], 0
+    for fragment, (n_rows, _) in sizes.items():
+        path = str(Path(store_dir) / fragment)
+        start = 0
+        while start < n_rows:
+            count = min(batch_rows - size, n_rows - start)
+            batch.append((path, start, count))
+            size += count
+            start += count
+            if size == batch_rows:
+                yield batch
+                batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def aggregate_batch(task):
+    # Worker: reduces one batch of fragment slices. Only the slices are
+    # converted to pandas; the fragments themselves stay memory-mapped.
+    tables = [pa.ipc.open_file(pa.memory_map(path)).read_all().slice(start, n_rows) for path, start, n_rows in task]
+    table = pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+    frame = table.drop_columns([c for c in ("row_key",) if c in table.column_names]).to_pandas()
+    path, start, _ = task[0]
+    fragment = "/".join(Path(path).parts[-3:])  # year=/month=/file: unique within the store
+    return Aggregates.build(frame, seed=seed_for(f"{fragment}:{start}"))
+
+
+def aggregate_fragments(store_dir, fragments, memory_limit_mb=MEMORY_LIMIT_MB, max_workers=None):
+    # Folds all fragments into one Aggregates. At most `workers` batches are in
+    # flight, so finished partials never pile up in the parent.
+    sizes = fragment_sizes(store_dir, sorted(fragments))
+    workers, batch_rows = plan(memory_limit_mb, max_workers, row_bytes(sizes))
+    tasks = _batch_tasks(store_dir, sizes, batch_rows)
+    result = Aggregates()
+    if workers == 1:
+        for task in tasks:
+            result = result.merge(aggregate_batch(task))
+        return result
+    # spawn rather than fork: the app process runs threads (Streamlit, Arrow).
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(aggregate_batch, task))
+            if len(pending) < workers:
+                continue
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = result.merge(future.result())
+        for future in pending:
+            result = result.merge(future.result())
+    return result
+
@@ -0,0 +1,125 @@
+# --- What-if sensitivity sweeps of the fire-type model ---
+# Varies one or two of the Prediction page inputs across a grid (within their
+# SLIDER_RANGES) while the other inputs stay fixed, and scores the whole grid
+# with one batched scaler + model call instead of one rerun per slider
+# position. A sweep holds the class probabilities (when the model has them) and
+# the predicted class of every grid point; the app memoises sweeps per model
+# version and fixed inputs.
+#
+#   python sweeps.py frp                                 # 1-D: FRP across its range
+#   python sweeps.py brightness frp --points 50 --set confidence=high scan=2.5
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+import fire_model
+
+LINE_POINTS = 200
+GRID_POINTS = 60
+
+
+def default_inputs():
+    inputs = {feature: spec[3] for feature, spec in fire_model.SLIDER_RANGES.items()}
+    inputs["confidence"] = "nominal"
+    return inputs
+
+
+def grid(inputs, axes):
+    # Feature rows in FEATURE_COLUMNS order for every point of the grid spanned
+    # by `axes` [(feature, low, high, points), ...], x axis first; every other
+    # feature is fixed at its value in `inputs`. Returns (X, axis values).
+    values = [np.linspace(low, high, points) for _, low, high, points in axes]
+    mesh = dict(zip([feature for feature, *_ in axes], np.meshgrid(*values, indexing="ij")))
+    X = np.empty((len(values[0]) * (len(values[1]) if len(values) > 1 else 1), len(fire_model.FEATURE_COLUMNS)))
+    for i, column in enumerate(fire_model.FEATURE_COLUMNS):
+        if column in mesh:
+            X[:, i] = mesh[column].ravel()
+        elif column == "confidence":
+            X[:, i] = fire_model.confidence_value(inputs[column])
+        else:
+            X[:, i] = float(inputs[column])
+    return X, values
+
+
+class Sweep:
+    def __init__(self, features, values, classes, proba, labels):
+        self.features = features  # swept features, x axis first
+        self.values = values      # grid coordinates along each axis
+        self.classes = classes
+        self.proba = proba        # (n_x[, n_y], n_classes), or None
+        self.labels = labels      # (n_x[, n_y]) predicted class codes
+
+    @property
+    def size(self):
+        return self.labels.size
+
+    def probabilities(self):
+        # Long frame for the 1-D chart: x, Class, Probability.
+        names = fire_model.label_names(self.classes)
+        return pd.DataFrame({
+            "x": np.repeat(self.values[0], len(self.classes)),
+            "Class": np.tile(names, len(self.values[0])),
+            "Probability": self.proba.reshape(-1),
+        })
+
+    def decision(self):
+        # Predicted class of every grid point as an index into self.classes.
+        return np.searchsorted(self.classes, self.labels)
+
+    def segments(self):
+        # 1-D: [(class name, from, to), ...] runs of the same predicted class.
+        x, labels = self.values[0], self.labels
+        breaks = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+        starts, ends = np.r_[0, breaks], np.r_[breaks, len(labels)] - 1
+        names = fire_model.label_names(labels[starts])
+        return [(name, x[s], x[e]) for name, s, e in zip(names, starts, ends)]
+
+
+def sweep(scaler, model, inputs, axes):
+    # Scores the grid of `axes` (see grid) in one batched call.
+    X, values = grid(inputs, axes)
+    shape = tuple(len(v) for v in values)
+    classes, proba = fire_model.predict_proba_array(X, scaler, model)
+    if proba is None:
+        labels = fire_model.predict_array(X, scaler, model)
+    else:
+        labels = classes.take(np.argmax(proba, axis=1))
+        proba = proba.reshape(shape + (len(classes),))
+    return Sweep([feature for feature, *_ in axes], values, classes, proba, np.asarray(labels).reshape(shape))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep one or two model inputs and report the predicted fire types.")
+    parser.add_argument("features", nargs="+", choices=list(fire_model.SLIDER_RANGES), help="x [y] features to sweep")
+    parser.add_argument("--points", type=int, help=f"grid points per axis (default: {LINE_POINTS} for 1-D, {GRID_POINTS} for 2-D)")
+    parser.add_argument("--set", nargs="*", default=[], metavar="FEATURE=VALUE", help="fixed inputs (default: the slider defaults)")
+    parser.add_argument("--model", default=fire_model.MODEL_PATH)
+    parser.add_argument("--scaler", default=fire_model.SCALER_PATH)
+    args = parser.parse_args(argv)
+    if len(args.features) > 2:
+        parser.error("sweep one or two features")
+
+    inputs = default_inputs()
+    for item in args.set:
+        feature, _, value = item.partition("=")
+        if feature not in inputs:
+            parser.error(f"unknown feature: {feature}")
+        inputs[feature] = value
+    points = args.points or (LINE_POINTS if len(args.features) == 1 else GRID_POINTS)
+    axes = [(f, *fire_model.SLIDER_RANGES[f][1:3], points) for f in args.features]
+    scaler, model = fire_model.load_predictor(args.model, args.scaler)
+    result = sweep(scaler, model, inputs, axes)
+    if len(axes) == 1:
+        for name, start, end in result.segments():
+            print(f"{args.features[0]} {start:g} to {end:g}: {name}")
+    else:
+        shares = pd.Series(fire_model.label_names(result.labels.ravel())).value_counts(normalize=True)
+        print(f"{result.size:,} grid points:")
+        print(shares.to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# --- Shared fixtures: seeded synthetic detections and a small stand-in model ---
+#
+#   python -m pytest -q
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fire_model  # noqa: E402
+from benchmarks import synthetic_modis  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def sources(tmp_path_factory):
+    # [(year, csv_path)] of 6,000 synthetic detections over 2021-2023.
+    return synthetic_modis.generate(6_000, tmp_path_factory.mktemp("modis"))
+
+
+@pytest.fixture(scope="session")
+def detections(sources):
+    return pd.concat([pd.read_csv(path) for _, path in sources], ignore_index=True)
+
+
+@pytest.fixture(scope="session")
+def fires():
+    # Clustered detections: 60 fires, each burning for 1-6 days from a random
+    # start in 2022-2023, with a few touching pixels per day, sorted by date.
+    import numpy as np
+    rng = np.random.default_rng(7)
+    rows = []
+    for fire in range(60):
+        lat, lon = rng.uniform(10, 30), rng.uniform(70, 90)
+        start = np.datetime64("2022-01-01") + int(rng.integers(0, 700))
+        for day in range(int(rng.integers(1, 7))):
+            n = int(rng.integers(1, 6))
+            rows.append(pd.DataFrame({
+                "latitude": lat + rng.normal(0, 0.004, n),
+                "longitude": lon + rng.normal(0, 0.004, n),
+                "acq_date": str(start + day),
+                "scan": 1.0,
+                "track": 1.0,
+                "frp": rng.gamma(2.0, 10.0, n).round(1),
+                "brightness": rng.uniform(310, 350, n).round(1),
+                "bright_t31": rng.uniform(290, 300, n).round(1),
+                "confidence": rng.integers(0, 100, n),
+                "type": 0,
+            }))
+    return pd.concat(rows, ignore_index=True).sort_values("acq_date", kind="stable", ignore_index=True)
+
+
+@pytest.fixture(scope="session")
+def predictor(detections):
+    # (scaler, model) fitted like the real pickles, on the synthetic labels.
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    X = pd.DataFrame(fire_model.encode_features(detections), columns=fire_model.FEATURE_COLUMNS)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, max_depth=8, random_state=0)
+    model.fit(pd.DataFrame(scaler.transform(X), columns=fire_model.FEATURE_COLUMNS), detections["type"])
+    return scaler, model
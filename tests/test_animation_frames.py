@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import animation_frames
+import charts
+
+
+def _points(detections):
+    # App-shaped points: parsed dates, and every 10th detection without a type.
+    points = detections.assign(acq_date=pd.to_datetime(detections["acq_date"]))
+    points["type"] = points["type"].astype("Int64").mask(points.index % 10 == 0)
+    return points
+
+
+def test_chunked_frames_match_one_pass(detections):
+    points = _points(detections)
+    kwargs = dict(freq="M", max_points_per_frame=10**6, max_total_points=10**9)
+    whole, freq = animation_frames.build_frames(points, **kwargs)
+    chunked, _ = animation_frames.build_frames(points, chunk_rows=700, **kwargs)
+    assert freq == "M"
+    key = ["frame", "latitude", "longitude", "type"]
+    pd.testing.assert_frame_equal(whole.sort_values(key, ignore_index=True), chunked.sort_values(key, ignore_index=True),
+                                  check_exact=False)
+    # Every detection is counted, including those without a fire type.
+    assert whole["count"].sum() == len(points)
+    assert whole.loc[whole["type"].isna(), "count"].sum() == points["type"].isna().sum()
+    assert whole["frp_sum"].sum() == pytest.approx(points["frp"].sum())
+    charts.fire_animation(whole, "Month")  # null types plot as their own group
+
+
+def test_frames_follow_the_point_budgets(detections):
+    points = _points(detections)
+    rows = np.flatnonzero(points["acq_date"].dt.year.to_numpy() == 2022)
+    frames, freq = animation_frames.build_frames(points, freq="D", rows=rows, max_points_per_frame=50, max_total_points=20_000)
+    # A year of days needs 365 * MIN_FRAME_POINTS points: coarsened to weeks.
+    assert freq == "W"
+    assert frames.groupby("frame").size().max() <= 50
+    assert len(frames) <= 20_000
+    # The busiest cells of each frame are kept.
+    full, _ = animation_frames.build_frames(points, freq="W", rows=rows, max_points_per_frame=10**6, max_total_points=10**9)
+    for frame, kept in frames.groupby("frame"):
+        assert kept["count"].min() >= full.loc[full["frame"] == frame, "count"].nlargest(50).min()
@@ -0,0 +1,83 @@
+import hashlib
+import logging
+
+import pytest
+
+import artifacts
+
+
+def _manifest(tmp_path, **entries):
+    # file:// artifacts from name -> (content or None for a missing file, pinned)
+    manifest = []
+    for name, (content, pinned) in entries.items():
+        source = tmp_path / "remote" / name
+        source.parent.mkdir(exist_ok=True)
+        if content is not None:
+            source.write_bytes(content)
+        manifest.append({"name": name, "kind": "model", "url": source.as_uri(),
+                         "size": len(content) if pinned else None,
+                         "sha256": hashlib.sha256(content).hexdigest() if pinned else None})
+    return manifest
+
+
+def test_fetch_all_verifies_and_renames(tmp_path):
+    manifest = _manifest(tmp_path, **{"model.pkl": (b"model", True)})
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    paths = artifacts.fetch_all(manifest=manifest, dest_dir=dest)
+    assert paths["model.pkl"].read_bytes() == b"model"
+    assert [p.name for p in dest.iterdir()] == ["model.pkl"]
+
+
+def test_checksum_mismatch_is_reported(tmp_path):
+    manifest = _manifest(tmp_path, **{"model.pkl": (b"model", True)})
+    manifest[0]["sha256"] = "0" * 64
+    with pytest.raises(artifacts.ArtifactError, match="SHA-256 mismatch"):
+        artifacts.fetch_all(manifest=manifest, dest_dir=tmp_path, retries=0)
+    assert not (tmp_path / "model.pkl").exists()
+
+
+def test_network_errors_are_reported_per_artifact(tmp_path):
+    # A missing file:// source fails like an unreachable host (URLError) and a
+    # URL without a scheme with ValueError; the other artifact is still fetched
+    # and every failure is listed.
+    manifest = _manifest(tmp_path, **{"gone.pkl": (None, False), "scaler.pkl": (b"scaler", True)})
+    manifest.append({"name": "bad.pkl", "kind": "model", "url": "no-scheme-here", "size": None, "sha256": None})
+    with pytest.raises(artifacts.ArtifactError) as error:
+        artifacts.fetch_all(manifest=manifest, dest_dir=tmp_path, retries=0)
+    assert "gone.pkl" in str(error.value) and "bad.pkl" in str(error.value)
+    assert (tmp_path / "scaler.pkl").read_bytes() == b"scaler"
+
+
+def test_unpinned_entries_warn_once(tmp_path, caplog):
+    manifest = _manifest(tmp_path, **{"unpinned.csv": (b"rows", False)})
+    with caplog.at_level(logging.WARNING, logger="artifacts"):
+        artifacts.fetch_all(manifest=manifest, dest_dir=tmp_path)
+        artifacts.fetch_all(manifest=manifest, dest_dir=tmp_path)
+    assert [r.getMessage().split()[0] for r in caplog.records] == ["unpinned.csv"]
+
+
+def test_existing_unpinned_file_is_reused_only_after_a_fetch(tmp_path):
+    manifest = _manifest(tmp_path, **{"data.csv": (b"rows", False)})
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    (dest / "data.csv").write_bytes(b"<html>quota exceeded</html>")
+    assert artifacts.fetch_all(manifest=manifest, dest_dir=dest)["data.csv"].read_bytes() == b"rows"
+
+    # Reused while it matches the record of that download, fetched again once not.
+    (tmp_path / "remote" / "data.csv").write_bytes(b"newer rows")
+    assert artifacts.fetch_all(manifest=manifest, dest_dir=dest)["data.csv"].read_bytes() == b"rows"
+    (dest / "data.csv").write_bytes(b"row")
+    assert artifacts.fetch_all(manifest=manifest, dest_dir=dest)["data.csv"].read_bytes() == b"newer rows"
+
+
+def test_gdown_errors_are_reported(tmp_path, monkeypatch):
+    gdown = pytest.importorskip("gdown")
+
+    def refuse(url, output, **kwargs):
+        raise gdown.exceptions.FileURLRetrievalError("Too many users have viewed or downloaded this file")
+
+    monkeypatch.setattr(gdown, "download", refuse)
+    manifest = [{"name": "model.pkl", "kind": "model", "url": "https://drive.google.com/uc?id=x", "size": None, "sha256": None}]
+    with pytest.raises(artifacts.ArtifactError, match="Too many users"):
+        artifacts.fetch_all(manifest=manifest, dest_dir=tmp_path, retries=0)
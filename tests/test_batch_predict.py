@@ -0,0 +1,51 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import batch_predict
+import events
+
+
+def test_mixed_chunks_keep_one_schema(tmp_path, detections, predictor):
+    # "version" reads as text in the first chunk and as numbers in the second,
+    # and "daynight" is empty in the first chunk only.
+    rows = detections.head(400).copy()
+    rows["version"] = ["6.1NRT"] * 200 + ["61.03"] * 200
+    rows["daynight"] = [None] * 200 + ["D"] * 200
+    source = tmp_path / "mixed.csv"
+    rows.to_csv(source, index=False)
+    for name in ("out.parquet", "out.csv"):
+        stats = batch_predict.score_file(source, tmp_path / name, *predictor, chunksize=200)
+        assert stats["rows"] == 400 and stats["chunks"] == 2
+    scored = pq.read_table(tmp_path / "out.parquet").to_pandas()
+    assert scored["version"].tolist() == rows["version"].tolist()
+    assert scored["predicted_type"].notna().all()
+    assert len(pd.read_csv(tmp_path / "out.csv")) == 400
+
+
+def _event_sizes(table):
+    return sorted(table["detections"].tolist())
+
+
+def test_events_streamed_match_one_build(tmp_path, fires, predictor):
+    source = tmp_path / "fires.csv"
+    fires.to_csv(source, index=False)
+    stats = batch_predict.score_events(source, tmp_path / "events.parquet", *predictor, chunksize=50)
+    expected = events.build_events(fires).table()
+    streamed = pd.read_parquet(tmp_path / "events.parquet")
+    assert stats["chunks"] > 1 and stats["rows"] == len(fires)
+    assert stats["events"] == len(expected)
+    assert _event_sizes(streamed) == _event_sizes(expected)
+
+
+def test_events_out_of_date_order_are_scored_once(tmp_path, fires, predictor):
+    shuffled = fires.sample(frac=1.0, random_state=0)
+    with pytest.raises(events.BackfillError):
+        builder = events.EventBuilder()
+        for start in range(0, len(shuffled), 50):
+            builder.extend(shuffled.iloc[start:start + 50])
+    source = tmp_path / "shuffled.csv"
+    shuffled.to_csv(source, index=False)
+    stats = batch_predict.score_events(source, tmp_path / "events.csv", *predictor, chunksize=50)
+    assert stats["rows"] == len(fires) and stats["chunks"] == -(-len(fires) // 50)
+    assert _event_sizes(pd.read_csv(tmp_path / "events.csv")) == _event_sizes(events.build_events(fires).table())
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+import fire_model
+from compiled_model import LOCKSTEP_ROWS, CompiledModel
+
+
+def _features(detections):
+    return fire_model.encode_features(detections)
+
+
+def test_trees_match_sklearn(detections, predictor):
+    scaler, model = predictor
+    X = _features(detections)
+    compiled = CompiledModel.compile(scaler, model)
+    expected = fire_model.predict_array(X, scaler, model)
+    scaled = pd.DataFrame(scaler.transform(pd.DataFrame(X, columns=fire_model.FEATURE_COLUMNS)),
+                          columns=fire_model.FEATURE_COLUMNS)
+    # Both walks: all trees together for small blocks, one tree at a time above.
+    for rows in (slice(0, LOCKSTEP_ROWS // 2), slice(None)):
+        np.testing.assert_array_equal(compiled.predict(X[rows]), expected[rows])
+        np.testing.assert_allclose(compiled.predict_proba(X[rows]), model.predict_proba(scaled[rows]), atol=1e-12)
+
+
+def test_thresholds_compare_in_float32(detections, predictor):
+    # Rows exactly on a split threshold (after scaling) go the way sklearn's
+    # float32 comparison sends them.
+    scaler, model = predictor
+    compiled = CompiledModel.compile(scaler, model)
+    tree = model.estimators_[0].tree_
+    split = np.flatnonzero(tree.feature >= 0)[:50]
+    X = np.repeat(_features(detections.head(1)), len(split), axis=0)
+    for row, node in enumerate(split):
+        feature = tree.feature[node]
+        # Invert the scaler so the scaled value lands on the threshold.
+        X[row, feature] = tree.threshold[node] * scaler.scale_[feature] + scaler.mean_[feature]
+    np.testing.assert_array_equal(compiled.predict(X), fire_model.predict_array(X, scaler, model))
+
+
+def test_linear_matches_sklearn(detections, predictor):
+    from sklearn.linear_model import LogisticRegression
+    scaler, _ = predictor
+    X = _features(detections)
+    scaled = pd.DataFrame(scaler.transform(pd.DataFrame(X, columns=fire_model.FEATURE_COLUMNS)),
+                          columns=fire_model.FEATURE_COLUMNS)
+    model = LogisticRegression(max_iter=500).fit(scaled, detections["type"])
+    compiled = CompiledModel.compile(scaler, model)
+    np.testing.assert_array_equal(compiled.predict(X), fire_model.predict_array(X, scaler, model))
+
+
+def test_save_load_round_trip(tmp_path, detections, predictor):
+    X = _features(detections)
+    compiled = CompiledModel.compile(*predictor, source="pickles")
+    path = tmp_path / "compiled.npz"
+    compiled.save(path)
+    loaded = CompiledModel.load(path)
+    assert loaded.source == "pickles"
+    np.testing.assert_array_equal(loaded.predict(X), compiled.predict(X))
+    assert [p.name for p in tmp_path.iterdir()] == ["compiled.npz"]  # no temp files left
+
+
+def test_truncated_export_is_recompiled(tmp_path, predictor):
+    import joblib
+    scaler, model = predictor
+    model_path, scaler_path = tmp_path / "model.pkl", tmp_path / "scaler.pkl"
+    joblib.dump(model, model_path)
+    joblib.dump(scaler, scaler_path)
+    path = tmp_path / "compiled.npz"
+    path.write_bytes(b"PK\x03\x04 truncated")
+    compiled = fire_model.load_compiled(path, model_path, scaler_path)
+    assert compiled.source == fire_model.pickle_signature(model_path, scaler_path)
+    assert CompiledModel.load(path).source == compiled.source
+
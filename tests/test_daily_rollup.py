@@ -0,0 +1,48 @@
+import pandas as pd
+import pyarrow as pa
+
+import modis_store
+from daily_rollup import DailyRollup
+
+
+def _frame(sources):
+    # Store-shaped frame, sorted by date; every 20th row has no fire type.
+    table = pa.concat_tables([modis_store.read_csv(path) for _, path in sources], promote_options="default")
+    frame = modis_store.prepare_table(table).to_pandas().sort_values("acq_date", kind="stable", ignore_index=True)
+    frame["type"] = frame["type"].astype("Int64").mask(frame.index % 20 == 0)
+    return frame
+
+
+def _sorted(counts):
+    return counts.sort_values(["acq_date", "year", "type", "confidence"], ignore_index=True)
+
+
+def test_merge_matches_building_at_once(sources):
+    frame = _frame(sources)
+    # The split falls inside a day, so that day is in both batches.
+    split = len(frame) // 2
+    assert frame["acq_date"].iloc[split - 1] == frame["acq_date"].iloc[split]
+    a, b = frame.iloc[:split], frame.iloc[split:]
+    whole = DailyRollup.build(frame)
+    for merged in (DailyRollup.build(a).merge(DailyRollup.build(b)), DailyRollup.build(a).update(b),
+                   DailyRollup.build(b).merge(DailyRollup.build(a))):
+        pd.testing.assert_frame_equal(_sorted(merged.counts), _sorted(whole.counts), check_dtype=False)
+    assert int(whole.counts["count"].sum()) == len(frame)
+
+
+def test_series_and_cumulative(sources, tmp_path):
+    frame = _frame(sources)
+    rollup = DailyRollup.build(frame)
+    daily = rollup.series("D")
+    assert daily["acq_date"].is_monotonic_increasing and daily["Count"].sum() == len(frame)
+    weekly = rollup.series("W", by="type", year=[2022])
+    in_2022 = frame[frame["year"] == 2022]
+    expected = in_2022.groupby([in_2022["acq_date"].dt.to_period("W").dt.start_time, "type"]).size()
+    assert weekly.set_index(["acq_date", "type"])["Count"].sort_index().tolist() == expected.sort_index().tolist()
+    cumulative = rollup.cumulative(type=[0])
+    assert cumulative["cumulative"].is_monotonic_increasing
+    assert cumulative["cumulative"].iloc[-1] == (frame["type"] == 0).sum()
+
+    rollup.save(tmp_path / "rollup.parquet")
+    pd.testing.assert_frame_equal(DailyRollup.load(tmp_path / "rollup.parquet").counts, rollup.counts)
+    assert DailyRollup.load(tmp_path / "missing.parquet") is None
@@ -0,0 +1,71 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+import evaluation
+import fire_model
+import ingest
+
+
+@pytest.fixture
+def archive(tmp_path, sources, predictor, monkeypatch):
+    # A store of two yearly files plus the model pickles; the compiled export
+    # goes to the temporary directory.
+    monkeypatch.chdir(tmp_path)
+    scaler, model = predictor
+    joblib.dump(model, tmp_path / "model.pkl")
+    joblib.dump(scaler, tmp_path / "scaler.pkl")
+    ingest.ingest([path for _, path in sources[:2]], tmp_path / "store")
+    return tmp_path
+
+
+def _evaluate(archive):
+    return evaluation.evaluate(archive / "store", archive / "eval", max_workers=1,
+                               model_path=archive / "model.pkl", scaler_path=archive / "scaler.pkl")
+
+
+def test_counts_match_scoring_the_frame(archive, predictor):
+    report = _evaluate(archive)
+    frame = ingest.load_frame(archive / "store")
+    X = fire_model.encode_features(frame)
+    truth = frame["type"].astype("float64").to_numpy()
+    valid = ~np.isnan(X).any(axis=1) & ~np.isnan(truth)
+    predicted = fire_model.predict_array(X[valid], *predictor)
+    assert report.rows == valid.sum()
+    accuracy = report.accuracy_by_year()
+    assert accuracy["rows"].sum() == valid.sum()
+    expected = (predicted == truth[valid]).mean()
+    assert (accuracy["accuracy"] * accuracy["rows"]).sum() / accuracy["rows"].sum() == pytest.approx(expected)
+
+
+def test_fragments_are_cached_per_model(archive, sources):
+    first = _evaluate(archive)
+    assert first.scored > 0
+    again = _evaluate(archive)
+    assert again.scored == 0 and again.rows == first.rows
+
+    # Only the fragments of a newly ingested file are scored.
+    ingest.ingest([sources[2][1]], archive / "store")
+    new_fragments = len(evaluation.labelled_fragments(ingest.read_ledger(archive / "store"))) - first.scored
+    assert _evaluate(archive).scored == new_fragments
+
+    # A replaced model invalidates every cached fragment and drops the old results.
+    signature = evaluation.model_signature(archive / "model.pkl", archive / "scaler.pkl")
+    os.utime(archive / "model.pkl", ns=(0, 0))
+    assert evaluation.model_signature(archive / "model.pkl", archive / "scaler.pkl") != signature
+    rescored = _evaluate(archive)
+    assert rescored.scored == first.scored + new_fragments
+    assert [p.name for p in (archive / "eval").iterdir()] == [evaluation.model_signature(archive / "model.pkl", archive / "scaler.pkl")]
+
+
+def test_psi():
+    assert evaluation.psi([10, 20, 70], [1, 2, 7]) == pytest.approx(0.0)
+    # sum((p - q) * ln(p / q)) for p = (0.5, 0.5), q = (0.9, 0.1)
+    assert evaluation.psi([50, 50], [90, 10]) == pytest.approx(0.4 * np.log(0.9 / 0.5) + 0.4 * np.log(5))
+    # Empty bins are floored at PSI_EPSILON instead of dividing by zero.
+    assert np.isfinite(evaluation.psi([0, 100], [100, 0]))
+    # One PSI per histogram row.
+    rows = evaluation.psi([[50, 50], [90, 10]], [90, 10])
+    assert rows.shape == (2,) and rows[1] == pytest.approx(0.0)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import events
+
+
+def _summary(table):
+    # Event rows without their ids, in a canonical order.
+    columns = ["start", "end", "detections", "frp_sum", "lat_min", "lon_max", "type"]
+    return table[columns].round({"frp_sum": 6, "lat_min": 6, "lon_max": 6}).sort_values(columns[:5], ignore_index=True)
+
+
+def _cross_month(fires):
+    # Two fires that only join on 2022-02-01, when a detection lands between
+    # them, after each burnt separately from 2022-01-30 (January into February).
+    base = fires.iloc[:1].drop(columns=["latitude", "longitude", "acq_date"])
+    rows = []
+    # 1 km pixels: 0.009° (1.0 km) apart touch, 0.018° apart do not.
+    for day, lat in [("2022-01-30", 5.0), ("2022-01-30", 5.018), ("2022-01-31", 5.0), ("2022-01-31", 5.018),
+                     ("2022-02-01", 5.009), ("2022-02-02", 5.009)]:
+        rows.append(base.assign(latitude=lat, longitude=75.0, acq_date=day))
+    return pd.concat(rows, ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def detections(fires):
+    return pd.concat([fires, _cross_month(fires)], ignore_index=True).sort_values("acq_date", kind="stable", ignore_index=True)
+
+
+def test_bridge_merges_events_across_months(fires):
+    table = events.build_events(_cross_month(fires)).table()
+    assert len(table) == 1
+    assert table["detections"].iloc[0] == 6
+    assert str(table["start"].iloc[0].date()) == "2022-01-30" and table["duration_days"].iloc[0] == 4
+
+
+def test_day_by_day_matches_one_build(detections):
+    builder = events.EventBuilder()
+    for _, day in detections.groupby("acq_date", sort=True):
+        builder.extend(day)
+    pd.testing.assert_frame_equal(_summary(builder.table()), _summary(events.build_events(detections).table()))
+    assert builder.detections == len(detections)
+
+
+def test_save_load_round_trips(tmp_path, detections):
+    expected = _summary(events.build_events(detections).table())
+    days = sorted(detections["acq_date"].unique())
+    path = tmp_path / "events"
+    # Build and save the first half, then extend the rest one month at a time,
+    # loading only what extend() needs each time, as ingest does.
+    half = detections["acq_date"] < days[len(days) // 2]
+    events.EventBuilder().extend(detections[half]).save(path, generation=1)
+    rest = detections[~half]
+    for generation, (_, month) in enumerate(rest.groupby(rest["acq_date"].str[:7], sort=True), start=2):
+        builder, state = events.EventBuilder.load(path, closed=False)
+        builder.extend(month).save(path, generation=generation)
+    builder, state = events.EventBuilder.load(path)
+    assert state["generation"] == generation
+    pd.testing.assert_frame_equal(_summary(builder.table()), expected)
+    # Saving elsewhere writes every closed event again.
+    builder.save(tmp_path / "copy")
+    pd.testing.assert_frame_equal(_summary(events.EventBuilder.load(tmp_path / "copy")[0].table()), expected)
+
+
+def test_older_days_are_rejected(detections):
+    builder = events.EventBuilder().extend(detections.tail(20))
+    with pytest.raises(ValueError):
+        builder.extend(detections.head(5))
+
+
+def test_unreadable_state_loads_as_none(tmp_path, detections):
+    path = tmp_path / "events"
+    events.EventBuilder().extend(detections).save(path)
+    (path / "state.json").unlink()
+    assert events.EventBuilder.load(path) is None
+
+
+def test_weekly_counts(detections):
+    table = events.build_events(detections).table()
+    weekly = events.weekly(table)
+    assert weekly["Events"].sum() == len(table)
+    assert (pd.to_datetime(weekly["start"]).dt.dayofweek == 6).all()  # weeks end on Sunday
+    assert np.isin(events.select(table, year=[2022])["year"], [2022]).all()
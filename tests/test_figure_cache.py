@@ -0,0 +1,67 @@
+import threading
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+import figure_cache
+
+
+def _figure(points):
+    return go.Figure(go.Scatter(x=np.arange(points, dtype="float64"), y=np.zeros(points)))
+
+
+def test_hits_return_the_built_figure():
+    cache = figure_cache.FigureCache()
+    key = cache.key("chart", "v1", [2021], "high")
+    fig, hit = cache.get_or_build(key, lambda: _figure(10))
+    assert not hit
+    assert cache.get_or_build(key, lambda: _figure(10)) == (fig, True)
+    assert cache.key("chart", "v2", [2021], "high") != key
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_figures_are_evicted():
+    size = figure_cache.figure_bytes(_figure(1_000))
+    cache = figure_cache.FigureCache(max_entries=3)
+    for name in "abc":
+        cache.get_or_build(name, lambda: _figure(1_000))
+    cache.get_or_build("a", lambda: _figure(1_000))  # a is now the most recent
+    cache.get_or_build("d", lambda: _figure(1_000))
+    assert list(cache._entries) == ["c", "a", "d"] and cache.bytes == 3 * size
+
+    cache.max_bytes = int(2.5 * size)
+    cache.get_or_build("e", lambda: _figure(1_000))
+    assert list(cache._entries) == ["d", "e"] and cache.bytes == 2 * size
+    assert cache.stats()["evictions"] == 3
+
+    # Larger than the whole cache: served, not kept.
+    fig, _ = cache.get_or_build("huge", lambda: _figure(10_000))
+    assert len(fig.data[0].x) == 10_000 and "huge" not in cache._entries
+
+
+def test_concurrent_requests_share_one_build():
+    cache = figure_cache.FigureCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.1)
+        return _figure(10)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_build("k", build))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert len({id(fig) for fig, _ in results}) == 1
+    assert sorted(hit for _, hit in results) == [False, True, True, True]
+
+
+def test_figure_bytes_tracks_the_json_size():
+    frames = [go.Frame(data=[go.Scatter(x=np.random.rand(5_000), y=np.random.rand(5_000))]) for _ in range(4)]
+    fig = go.Figure(data=frames[0].data, frames=frames, layout={"title": "animated"})
+    estimate, serialised = figure_cache.figure_bytes(fig), len(fig.to_json())
+    assert 0.5 * serialised < estimate < 1.5 * serialised
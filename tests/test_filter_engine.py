@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import filter_engine
+
+
+def _frame(n=5_000, seed=0):
+    # Like the store: type and confidence are categorical, some types missing.
+    rng = np.random.default_rng(seed)
+    types = rng.choice([0, 2, 3, -1], n, p=[0.7, 0.2, 0.05, 0.05])
+    return pd.DataFrame({
+        "year": rng.choice([2021, 2022, 2023], n),
+        "type": pd.Categorical([None if t < 0 else int(t) for t in types]),
+        "confidence": pd.Categorical(rng.choice(["low", "nominal", "high"], n)),
+        "frp": rng.gamma(2.0, 10.0, n),
+    })
+
+
+def _expected(frame, selected):
+    keep = np.ones(len(frame), dtype=bool)
+    for column, allowed in selected.items():
+        if allowed is not None:
+            keep &= frame[column].isin(allowed).to_numpy(dtype=bool, na_value=False)
+    return np.flatnonzero(keep)
+
+
+def test_select_matches_isin():
+    frame = _frame()
+    index = filter_engine.FilterIndex(frame)
+    # Every subset of every column: small (row lists) and large (complement)
+    # selections, empty ones and ones that keep everything.
+    subsets = {c: [list(s) for r in range(len(index.values(c)) + 1)
+                   for s in itertools.combinations(index.values(c), r)] for c in filter_engine.FILTER_COLUMNS}
+    for years, types, confs in itertools.product(subsets["year"], subsets["type"][::3], subsets["confidence"]):
+        selected = {"year": years, "type": types, "confidence": confs}
+        selection = index.select(**selected)
+        np.testing.assert_array_equal(selection.rows, _expected(frame, selected))
+        assert len(selection) == len(_expected(frame, selected))
+
+
+def test_unfiltered_selection_is_not_copied():
+    frame = _frame()
+    index = filter_engine.FilterIndex(frame)
+    selection = index.select(year=index.values("year"), type=None, confidence=index.values("confidence"))
+    assert selection.mask is None and len(selection) == len(frame)
+    assert np.shares_memory(selection.frame(["frp"])["frp"].to_numpy(), frame["frp"].to_numpy())
+
+
+def test_selection_frame_gathers_selected_rows():
+    frame = _frame()
+    index = filter_engine.FilterIndex(frame)
+    selection = index.select(year=[2022], type=[3])
+    expected = frame.loc[(frame["year"] == 2022) & (frame["type"] == 3), ["frp", "year"]]
+    pd.testing.assert_frame_equal(selection.frame(["frp", "year", "missing"]), expected)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import fire_cube
+import modis_store
+
+
+def _frame(sources):
+    # Store-shaped frame (categorical type/confidence, year/month/bins); every
+    # 50th row has no fire type.
+    table = pa.concat_tables([modis_store.read_csv(path) for _, path in sources], promote_options="default")
+    types = table["type"].to_pandas().astype("Int64")
+    table = table.set_column(table.column_names.index("type"), "type",
+                             pa.array(types.mask(types.index % 50 == 0), type=pa.int64()))
+    return modis_store.prepare_table(table).to_pandas()
+
+
+def test_quantiles_by_type_include_unlabelled_rows(sources):
+    frame = _frame(sources)
+    cube = fire_cube.build_cube(frame)
+    result = cube.quantiles("frp", by="type")
+    assert result["count"].sum() == frame["frp"].notna().sum()
+    unlabelled = result[result["type"].isna()]
+    assert len(unlabelled) == 1
+    assert unlabelled["count"].iloc[0] == frame["type"].isna().sum()
+    for _, row in result.dropna(subset=["type"]).iterrows():
+        values = frame.loc[frame["type"] == row["type"], "frp"]
+        assert row["min"] == values.min() and row["max"] == values.max()
+        assert row["q50"] == pytest.approx(values.median(), rel=0.05)
+
+
+def test_merged_cube_matches_one_built_at_once(sources):
+    frame = _frame(sources)
+    half = len(frame) // 2
+    merged = fire_cube.build_cube(frame.iloc[:half]).merge(fire_cube.build_cube(frame.iloc[half:]))
+    whole = fire_cube.build_cube(frame)
+    assert merged.total == whole.total == len(frame)
+    for by in (None, "type", ["year", "confidence"]):
+        a = merged.quantiles("brightness", by=by)
+        b = whole.quantiles("brightness", by=by)
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_categorical=False)
+    assert np.array_equal(merged.histogram("frp")[1], whole.histogram("frp")[1])
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import ingest
+import modis_store
+
+
+def _keys(frame):
+    keys = frame[ingest.DEDUPE_KEYS].copy()
+    keys["acq_date"] = pd.to_datetime(keys["acq_date"]).dt.strftime("%Y-%m-%d")
+    return keys.drop_duplicates()
+
+
+def _assert_consistent(store_dir, expected_rows):
+    frame = ingest.load_frame(store_dir)
+    assert len(frame) == expected_rows == ingest.stored_rows(store_dir)
+    assert not frame.duplicated(ingest.DEDUPE_KEYS).any()
+    aggregates = ingest.load_aggregates(store_dir)
+    assert aggregates.rows == expected_rows
+    assert int(aggregates.rollup.counts["count"].sum()) == expected_rows
+
+
+def test_reingest_adds_no_duplicates(tmp_path, sources):
+    store_dir = tmp_path / "store"
+    paths = [path for _, path in sources]
+    unique = len(_keys(pd.concat([pd.read_csv(p) for p in paths])))
+    ingest.ingest(paths, store_dir)
+    _assert_consistent(store_dir, unique)
+    generation = ingest.read_ledger(store_dir)["generation"]
+
+    # The same files again, then touched but unchanged: nothing is read.
+    assert ingest.ingest(paths, store_dir) == {}
+    os.utime(paths[0])
+    assert ingest.ingest(paths, store_dir) == {}
+    assert ingest.read_ledger(store_dir)["generation"] == generation
+
+    # A copy under another name is read, but all of its rows are known.
+    copy = tmp_path / "copy.csv"
+    shutil.copy(paths[0], copy)
+    report = ingest.ingest([copy], store_dir)
+    assert report[str(copy.resolve())]["added"] == 0
+    _assert_consistent(store_dir, unique)
+
+
+def test_overlapping_file_adds_only_new_rows(tmp_path, sources):
+    store_dir = tmp_path / "store"
+    first = pd.read_csv(sources[0][1])
+    ingest.ingest([sources[0][1]], store_dir)
+    # A re-issued export: half of the known rows plus one new day.
+    new_day = first.head(50).assign(acq_date="2022-01-01")
+    overlap = tmp_path / "overlap.csv"
+    pd.concat([first.head(len(first) // 2), new_day]).to_csv(overlap, index=False)
+    report = ingest.ingest([overlap], store_dir)
+    assert report[str(overlap.resolve())]["added"] == len(_keys(new_day))
+    _assert_consistent(store_dir, len(_keys(first)) + len(_keys(new_day)))
+
+
+def test_file_without_acq_date_is_rejected(tmp_path, sources):
+    undated = tmp_path / "undated.csv"
+    pd.read_csv(sources[0][1]).drop(columns="acq_date").to_csv(undated, index=False)
+    report = ingest.ingest([undated], tmp_path / "store")
+    assert "acq_date" in report[str(undated.resolve())]["error"]
+    with pytest.raises(ValueError, match="acq_date"):
+        modis_store.prepare_table(pa.table({"latitude": [20.5], "longitude": [78.5]}))
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+import predict_service
+
+
+def test_batches_resolve_every_request():
+    batcher = predict_service.MicroBatcher(lambda X: X[:, 0].astype(int), max_batch_size=8, max_wait_ms=5)
+    try:
+        futures = [batcher.submit(np.full(6, float(i))) for i in range(20)]
+        assert [f.result(timeout=5) for f in futures] == list(range(20))
+        stats = batcher.stats()
+        assert stats["requests"] == 20 and stats["max_queue_depth"] >= 1
+    finally:
+        batcher.close()
+
+
+def test_short_label_array_fails_the_whole_batch():
+    # Dropping a row must not leave its request waiting for a label.
+    batcher = predict_service.MicroBatcher(lambda X: X[1:, 0], max_batch_size=4, max_wait_ms=20)
+    try:
+        futures = [batcher.submit(np.zeros(6)) for _ in range(4)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout=5)
+    finally:
+        batcher.close()
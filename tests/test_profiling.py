@@ -0,0 +1,66 @@
+import gc
+import threading
+import time
+import tracemalloc
+
+import profiling
+
+
+def _profiler():
+    return profiling.RerunProfiler(True, True, log_path=None)
+
+
+def test_tracing_stops_with_the_last_profiler():
+    first, second = _profiler(), _profiler()
+    with first.stage("load"):
+        bytearray(1 << 20)
+    assert first.finish()["stages"][0]["traced_peak_mb"] >= 1
+    assert tracemalloc.is_tracing()  # the other session is still profiling
+    second.finish()
+    assert not tracemalloc.is_tracing()
+
+
+def test_traced_stages_of_two_sessions_do_not_reset_each_others_peak():
+    first, second = _profiler(), _profiler()
+    allocated = threading.Event()
+
+    def other_session():
+        allocated.wait()
+        with second.stage("small"):
+            pass
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    with first.stage("large"):
+        bytearray(8 << 20)
+        allocated.set()
+        time.sleep(0.2)  # the other session's stage would start here
+    thread.join()
+    assert first.finish()["stages"][0]["traced_peak_mb"] >= 7
+    assert second.finish()["stages"][0]["traced_peak_mb"] < 1
+
+
+def test_interrupted_rerun_is_released():
+    # A rerun stopped before finish(): closed by the next rerun, or collected.
+    interrupted = _profiler()
+    interrupted.close()
+    interrupted.close()
+    assert not tracemalloc.is_tracing()
+    _profiler()
+    gc.collect()
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_started_elsewhere_is_left_on():
+    tracemalloc.start()
+    try:
+        _profiler().finish()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_disabled_profiler_does_not_trace():
+    profiler = profiling.RerunProfiler(False, True, log_path=None)
+    assert profiler.finish() is None
+    assert not tracemalloc.is_tracing()
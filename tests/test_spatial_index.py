@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import ingest
+import spatial_index
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory, sources):
+    store_dir = tmp_path_factory.mktemp("store")
+    ingest.ingest([path for _, path in sources], store_dir)
+    return ingest.load_spatial_index(store_dir), ingest.load_frame(store_dir)
+
+
+def test_box_with_dates(store):
+    index, frame = store
+    lat, lon = frame["latitude"].to_numpy(), frame["longitude"].to_numpy()
+    days = frame["acq_date"].to_numpy().astype("datetime64[D]")
+    box = (15.0, 25.0, 75.0, 85.0)
+    in_box = (lat >= box[0]) & (lat <= box[1]) & (lon >= box[2]) & (lon <= box[3])
+    np.testing.assert_array_equal(index.query(box=box), np.flatnonzero(in_box))
+    # Dates inclusive at both ends, spanning a partial month on each side.
+    start, end = np.datetime64("2022-03-15"), np.datetime64("2022-06-10")
+    in_dates = (days >= start) & (days <= end)
+    np.testing.assert_array_equal(index.query(box=box, start=str(start), end=str(end)), np.flatnonzero(in_box & in_dates))
+    np.testing.assert_array_equal(index.query(start=str(start), end=str(end)), np.flatnonzero(in_dates))
+
+
+def test_radius(store):
+    index, frame = store
+    lat, lon = frame["latitude"].to_numpy(), frame["longitude"].to_numpy()
+    for center, radius in [((22.0, 80.0), 150.0), ((10.0, 70.0), 400.0), ((30.0, 95.0), 5.0)]:
+        # Haversine on the unit sphere, written out independently of the module.
+        p1, p2 = np.radians(lat), np.radians(center[0])
+        a = np.sin((p1 - p2) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(np.radians(lon - center[1]) / 2) ** 2
+        distance = 2 * spatial_index.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        np.testing.assert_array_equal(index.query(center=center, radius_km=radius), np.flatnonzero(distance <= radius))
+
+
+def test_polygon(store):
+    # A diamond, so membership has a closed form to check against.
+    index, frame = store
+    lat, lon = frame["latitude"].to_numpy(), frame["longitude"].to_numpy()
+    c_lat, c_lon, half = 20.0, 82.0, 6.0
+    polygon = [(c_lat - half, c_lon), (c_lat, c_lon + half), (c_lat + half, c_lon), (c_lat, c_lon - half)]
+    inside = np.abs(lat - c_lat) + np.abs(lon - c_lon) < half
+    np.testing.assert_array_equal(index.query(polygon=polygon), np.flatnonzero(inside))
+
+
+def test_rows_map_back_to_the_frame(store):
+    index, frame = store
+    rows = index.query(box=(20.0, 22.0, 78.0, 80.0))
+    assert len(rows)
+    gathered = index.frame(rows, ["latitude", "longitude", "frp"])
+    np.testing.assert_array_equal(gathered["frp"].to_numpy(), frame["frp"].to_numpy()[rows])
+
+
+def test_empty_queries(store):
+    index, _ = store
+    assert len(index.query(box=(40.0, 41.0, 0.0, 1.0))) == 0
+    assert len(index.query(box=(20.0, 21.0, 80.0, 81.0), polygon=[(30.0, 90.0), (31.0, 91.0), (30.0, 91.0)])) == 0
+    assert len(index.query(start="2030-01-01")) == 0
+    assert index.frame([]) is None
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import spatial_lod
+
+
+def test_zoom_picks_finer_levels_within_the_cell_budget():
+    levels = []
+    for zoom in range(0, 12):
+        bounds = spatial_lod.view_bounds(22.0, 80.0, zoom)
+        lat_min, lat_max, lon_min, lon_max = bounds
+        assert -90 <= lat_min < 22.0 < lat_max <= 90 and -180 <= lon_min < 80.0 < lon_max <= 180
+        level = spatial_lod.choose_level(bounds)
+        n_cells = np.ceil((lat_max - lat_min) / level + 1) * np.ceil((lon_max - lon_min) / level + 1)
+        assert n_cells <= spatial_lod.MAX_VIEW_CELLS or level == spatial_lod.LOD_LEVELS[0]
+        levels.append(level)
+    assert levels == sorted(levels, reverse=True)
+    assert levels[0] == spatial_lod.LOD_LEVELS[0] and levels[-1] == spatial_lod.FINEST_LEVEL
+    # India-sized area: a level whose grid just fits.
+    assert spatial_lod.choose_level((8.0, 37.0, 68.0, 97.0)) == 0.5
+
+
+def test_point_budget_is_a_stable_uniform_sample():
+    frame = pd.DataFrame({"latitude": np.arange(50_000) % 90, "longitude": np.arange(50_000) % 180})
+    assert len(spatial_lod.sample_points(frame.head(100), budget=500)) == 100
+    sample = spatial_lod.sample_points(frame, budget=5_000)
+    assert len(sample) == 5_000 and sample.index.is_unique and sample.index.is_monotonic_increasing
+    assert sample.equals(spatial_lod.sample_points(frame, budget=5_000))
+    # Uniform: each half of the rows keeps about half of the budget.
+    assert abs((sample.index < 25_000).sum() - 2_500) < 200
+
+
+def test_cells_count_every_detection(detections):
+    detections = detections.assign(year=pd.to_datetime(detections["acq_date"]).dt.year)
+    pyramid = spatial_lod.SpatialPyramid(detections)
+    for level in spatial_lod.LOD_LEVELS:
+        cells = pyramid.cells(level)
+        assert cells["Count"].sum() == len(detections)
+        assert (((cells["lat_bin"] + 90) / level) % 1 == 0).all()  # south-west corners
+        by_year = pyramid.cells(level, by="year")
+        assert by_year.groupby("year")["Count"].sum().to_dict() == detections["year"].value_counts().to_dict()
+    rows = np.flatnonzero(detections["year"].to_numpy() == 2022)
+    assert pyramid.cells(1.0, rows=rows)["Count"].sum() == len(rows)
+
+
+def test_full_counts_are_built_once_under_concurrency(detections, monkeypatch):
+    pyramid = spatial_lod.SpatialPyramid(detections)
+    built = []
+    aggregate = pyramid._aggregate
+
+    def counting(*args):
+        built.append(args)
+        time.sleep(0.05)  # long enough for the other threads to ask meanwhile
+        return aggregate(*args)
+
+    monkeypatch.setattr(pyramid, "_aggregate", counting)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pyramid.cells(0.5))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1 and all(r is results[0] for r in results)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+import ingest
+import streaming
+
+
+def _store(tmp_path, sources):
+    store_dir = tmp_path / "store"
+    ingest.ingest([path for _, path in sources], store_dir)
+    return store_dir
+
+
+def test_batch_tasks_cover_every_row_once(tmp_path, sources):
+    store_dir = _store(tmp_path, sources)
+    sizes = streaming.fragment_sizes(store_dir, ingest.fragments(ingest.read_ledger(store_dir)))
+    assert sum(n_rows for n_rows, _ in sizes.values()) == ingest.stored_rows(store_dir)
+    tasks = list(streaming._batch_tasks(store_dir, sizes, 700))
+    assert all(sum(n for _, _, n in task) == 700 for task in tasks[:-1])
+    covered = {}
+    for task in tasks:
+        for path, start, n_rows in task:
+            covered.setdefault(path, []).append((start, n_rows))
+    for fragment, (n_rows, _) in sizes.items():
+        slices = covered[str(store_dir / fragment)]
+        assert [s for s, _ in slices] == list(np.cumsum([0] + [n for _, n in slices[:-1]]))
+        assert sum(n for _, n in slices) == n_rows
+
+
+def test_streamed_aggregates_match_in_memory(tmp_path, sources, monkeypatch):
+    store_dir = _store(tmp_path, sources)
+    frame = ingest.load_frame(store_dir)
+    expected = streaming.Aggregates.build(frame)
+    # The smallest memory limit: one worker, batches of MIN_BATCH_ROWS rows.
+    monkeypatch.setattr(streaming, "MIN_BATCH_ROWS", 500)
+    streamed = streaming.aggregate_fragments(store_dir, ingest.fragments(ingest.read_ledger(store_dir)), memory_limit_mb=0)
+
+    assert streamed.rows == expected.rows == len(frame)
+    assert streamed.cube.total == expected.cube.total
+    for by in ("type", ["year", "confidence"]):
+        pd.testing.assert_frame_equal(streamed.cube.counts(by).sort_values(by, ignore_index=True),
+                                      expected.cube.counts(by).sort_values(by, ignore_index=True),
+                                      check_dtype=False, check_categorical=False)
+        pd.testing.assert_frame_equal(streamed.cube.quantiles("frp", by=by), expected.cube.quantiles("frp", by=by),
+                                      check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(streamed.rollup.series("D"), expected.rollup.series("D"), check_dtype=False)
+    # Below SAMPLE_ROWS the sample holds every row.
+    key = ["latitude", "longitude", "acq_date"]
+    assert len(streamed.sample) == len(frame)
+    pd.testing.assert_frame_equal(streamed.sample[key].sort_values(key, ignore_index=True),
+                                  frame[key].sort_values(key, ignore_index=True), check_dtype=False)
+
+
+def test_row_bytes_follow_the_fragment_sizes():
+    assert streaming.row_bytes({}) == streaming.ROW_BYTES
+    assert streaming.row_bytes({"a": (100, 10_000), "b": (300, 10_000)}) == streaming.REDUCE_FACTOR * 50
+    narrow, wide = streaming.plan(1024, 1, row_bytes=100), streaming.plan(1024, 1, row_bytes=1_000)
+    assert narrow[1] > wide[1]
+    assert not streaming.fits_in_memory(10**7, 2048, row_bytes=1_000)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import fire_model
+import sweeps
+from compiled_model import CompiledModel
+
+
+def _record(inputs, **swept):
+    values = {**inputs, **swept}
+    return [fire_model.confidence_value(values[c]) if c == "confidence" else values[c] for c in fire_model.FEATURE_COLUMNS]
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_grid_matches_scoring_each_point(predictor, compiled):
+    scaler, model = (None, CompiledModel.compile(*predictor)) if compiled else predictor
+    inputs = {**sweeps.default_inputs(), "confidence": "high", "scan": 2.5}
+    axes = [("brightness", 300.0, 400.0, 7), ("frp", 0.0, 100.0, 5)]
+    result = sweeps.sweep(scaler, model, inputs, axes)
+    assert result.labels.shape == (7, 5) and result.proba.shape == (7, 5, len(result.classes))
+    for i, brightness in enumerate(result.values[0]):
+        for j, frp in enumerate(result.values[1]):
+            X = np.array([_record(inputs, brightness=brightness, frp=frp)])
+            assert result.labels[i, j] == fire_model.predict_array(X, scaler, model)[0]
+            np.testing.assert_allclose(result.proba[i, j], fire_model.predict_proba_array(X, scaler, model)[1][0])
+
+
+def test_segments_cover_the_line(predictor):
+    result = sweeps.sweep(*predictor, sweeps.default_inputs(), [("brightness", 200.0, 500.0, sweeps.LINE_POINTS)])
+    segments = result.segments()
+    assert segments[0][1] == 200.0 and segments[-1][2] == 500.0
+    assert all(a[0] != b[0] for a, b in zip(segments, segments[1:]))
+    names = fire_model.label_names(result.labels)
+    assert [name for name, *_ in segments] == [n for k, n in enumerate(names) if k == 0 or n != names[k - 1]]